@@ -7,7 +7,7 @@ from rich.console import Console
 from rich.panel import Panel
 
 from .config import Config
-from .history import generate_history
+from .history import export_history_tree, generate_history, migrate_history_layout
 
 console = Console()
 app = typer.Typer(
@@ -38,11 +38,51 @@ def main(
     min_diff_lines: Optional[int] = typer.Option(
         Config.min_diff_lines,
         "--min-diff-lines",
-        help="Minimum number of diff lines for a commit to be processed"
+        help="Minimum added plus deleted lines for a commit to be processed"
+    ),
+    concurrency: int = typer.Option(
+        Config.concurrency,
+        "--concurrency",
+        min=1,
+        help="Number of commits summarized concurrently"
+    ),
+    batch_size: int = typer.Option(
+        Config.ai_batch_commits,
+        "--batch-size",
+        min=1,
+        help="Most consecutive small commits summarized in one request"
+    ),
+    migrate_layout: Optional[str] = typer.Option(
+        None,
+        "--migrate-layout",
+        help="Move existing .history commit directories to a layout (flat, sharded) and exit"
+    ),
+    export_tree: bool = typer.Option(
+        False,
+        "--export-tree",
+        help="Write packed .history commits back out as commit directories and exit"
     ),
 ):
     """Generate AI-powered memory and structure tracking for a Git repository."""
     
+    if migrate_layout:
+        try:
+            moved = migrate_history_layout(repo_path, migrate_layout)
+        except Exception as e:
+            console.print(f"\n[bold red]❌ Error: {e}[/]")
+            raise typer.Exit(1)
+        console.print(f"[bold green]✅ Moved {moved} commit directories to the {migrate_layout} layout[/]")
+        return
+    
+    if export_tree:
+        try:
+            exported = export_history_tree(repo_path)
+        except Exception as e:
+            console.print(f"\n[bold red]❌ Error: {e}[/]")
+            raise typer.Exit(1)
+        console.print(f"[bold green]✅ Exported {exported} packed commits to commit directories[/]")
+        return
+    
     # Display startup info
     console.print(Panel.fit(
         f"[bold blue]git-memory v{Config.version}[/]\n"
@@ -59,7 +99,9 @@ def main(
             repo_path=repo_path,
             model_provider=model_provider,
             model=model,
-            min_diff_lines=min_diff_lines
+            min_diff_lines=min_diff_lines,
+            concurrency=concurrency,
+            batch_size=batch_size
         )
         
         console.print("\n[bold green]✅ History generation completed successfully![/]")
@@ -1,14 +1,27 @@
 """AI integration for git-memory using instructor for structured output."""
 
+import asyncio
 import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
+from types import SimpleNamespace
 from typing import List, Optional, Dict, Any
+import httpx
 import instructor
 import openai
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 from rich.console import Console
 
 from .config import Config
+from .cache import ResponseCache
+from .gitlog import split_diff
+from .ratelimit import rate_limiter
+
+try:
+    import tiktoken
+except ImportError:  # Optional dependency: pip install git-memory[tokens]
+    tiktoken = None
 
 console = Console()
 
@@ -27,6 +40,22 @@ class CommitMemory(BaseModel):
     changed: List[CommitChange] = Field(default_factory=list, description="Existing functionality that was modified")
     summary: str = Field(..., description="One-sentence summary of the commit's purpose")
     technical_details: str = Field(default="", description="Technical implementation details if relevant")
+    # Set on memories built without the AI, so they can be recorded as failures
+    _fallback: bool = PrivateAttr(default=False)
+    
+    @property
+    def is_fallback(self) -> bool:
+        return self._fallback
+
+
+class BatchedCommitMemory(CommitMemory):
+    """Memory of one commit in a batched request, naming the commit it describes."""
+    commit_hash: str = Field(..., description="Hash of the commit this memory describes, copied from the input")
+
+
+class CommitMemoryBatch(BaseModel):
+    """Memories of several small commits summarized in one request."""
+    memories: List[BatchedCommitMemory] = Field(default_factory=list, description="One memory per commit")
 
 
 class ProjectMemory(BaseModel):
@@ -41,62 +70,305 @@ class ProjectMemory(BaseModel):
 class InstructorAIClient:
     """AI client using instructor for structured output."""
     
-    def __init__(self, provider: str = "openai", model: str = "gpt-4o"):
+    def __init__(self, provider: str = "openai", model: str = "gpt-4o",
+                 http_client: Optional[httpx.Client] = None,
+                 cache: Optional[ResponseCache] = None):
         self.provider = provider
         self.model = model
+        self.http_client = http_client
+        self.cache = cache
+        self.limiter = rate_limiter(provider)
         self.client = self._create_client()
     
     def _create_client(self) -> instructor.Instructor:
         """Create instructor client for the specified provider."""
+        api_key, base_url = self._resolve_credentials()
+        openai_client = openai.OpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            timeout=Config.ai_timeout,
+            # Retries go through the rate limiter, which adapts concurrency to them
+            max_retries=0,
+            http_client=self.http_client
+        )
+        return instructor.from_openai(openai_client)
+    
+    def _resolve_credentials(self) -> tuple[str, Optional[str]]:
+        """Get API key and base URL for the provider, validating that a key is set."""
         api_key = Config.get_api_key(self.provider)
         base_url = Config.get_base_url(self.provider)
         
         if self.provider == "openai":
             if not api_key:
                 raise ValueError("OpenAI API key not found. Set OPENAI_API_KEY environment variable.")
-            
-            openai_client = openai.OpenAI(
-                api_key=api_key,
-                base_url=base_url
-            )
-            return instructor.from_openai(openai_client)
         
         elif self.provider == "openrouter":
             if not api_key:
                 raise ValueError("OpenRouter API key not found. Set OPENROUTER_API_KEY environment variable.")
-            
-            openai_client = openai.OpenAI(
-                api_key=api_key,
-                base_url=base_url
-            )
-            return instructor.from_openai(openai_client)
         
         elif self.provider == "local":
             # For local models (like Ollama)
-            openai_client = openai.OpenAI(
-                api_key="dummy",  # Local models typically don't need real API keys
-                base_url=base_url
-            )
-            return instructor.from_openai(openai_client)
+            api_key = "dummy"  # Local models typically don't need real API keys
         
         else:
             raise ValueError(f"Unsupported provider: {self.provider}")
+        
+        return api_key, base_url
+    
+    def _cache_key(self, kind: str, max_tokens: int, *parts: Any) -> Optional[str]:
+        """Cache key for a request, or None when no cache is attached."""
+        if self.cache is None:
+            return None
+        return self.cache.key(kind, self.provider, self.model, Config.ai_temperature, max_tokens, *parts)
+    
+    def _request_tokens(self, kwargs: Dict[str, Any]) -> int:
+        """Tokens a request may use: its prompt plus the completion limit."""
+        return self._messages_tokens(kwargs["messages"]) + kwargs.get("max_tokens", 0)
+    
+    def _create(self, **kwargs: Any) -> Any:
+        """Send a structured completion request through the provider's rate limiter."""
+        return self.limiter.call(lambda: self.client.chat.completions.create(**kwargs),
+                                 self._request_tokens(kwargs), lambda response: sum(response_usage(response)))
+    
+    def count_tokens(self, text: str) -> int:
+        """Tokens ``text`` takes in this client's model."""
+        return estimate_tokens(text, self.model)
+    
+    def _messages_tokens(self, messages: List[Dict[str, str]]) -> int:
+        """Tokens the chat ``messages`` take in this client's model."""
+        return self.count_tokens("".join(message["content"] for message in messages))
+    
+    def _diff_chunks(self, diff_text: str, commit_message: str, commit_hash: str) -> List[str]:
+        """Split a diff too large for one prompt into at most Config.ai_commit_max_chunks chunks."""
+        overhead = self._messages_tokens(self._commit_messages("", commit_message, commit_hash))
+        budget = max(1, Config.ai_commit_input_tokens - overhead)
+        if self.count_tokens(diff_text) <= budget:
+            return [diff_text]
+        chunks = split_diff(diff_text, budget, self.count_tokens)
+        if len(chunks) > Config.ai_commit_max_chunks:
+            # Bound the cost of one commit; the tail is named but not analyzed
+            omitted = len(chunks) - Config.ai_commit_max_chunks
+            chunks = chunks[:Config.ai_commit_max_chunks]
+            chunks[-1] += f"\n... [{omitted} more parts of this diff omitted] ..."
+        return chunks
     
     def summarize_commit(self, diff_text: str, commit_message: str, commit_hash: str) -> CommitMemory:
-        """Generate structured memory for a single commit."""
+        """Generate structured memory for a single commit.
+        
+        Diffs over Config.ai_commit_input_tokens are split at file and hunk
+        boundaries, the parts are summarized in parallel and the results are
+        merged into one memory.
+        """
+        chunks = self._diff_chunks(diff_text, commit_message, commit_hash)
+        if len(chunks) == 1:
+            return self._summarize_diff(diff_text, commit_message, commit_hash)
+        parts = self._run_parallel(
+            lambda numbered: self._summarize_diff(numbered[1], self._part_message(commit_message, numbered[0], len(chunks)),
+                                                  commit_hash),
+            list(enumerate(chunks))
+        )
+        return self._merge_commit_memories(parts, commit_message, commit_hash, diff_text)
+    
+    @staticmethod
+    def _part_message(commit_message: str, index: int, count: int) -> str:
+        return f"{commit_message} (part {index + 1} of {count} of a large diff)"
+    
+    def _summarize_diff(self, diff_text: str, commit_message: str, commit_hash: str) -> CommitMemory:
+        """Summarize one prompt's worth of diff."""
+        # The hash is left out of the key so rebased commits with the same diff hit
+        cache_key = self._cache_key("commit", Config.ai_max_tokens, commit_message, diff_text)
+        if cache_key is not None:
+            cached = self.cache.get(cache_key, CommitMemory)
+            if cached is not None:
+                return cached
+        
+        try:
+            response = self._create(
+                model=self.model,
+                response_model=CommitMemory,
+                messages=self._commit_messages(diff_text, commit_message, commit_hash),
+                temperature=Config.ai_temperature,
+                max_tokens=Config.ai_max_tokens
+            )
+            
+            if cache_key is not None:
+                self.cache.put(cache_key, response)
+            return response
+            
+        except Exception as e:
+            console.print(f"[yellow]Warning: AI commit analysis failed: {e}[/]")
+            return self._fallback_commit_memory(commit_message, diff_text)
+    
+    def _merge_messages(self, parts: List[CommitMemory], commit_message: str,
+                        commit_hash: str) -> List[Dict[str, str]]:
+        """Build the chat messages for merging the analyses of one commit's diff parts."""
+        memory_prompt = self._load_prompt("memory_prompt.md")
+        
+        system_prompt = f"""You are merging partial analyses of one large Git commit into one.
+
+{memory_prompt}
+
+Each partial analysis covers a different part of the same diff. Combine duplicate changes
+and write one summary for the whole commit.
+"""
+        
+        user_prompt = f"""Merge these analyses of one commit:
+
+**Commit Hash:** {commit_hash}
+**Commit Message:** {commit_message}
+**Parts:** {len(parts)}
+
+{self._format_memories_for_aggregation(parts)}
+
+Generate structured memory for the whole commit."""
+        
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+    
+    def _merge_commit_memories(self, parts: List[CommitMemory], commit_message: str, commit_hash: str,
+                               diff_text: str) -> CommitMemory:
+        """Merge the memories of a commit's diff parts, without the AI if that fails."""
+        analyzed = [part for part in parts if not part.is_fallback]
+        if not analyzed:
+            return self._fallback_commit_memory(commit_message, diff_text)
+        
+        cache_key = self._cache_key("commit-merge", Config.ai_max_tokens, commit_message,
+                                    [part.model_dump(mode="json") for part in analyzed])
+        if cache_key is not None:
+            cached = self.cache.get(cache_key, CommitMemory)
+            if cached is not None:
+                return cached
+        
         try:
-            # Load memory prompt
-            memory_prompt = self._load_prompt("memory_prompt.md")
+            response = self._create(
+                model=self.model,
+                response_model=CommitMemory,
+                messages=self._merge_messages(analyzed, commit_message, commit_hash),
+                temperature=Config.ai_temperature,
+                max_tokens=Config.ai_max_tokens
+            )
             
-            system_prompt = f"""You are analyzing a Git commit to extract structured information about changes.
+            if cache_key is not None:
+                self.cache.put(cache_key, response)
+            return response
+            
+        except Exception as e:
+            console.print(f"[yellow]Warning: AI commit merge failed: {e}[/]")
+            return self._concatenate_commit_memories(analyzed, commit_message)
+    
+    @staticmethod
+    def _concatenate_commit_memories(parts: List[CommitMemory], commit_message: str) -> CommitMemory:
+        """Merge the memories of a commit's diff parts by concatenating them."""
+        return CommitMemory(
+            added=[change for part in parts for change in part.added],
+            removed=[change for part in parts for change in part.removed],
+            changed=[change for part in parts for change in part.changed],
+            summary=commit_message,
+            technical_details="\n\n".join(part.technical_details for part in parts if part.technical_details)
+        )
+    
+    def summarize_commits(self, commits: List[tuple[str, str, str]]) -> List[CommitMemory]:
+        """Generate structured memory for several small commits in one request.
+        
+        ``commits`` holds ``(diff_text, commit_message, commit_hash)`` tuples;
+        memories come back in the same order. The system prompt is paid once
+        per batch instead of once per commit. Commits the response leaves
+        out, or all of them when the request fails, are summarized one by one.
+        """
+        if len(commits) == 1:
+            return [self.summarize_commit(*commits[0])]
+        
+        cache_key = self._cache_key("commit-batch", Config.ai_max_tokens, [list(commit) for commit in commits])
+        batch = self.cache.get(cache_key, CommitMemoryBatch) if cache_key is not None else None
+        if batch is None:
+            try:
+                batch = self._create(
+                    model=self.model,
+                    response_model=CommitMemoryBatch,
+                    messages=self._batch_messages(commits),
+                    temperature=Config.ai_temperature,
+                    max_tokens=Config.ai_max_tokens * len(commits)
+                )
+                if cache_key is not None:
+                    self.cache.put(cache_key, batch)
+            except Exception as e:
+                console.print(f"[yellow]Warning: AI batch analysis failed, summarizing commits one by one: {e}[/]")
+                batch = CommitMemoryBatch()
+        
+        memories = self._unpack_batch(batch, commits)
+        return [memory if memory is not None else self.summarize_commit(*commit)
+                for memory, commit in zip(memories, commits)]
+    
+    @staticmethod
+    def _unpack_batch(batch: CommitMemoryBatch, commits: List[tuple[str, str, str]]) -> List[Optional[CommitMemory]]:
+        """Match a batch response to its commits, splitting its token usage evenly between them."""
+        returned = {memory.commit_hash.strip().lower(): memory for memory in batch.memories}
+        prompt_tokens, completion_tokens = response_usage(batch)
+        usage = SimpleNamespace(usage=SimpleNamespace(prompt_tokens=prompt_tokens // len(commits),
+                                                      completion_tokens=completion_tokens // len(commits)))
+        memories: List[Optional[CommitMemory]] = []
+        for _, _, commit_hash in commits:
+            # Models sometimes shorten hashes; any unambiguous prefix of seven or more characters matches
+            match = next((memory for returned_hash, memory in returned.items()
+                          if len(returned_hash) >= 7 and commit_hash.startswith(returned_hash)), None)
+            if match is None:
+                memories.append(None)
+                continue
+            memory = CommitMemory.model_validate(match.model_dump(exclude={"commit_hash"}))
+            memory._raw_response = usage
+            memories.append(memory)
+        return memories
+    
+    def _batch_messages(self, commits: List[tuple[str, str, str]]) -> List[Dict[str, str]]:
+        """Build the chat messages for summarizing several small commits at once."""
+        memory_prompt = self._load_prompt("memory_prompt.md")
+        
+        system_prompt = f"""You are analyzing several Git commits to extract structured information about each one.
 
 {memory_prompt}
 
 Focus on categorizing changes into 'added', 'removed', and 'changed' with clear descriptions.
 Be specific about files affected and the impact level of each change.
+Return exactly one memory per commit, with its commit_hash copied from the input.
 """
-            
-            user_prompt = f"""Analyze this Git commit:
+        
+        sections = "\n\n".join(f"""### Commit {i + 1}
+
+**Commit Hash:** {commit_hash}
+**Commit Message:** {commit_message}
+
+**Diff:**
+```diff
+{diff_text}
+```""" for i, (diff_text, commit_message, commit_hash) in enumerate(commits))
+        
+        user_prompt = f"""Analyze these {len(commits)} Git commits:
+
+{sections}
+
+Generate structured memory for each commit."""
+        
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+    
+    def _commit_messages(self, diff_text: str, commit_message: str, commit_hash: str) -> List[Dict[str, str]]:
+        """Build the chat messages for summarizing a single commit."""
+        # Load memory prompt
+        memory_prompt = self._load_prompt("memory_prompt.md")
+        
+        system_prompt = f"""You are analyzing a Git commit to extract structured information about changes.
+
+{memory_prompt}
+
+Focus on categorizing changes into 'added', 'removed', and 'changed' with clear descriptions.
+Be specific about files affected and the impact level of each change.
+"""
+        
+        user_prompt = f"""Analyze this Git commit:
 
 **Commit Hash:** {commit_hash}
 **Commit Message:** {commit_message}
@@ -107,78 +379,235 @@ Be specific about files affected and the impact level of each change.
 ```
 
 Generate structured memory for this commit."""
+        
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+    
+    def aggregate_memories(self, commit_memories: List[CommitMemory], total_commits: int) -> ProjectMemory:
+        """Generate aggregated project memory from individual commit memories.
+        
+        Histories that fit Config.ai_aggregation_input_tokens go out as a
+        single prompt. Longer ones are reduced as a tree: leaf batches of
+        commit memories become partial ProjectMemory summaries, which are
+        merged level by level until one remains. Nodes on the same level run
+        in parallel. Every node is budgeted with the prompt it actually sends.
+        """
+        overhead = self._messages_tokens(self._aggregation_messages([], total_commits))
+        budget = max(1, Config.ai_aggregation_input_tokens - overhead)
+        # Each commit appears in both the timeline and the detailed changes
+        costs = [self.count_tokens(self._format_commit_timeline([memory], i))
+                 + self.count_tokens(self._format_memories_for_aggregation([memory], i))
+                 for i, memory in enumerate(commit_memories)]
+        if sum(costs) <= budget:
+            return self._aggregate_batch(commit_memories, total_commits)
+        
+        # Map: summarize consecutive slices of history
+        batches = batch_by_budget(costs, budget)
+        level = self._run_parallel(
+            lambda batch: self._aggregate_batch(commit_memories[batch.start:batch.stop], total_commits,
+                                                offset=batch.start),
+            batches
+        )
+        
+        # Reduce: merge neighbouring partial summaries until one remains
+        overhead = self._messages_tokens(self._merge_project_messages([], total_commits))
+        budget = max(1, Config.ai_aggregation_input_tokens - overhead)
+        while len(level) > 1:
+            costs = [self.count_tokens(self._format_project_memories([memory])) for memory in level]
+            groups = batch_by_budget(costs, budget, min_size=2)
+            level = self._run_parallel(
+                lambda group, current=level: self._merge_project_memories(current[group.start:group.stop],
+                                                                          total_commits),
+                groups
+            )
+        return level[0]
+    
+    def fold_memories(self, previous: ProjectMemory, commit_memories: List[CommitMemory],
+                      total_commits: int) -> ProjectMemory:
+        """Fold newly processed commit memories into an existing project memory.
+        
+        The prompt holds the previous memory and only the new commits. When the
+        new commits alone overflow the budget they are aggregated first and the
+        result is merged into ``previous``. On failure ``previous`` is kept.
+        """
+        messages = self._fold_messages(previous, commit_memories, total_commits)
+        if self._messages_tokens(messages) > Config.ai_aggregation_input_tokens:
+            new_memory = self.aggregate_memories(commit_memories, total_commits)
+            return self._merge_project_memories([previous, new_memory], total_commits)
+        
+        cache_key = self._cache_key("fold", Config.ai_aggregation_max_tokens, total_commits,
+                                    previous.model_dump(mode="json"),
+                                    [memory.model_dump(mode="json") for memory in commit_memories])
+        if cache_key is not None:
+            cached = self.cache.get(cache_key, ProjectMemory)
+            if cached is not None:
+                return cached
+        
+        try:
+            response = self._create(
+                model=self.model,
+                response_model=ProjectMemory,
+                messages=messages,
+                temperature=Config.ai_temperature,
+                max_tokens=Config.ai_aggregation_max_tokens
+            )
+            
+            if cache_key is not None:
+                self.cache.put(cache_key, response)
+            return response
             
-            response = self.client.chat.completions.create(
+        except Exception as e:
+            console.print(f"[yellow]Warning: AI memory update failed: {e}[/]")
+            return previous
+    
+    def _run_parallel(self, func, items: List[Any]) -> List[Any]:
+        """Apply ``func`` to every item on a thread pool, keeping order."""
+        if len(items) == 1:
+            return [func(items[0])]
+        with ThreadPoolExecutor(max_workers=min(Config.ai_aggregation_workers, len(items))) as executor:
+            return list(executor.map(func, items))
+    
+    def _aggregate_batch(self, commit_memories: List[CommitMemory], total_commits: int,
+                         offset: int = 0) -> ProjectMemory:
+        """Aggregate one prompt's worth of commit memories, numbered from ``offset``."""
+        cache_key = self._cache_key("aggregate", Config.ai_aggregation_max_tokens, total_commits, offset,
+                                    [memory.model_dump(mode="json") for memory in commit_memories])
+        if cache_key is not None:
+            cached = self.cache.get(cache_key, ProjectMemory)
+            if cached is not None:
+                return cached
+        
+        try:
+            response = self._create(
                 model=self.model,
-                response_model=CommitMemory,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
+                response_model=ProjectMemory,
+                messages=self._aggregation_messages(commit_memories, total_commits, offset),
                 temperature=Config.ai_temperature,
-                max_tokens=Config.ai_max_tokens
+                max_tokens=Config.ai_aggregation_max_tokens
             )
             
+            if cache_key is not None:
+                self.cache.put(cache_key, response)
             return response
             
         except Exception as e:
-            console.print(f"[yellow]Warning: AI commit analysis failed: {e}[/]")
-            return self._fallback_commit_memory(commit_message, diff_text)
+            console.print(f"[yellow]Warning: AI aggregation failed: {e}[/]")
+            return self._fallback_project_memory(commit_memories, total_commits)
     
-    def aggregate_memories(self, commit_memories: List[CommitMemory], total_commits: int) -> ProjectMemory:
-        """Generate aggregated project memory from individual commit memories."""
+    def _merge_project_memories(self, memories: List[ProjectMemory], total_commits: int) -> ProjectMemory:
+        """Merge partial project memories covering consecutive slices of history."""
+        cache_key = self._cache_key("merge", Config.ai_aggregation_max_tokens, total_commits,
+                                    [memory.model_dump(mode="json") for memory in memories])
+        if cache_key is not None:
+            cached = self.cache.get(cache_key, ProjectMemory)
+            if cached is not None:
+                return cached
+        
         try:
-            # Load aggregation prompt
-            aggregation_prompt = self._load_prompt("aggregation_prompt.md")
+            response = self._create(
+                model=self.model,
+                response_model=ProjectMemory,
+                messages=self._merge_project_messages(memories, total_commits),
+                temperature=Config.ai_temperature,
+                max_tokens=Config.ai_aggregation_max_tokens
+            )
+            
+            if cache_key is not None:
+                self.cache.put(cache_key, response)
+            return response
             
-            system_prompt = f"""You are analyzing the complete history of a Git repository to extract high-level insights.
+        except Exception as e:
+            console.print(f"[yellow]Warning: AI aggregation merge failed: {e}[/]")
+            return self._fallback_merged_memory(memories)
+    
+    def _fold_messages(self, previous: ProjectMemory, commit_memories: List[CommitMemory],
+                       total_commits: int) -> List[Dict[str, str]]:
+        """Build the chat messages for folding new commit memories into ``previous``."""
+        aggregation_prompt = self._load_prompt("aggregation_prompt.md")
+        offset = total_commits - len(commit_memories)
+        
+        system_prompt = f"""You are updating the memory of a Git repository with its newest commits.
+
+{aggregation_prompt}
+
+Keep what the existing memory established unless the new commits change or remove it.
+"""
+        
+        user_prompt = f"""Update this project memory with the new commits:
+
+**Total Commits:** {total_commits}
+**New Commits:** {len(commit_memories)}
+
+**Existing Memory:**
+{self._format_project_memories([previous])}
+
+**New Changes:**
+{self._format_memories_for_aggregation(commit_memories, offset)}
+
+Generate the updated high-level project memory."""
+        
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+    
+    def _aggregation_messages(self, commit_memories: List[CommitMemory], total_commits: int,
+                              offset: int = 0) -> List[Dict[str, str]]:
+        """Build the chat messages for aggregating commit memories numbered from ``offset``."""
+        aggregation_prompt = self._load_prompt("aggregation_prompt.md")
+        
+        system_prompt = f"""You are analyzing the complete history of a Git repository to extract high-level insights.
 
 {aggregation_prompt}
 
 Focus on identifying major features, architectural evolution, and key technical decisions.
 """
-            
-            # Prepare commit summaries for analysis
-            commit_summaries = []
-            for i, memory in enumerate(commit_memories):
-                summary = f"Commit {i+1}: {memory.summary}"
-                if memory.added:
-                    summary += f" | Added: {len(memory.added)} items"
-                if memory.changed:
-                    summary += f" | Changed: {len(memory.changed)} items"
-                if memory.removed:
-                    summary += f" | Removed: {len(memory.removed)} items"
-                commit_summaries.append(summary)
-            
-            user_prompt = f"""Analyze this project's complete Git history:
+        
+        user_prompt = f"""Analyze this project's complete Git history:
 
 **Total Commits:** {total_commits}
 **Commits Analyzed:** {len(commit_memories)}
 
 **Commit Timeline:**
-{chr(10).join(commit_summaries)}
+{self._format_commit_timeline(commit_memories, offset)}
 
 **Detailed Changes:**
-{self._format_memories_for_aggregation(commit_memories)}
+{self._format_memories_for_aggregation(commit_memories, offset)}
 
 Generate high-level project memory and insights."""
-            
-            response = self.client.chat.completions.create(
-                model=self.model,
-                response_model=ProjectMemory,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=Config.ai_temperature,
-                max_tokens=Config.ai_aggregation_max_tokens
-            )
-            
-            return response
-            
-        except Exception as e:
-            console.print(f"[yellow]Warning: AI aggregation failed: {e}[/]")
-            return self._fallback_project_memory(commit_memories, total_commits)
+        
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+    
+    def _merge_project_messages(self, memories: List[ProjectMemory], total_commits: int) -> List[Dict[str, str]]:
+        """Build the chat messages for merging partial project memories."""
+        aggregation_prompt = self._load_prompt("aggregation_prompt.md")
+        
+        system_prompt = f"""You are merging partial memories of a Git repository's history into one.
+
+{aggregation_prompt}
+
+Each partial memory covers a consecutive slice of history, oldest first. Later slices
+describe the more recent state of the project, so prefer them for the current state.
+"""
+        
+        user_prompt = f"""Merge these partial project memories:
+
+**Total Commits:** {total_commits}
+**Partial Memories:** {len(memories)}
+
+{self._format_project_memories(memories)}
+
+Generate one high-level project memory covering all of them."""
+        
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
     
     def _load_prompt(self, filename: str) -> str:
         """Load prompt from prompts directory."""
@@ -190,10 +619,24 @@ Generate high-level project memory and insights."""
             console.print(f"[yellow]Warning: Prompt file {filename} not found[/]")
             return ""
     
-    def _format_memories_for_aggregation(self, memories: List[CommitMemory]) -> str:
+    def _format_commit_timeline(self, memories: List[CommitMemory], offset: int = 0) -> str:
+        """Format one line per commit memory for the aggregation prompt's timeline."""
+        commit_summaries = []
+        for i, memory in enumerate(memories, start=offset):
+            summary = f"Commit {i+1}: {memory.summary}"
+            if memory.added:
+                summary += f" | Added: {len(memory.added)} items"
+            if memory.changed:
+                summary += f" | Changed: {len(memory.changed)} items"
+            if memory.removed:
+                summary += f" | Removed: {len(memory.removed)} items"
+            commit_summaries.append(summary)
+        return "\n".join(commit_summaries)
+    
+    def _format_memories_for_aggregation(self, memories: List[CommitMemory], offset: int = 0) -> str:
         """Format commit memories for aggregation prompt."""
         formatted = []
-        for i, memory in enumerate(memories):
+        for i, memory in enumerate(memories, start=offset):
             commit_info = f"## Commit {i+1}: {memory.summary}\n"
             
             if memory.added:
@@ -215,11 +658,26 @@ Generate high-level project memory and insights."""
         
         return "\n".join(formatted)
     
+    def _format_project_memories(self, memories: List[ProjectMemory]) -> str:
+        """Format partial project memories for the merge prompt."""
+        formatted = []
+        for i, memory in enumerate(memories):
+            part = f"## Part {i+1}\n**Current State:** {memory.current_state}\n"
+            for title, items in [("Major Features", memory.major_features),
+                                 ("Architecture Evolution", memory.architecture_evolution),
+                                 ("Key Decisions", memory.key_decisions),
+                                 ("Next Steps", memory.next_steps)]:
+                if items:
+                    part += f"**{title}:**\n" + "".join(f"- {item}\n" for item in items)
+            formatted.append(part)
+        
+        return "\n".join(formatted)
+    
     def _fallback_commit_memory(self, commit_message: str, diff_text: str) -> CommitMemory:
         """Generate fallback commit memory when AI fails."""
         lines_changed = len(diff_text.splitlines()) if diff_text else 0
         
-        return CommitMemory(
+        memory = CommitMemory(
             added=[CommitChange(
                 description=f"Changes from commit: {commit_message}",
                 files=[],
@@ -230,6 +688,8 @@ Generate high-level project memory and insights."""
             summary=commit_message,
             technical_details=f"Fallback memory - {lines_changed} lines changed"
         )
+        memory._fallback = True
+        return memory
     
     def _fallback_project_memory(self, memories: List[CommitMemory], total_commits: int) -> ProjectMemory:
         """Generate fallback project memory when AI fails."""
@@ -242,27 +702,356 @@ Generate high-level project memory and insights."""
         )
 
 
+    def _fallback_merged_memory(self, memories: List[ProjectMemory]) -> ProjectMemory:
+        """Merge partial project memories without AI by concatenating them."""
+        def merged(field: str) -> List[str]:
+            return list(dict.fromkeys(item for memory in memories for item in getattr(memory, field)))
+        
+        return ProjectMemory(
+            major_features=merged("major_features"),
+            architecture_evolution=merged("architecture_evolution"),
+            key_decisions=merged("key_decisions"),
+            current_state=memories[-1].current_state,
+            next_steps=memories[-1].next_steps
+        )
+
+
+class AsyncInstructorAIClient(InstructorAIClient):
+    """Async variant of InstructorAIClient for keeping many requests in flight."""
+    
+    def __init__(self, provider: str = "openai", model: str = "gpt-4o",
+                 http_client: Optional[httpx.AsyncClient] = None,
+                 cache: Optional[ResponseCache] = None):
+        super().__init__(provider, model, http_client, cache)
+    
+    def _create_client(self) -> instructor.AsyncInstructor:
+        """Create async instructor client for the specified provider."""
+        api_key, base_url = self._resolve_credentials()
+        openai_client = openai.AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            timeout=Config.ai_timeout,
+            # Retries go through the rate limiter, which adapts concurrency to them
+            max_retries=0,
+            http_client=self.http_client
+        )
+        return instructor.from_openai(openai_client)
+    
+    async def _create_async(self, **kwargs: Any) -> Any:
+        """Async variant of _create."""
+        return await self.limiter.call_async(lambda: self.client.chat.completions.create(**kwargs),
+                                             self._request_tokens(kwargs),
+                                             lambda response: sum(response_usage(response)))
+    
+    async def summarize_commit_async(self, diff_text: str, commit_message: str, commit_hash: str) -> CommitMemory:
+        """Generate structured memory for a single commit without blocking the event loop.
+        
+        Oversized diffs are split, summarized concurrently and merged as in
+        summarize_commit.
+        """
+        chunks = self._diff_chunks(diff_text, commit_message, commit_hash)
+        if len(chunks) == 1:
+            return await self._summarize_diff_async(diff_text, commit_message, commit_hash)
+        parts = await asyncio.gather(*(
+            self._summarize_diff_async(chunk, self._part_message(commit_message, i, len(chunks)), commit_hash)
+            for i, chunk in enumerate(chunks)
+        ))
+        return await self._merge_commit_memories_async(list(parts), commit_message, commit_hash, diff_text)
+    
+    async def summarize_commits_async(self, commits: List[tuple[str, str, str]]) -> List[CommitMemory]:
+        """Async variant of summarize_commits."""
+        if len(commits) == 1:
+            return [await self.summarize_commit_async(*commits[0])]
+        
+        cache_key = self._cache_key("commit-batch", Config.ai_max_tokens, [list(commit) for commit in commits])
+        batch = self.cache.get(cache_key, CommitMemoryBatch) if cache_key is not None else None
+        if batch is None:
+            try:
+                batch = await self._create_async(
+                    model=self.model,
+                    response_model=CommitMemoryBatch,
+                    messages=self._batch_messages(commits),
+                    temperature=Config.ai_temperature,
+                    max_tokens=Config.ai_max_tokens * len(commits)
+                )
+                if cache_key is not None:
+                    self.cache.put(cache_key, batch)
+            except Exception as e:
+                console.print(f"[yellow]Warning: AI batch analysis failed, summarizing commits one by one: {e}[/]")
+                batch = CommitMemoryBatch()
+        
+        memories = self._unpack_batch(batch, commits)
+        missing = [i for i, memory in enumerate(memories) if memory is None]
+        for i, memory in zip(missing, await asyncio.gather(*(self.summarize_commit_async(*commits[i])
+                                                             for i in missing))):
+            memories[i] = memory
+        return memories
+    
+    async def _merge_commit_memories_async(self, parts: List[CommitMemory], commit_message: str,
+                                           commit_hash: str, diff_text: str) -> CommitMemory:
+        """Async variant of _merge_commit_memories."""
+        analyzed = [part for part in parts if not part.is_fallback]
+        if not analyzed:
+            return self._fallback_commit_memory(commit_message, diff_text)
+        
+        cache_key = self._cache_key("commit-merge", Config.ai_max_tokens, commit_message,
+                                    [part.model_dump(mode="json") for part in analyzed])
+        if cache_key is not None:
+            cached = self.cache.get(cache_key, CommitMemory)
+            if cached is not None:
+                return cached
+        
+        try:
+            response = await self._create_async(
+                model=self.model,
+                response_model=CommitMemory,
+                messages=self._merge_messages(analyzed, commit_message, commit_hash),
+                temperature=Config.ai_temperature,
+                max_tokens=Config.ai_max_tokens
+            )
+            
+            if cache_key is not None:
+                self.cache.put(cache_key, response)
+            return response
+            
+        except Exception as e:
+            console.print(f"[yellow]Warning: AI commit merge failed: {e}[/]")
+            return self._concatenate_commit_memories(analyzed, commit_message)
+    
+    async def _summarize_diff_async(self, diff_text: str, commit_message: str, commit_hash: str) -> CommitMemory:
+        """Summarize one prompt's worth of diff without blocking the event loop."""
+        cache_key = self._cache_key("commit", Config.ai_max_tokens, commit_message, diff_text)
+        if cache_key is not None:
+            cached = self.cache.get(cache_key, CommitMemory)
+            if cached is not None:
+                return cached
+        
+        try:
+            response = await self._create_async(
+                model=self.model,
+                response_model=CommitMemory,
+                messages=self._commit_messages(diff_text, commit_message, commit_hash),
+                temperature=Config.ai_temperature,
+                max_tokens=Config.ai_max_tokens
+            )
+            
+            if cache_key is not None:
+                self.cache.put(cache_key, response)
+            return response
+        except Exception as e:
+            console.print(f"[yellow]Warning: AI commit analysis failed: {e}[/]")
+            return self._fallback_commit_memory(commit_message, diff_text)
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    """tiktoken encoding for ``model``, or None when token counts are estimated."""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        pass  # Not an OpenAI model name; its tokenizer is unknown
+    try:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None  # Encoding files could not be loaded, e.g. offline
+
+
+def estimate_tokens(text: str, model: Optional[str] = None) -> int:
+    """Token count for budgeting prompts.
+    
+    Counted with tiktoken for ``model`` when it is installed, otherwise
+    estimated at about four characters per token.
+    """
+    encoding = _encoding(model) if model else None
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=())) + 1
+    return len(text) // 4 + 1
+
+
+def batch_by_budget(costs: List[int], budget: int, min_size: int = 1) -> List[range]:
+    """Split items into consecutive batches whose costs fit ``budget``.
+    
+    An item larger than the budget gets a batch of its own. Batches hold at
+    least ``min_size`` items where possible, so repeated reduction always
+    makes progress.
+    """
+    batches = []
+    start = 0
+    total = 0
+    for i, cost in enumerate(costs):
+        if i > start and total + cost > budget and i - start >= min_size:
+            batches.append(range(start, i))
+            start, total = i, 0
+        total += cost
+    if start < len(costs):
+        if batches and len(costs) - start < min_size:
+            # Fold a short tail into the previous batch
+            batches[-1] = range(batches[-1].start, len(costs))
+        else:
+            batches.append(range(start, len(costs)))
+    return batches
+
+
+def response_usage(response: BaseModel) -> tuple[int, int]:
+    """Prompt and completion tokens the provider reported for a response.
+    
+    Cached and fallback responses report zero.
+    """
+    usage = getattr(getattr(response, "_raw_response", None), "usage", None)
+    prompt_tokens = getattr(usage, "prompt_tokens", 0)
+    completion_tokens = getattr(usage, "completion_tokens", 0)
+    return (prompt_tokens if isinstance(prompt_tokens, int) else 0,
+            completion_tokens if isinstance(completion_tokens, int) else 0)
+
+
+class AISession:
+    """Long-lived AI client shared by every call made during a run.
+    
+    Owns a single keep-alive HTTP connection pool, so client construction and
+    TLS handshakes happen once per run instead of once per commit. While the
+    session is open, summarize_diff and generate_project_memory reuse it.
+    A response cache handed to the session is shared by its clients and
+    closed with it.
+    """
+    
+    def __init__(self, provider: str = "openai", model: str = "gpt-4o",
+                 cache: Optional[ResponseCache] = None):
+        self.provider = provider
+        self.model = model
+        self.cache = cache
+        self.http_client = httpx.Client(**self._pool_options())
+        self._client: Optional[InstructorAIClient] = None
+        self._async_http_client: Optional[httpx.AsyncClient] = None
+        self._async_client: Optional[AsyncInstructorAIClient] = None
+    
+    @staticmethod
+    def _pool_options() -> Dict[str, Any]:
+        return {
+            "limits": httpx.Limits(
+                max_connections=Config.ai_pool_max_connections,
+                max_keepalive_connections=Config.ai_pool_max_keepalive,
+                keepalive_expiry=Config.ai_pool_keepalive_expiry
+            ),
+            "timeout": httpx.Timeout(Config.ai_timeout),
+            "follow_redirects": True,
+        }
+    
+    @property
+    def client(self) -> InstructorAIClient:
+        """Client bound to the session's pool, created on first use."""
+        if self._client is None:
+            self._client = InstructorAIClient(self.provider, self.model, http_client=self.http_client,
+                                              cache=self.cache)
+        return self._client
+    
+    @property
+    def async_client(self) -> AsyncInstructorAIClient:
+        """Async client with its own pool, created on first use inside the event loop."""
+        if self._async_client is None:
+            if self._async_http_client is None:
+                self._async_http_client = httpx.AsyncClient(**self._pool_options())
+            self._async_client = AsyncInstructorAIClient(self.provider, self.model,
+                                                         http_client=self._async_http_client,
+                                                         cache=self.cache)
+        return self._async_client
+    
+    async def aclose(self) -> None:
+        """Close the async connection pool; call from the loop that used it."""
+        if self._async_http_client is not None:
+            await self._async_http_client.aclose()
+            self._async_http_client = None
+            self._async_client = None
+    
+    def close(self) -> None:
+        """Close the connection pool and the response cache."""
+        self.http_client.close()
+        if self.cache is not None:
+            self.cache.close()
+    
+    def __enter__(self) -> "AISession":
+        global _active_session
+        self._previous = _active_session
+        _active_session = self
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        global _active_session
+        _active_session = self._previous
+        self.close()
+
+
+_active_session: Optional[AISession] = None
+
+
 # Factory function for creating AI clients
 def create_ai_client(provider: str = "openai", model: str = "gpt-4o") -> InstructorAIClient:
     """Create AI client with specified provider and model."""
     return InstructorAIClient(provider=provider, model=model)
 
 
+def get_ai_client(provider: str = "openai", model: str = "gpt-4o") -> InstructorAIClient:
+    """Return the open session's client for provider/model, or a new client."""
+    session = _active_session
+    if session is not None and session.provider == provider and session.model == model:
+        return session.client
+    return create_ai_client(provider, model)
+
+
 # Main functions used by history.py
 def summarize_diff(diff_text: str, commit_message: str, commit_hash: str, 
                   provider: str = "openai", model: str = "gpt-4o") -> CommitMemory:
     """Analyze a Git diff and generate structured memory."""
-    client = create_ai_client(provider, model)
+    client = get_ai_client(provider, model)
     return client.summarize_commit(diff_text, commit_message, commit_hash)
 
 
+def summarize_diffs(commits: List[tuple[str, str, str]], provider: str = "openai",
+                    model: str = "gpt-4o") -> List[CommitMemory]:
+    """Analyze several small commits in one request; ``commits`` holds (diff_text, message, hash) tuples."""
+    client = get_ai_client(provider, model)
+    return client.summarize_commits(commits)
+
+
+async def summarize_diffs_async(commits: List[tuple[str, str, str]], provider: str = "openai",
+                                model: str = "gpt-4o") -> List[CommitMemory]:
+    """Async variant of summarize_diffs."""
+    session = _active_session
+    if session is not None and session.provider == provider and session.model == model:
+        client = session.async_client
+    else:
+        client = AsyncInstructorAIClient(provider=provider, model=model)
+    return await client.summarize_commits_async(commits)
+
+
+async def summarize_diff_async(diff_text: str, commit_message: str, commit_hash: str,
+                               provider: str = "openai", model: str = "gpt-4o") -> CommitMemory:
+    """Async variant of summarize_diff, sharing the open session's async pool."""
+    session = _active_session
+    if session is not None and session.provider == provider and session.model == model:
+        client = session.async_client
+    else:
+        client = AsyncInstructorAIClient(provider=provider, model=model)
+    return await client.summarize_commit_async(diff_text, commit_message, commit_hash)
+
+
 def generate_project_memory(commit_memories: List[CommitMemory], total_commits: int,
                           provider: str = "openai", model: str = "gpt-4o") -> ProjectMemory:
     """Generate aggregated project memory from commit memories."""
-    client = create_ai_client(provider, model)
+    client = get_ai_client(provider, model)
     return client.aggregate_memories(commit_memories, total_commits)
 
 
+def fold_project_memory(previous: Optional[ProjectMemory], commit_memories: List[CommitMemory],
+                        total_commits: int, provider: str = "openai", model: str = "gpt-4o") -> ProjectMemory:
+    """Fold new commit memories into ``previous``, or aggregate them when there is none yet."""
+    client = get_ai_client(provider, model)
+    if previous is None:
+        return client.aggregate_memories(commit_memories, total_commits)
+    return client.fold_memories(previous, commit_memories, total_commits)
+
+
 def generate_diagram(commit_memories: List[CommitMemory], project_memory: ProjectMemory) -> str:
     """Generate Mermaid diagram from project memory (placeholder for now)."""
     # TODO: Implement Mermaid diagram generation
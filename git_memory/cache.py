@@ -0,0 +1,117 @@
+"""Persistent content-addressed cache for AI responses."""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional, Type, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+from .config import Config
+
+PROMPTS_DIR = Path(__file__).parent.parent.resolve() / "prompts"
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+def prompts_digest(prompts_dir: Path = PROMPTS_DIR) -> str:
+    """Hash the names and contents of every file under ``prompts_dir``."""
+    digest = hashlib.sha256()
+    if prompts_dir.is_dir():
+        for path in sorted(p for p in prompts_dir.rglob("*") if p.is_file()):
+            digest.update(path.relative_to(prompts_dir).as_posix().encode("utf-8") + b"\x00")
+            digest.update(path.read_bytes() + b"\x00")
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed LRU cache of structured AI responses.
+
+    Entries are keyed by a hash of everything that shapes a response, so a
+    hit can be returned without a network call. The prompts digest is part
+    of every key, and entries written under a different digest are dropped
+    when the cache is opened. Once the stored JSON exceeds ``max_bytes`` the
+    least recently used entries are evicted.
+    """
+
+    def __init__(self, path: Path, max_bytes: Optional[int] = None,
+                 prompts_dir: Path = PROMPTS_DIR):
+        self.path = path
+        self.max_bytes = Config.ai_cache_max_bytes if max_bytes is None else max_bytes
+        self.prompts_digest = prompts_digest(prompts_dir)
+        self._lock = threading.Lock()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Shared between the event loop and writer threads; access is serialized by _lock
+        self._conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            row = self._conn.execute("SELECT value FROM meta WHERE name = 'prompts_digest'").fetchone()
+            if row is None or row[0] != self.prompts_digest:
+                self._conn.execute("DELETE FROM entries")
+                self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('prompts_digest', ?)",
+                                   (self.prompts_digest,))
+
+    def key(self, *parts: Any) -> str:
+        """Content address for a request built from JSON-serializable ``parts``."""
+        payload = json.dumps([self.prompts_digest, *parts], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, model: Type[ModelT]) -> Optional[ModelT]:
+        """Return the cached response for ``key``, or None on a miss."""
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            try:
+                value = model.model_validate_json(row[0])
+            except ValidationError:
+                # Written by an incompatible model version
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+            return value
+
+    def put(self, key: str, value: BaseModel) -> None:
+        """Store ``value`` under ``key`` and evict old entries past the size bound."""
+        data = value.model_dump_json()
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                               (key, data, len(data), time.time()))
+            self._evict()
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        stale = []
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY accessed"):
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", stale)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def open_response_cache(history_dir: Path) -> Optional[ResponseCache]:
+    """Open the configured response cache for a run, or None when disabled."""
+    if not Config.ai_cache:
+        return None
+    if Config.ai_cache_dir:
+        return ResponseCache(Path(Config.ai_cache_dir).expanduser() / "responses.db")
+    return ResponseCache(history_dir / "cache.db")
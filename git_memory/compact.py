@@ -0,0 +1,139 @@
+"""Compaction of diffs before they are sent to the summarizer."""
+
+import fnmatch
+import threading
+from typing import Callable, List, Optional
+
+from .config import Config
+from .gitlog import split_sections
+
+# Markers tools put near the top of files they generate
+GENERATED_MARKERS = ("@generated", "DO NOT EDIT", "Code generated by", "autogenerated", "auto-generated")
+# Added lines longer than this on average mark a minified file
+MINIFIED_LINE_LENGTH = 500
+# Stands for unchanged lines dropped from the middle of a hunk
+ELISION = " ...\n"
+
+
+class CompactionStats:
+    """Prompt tokens of the diffs before and after compaction, summed over a run."""
+
+    def __init__(self):
+        self.commits = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+        self._lock = threading.Lock()
+
+    def add(self, tokens_before: int, tokens_after: int) -> None:
+        with self._lock:
+            self.commits += 1
+            self.tokens_before += tokens_before
+            self.tokens_after += tokens_after
+
+    @property
+    def saved(self) -> float:
+        """Share of prompt tokens compaction removed."""
+        if not self.tokens_before:
+            return 0.0
+        return 1 - self.tokens_after / self.tokens_before
+
+
+def _file_path(header: str) -> str:
+    """Path of a file section from its ``diff --git a/... b/...`` line."""
+    _, _, path = header.rstrip("\n").rpartition(" b/")
+    return path
+
+
+def _is_stat_only(path: str, hunk_lines: List[str]) -> bool:
+    """Whether a file's changes are better described by their size than their content."""
+    name = path.rsplit("/", 1)[-1]
+    if any(fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(path, pattern)
+           for pattern in Config.diff_stat_only_patterns):
+        return True
+    head = "".join(hunk_lines[:20])
+    if any(marker in head for marker in GENERATED_MARKERS):
+        return True
+    added = [line for line in hunk_lines if line.startswith("+")]
+    return bool(added) and sum(len(line) for line in added) / len(added) > MINIFIED_LINE_LENGTH
+
+
+def _is_whitespace_only(hunk: List[str]) -> bool:
+    """Whether a hunk only changes whitespace."""
+    changed = [line for line in hunk[1:] if line[:1] in ("+", "-")]
+    removed = [line[1:].split() for line in changed if line.startswith("-") and line[1:].strip()]
+    added = [line[1:].split() for line in changed if line.startswith("+") and line[1:].strip()]
+    return bool(changed) and sorted(removed) == sorted(added)
+
+
+def _trim_context(hunk: List[str], context: int) -> List[str]:
+    """Keep at most ``context`` unchanged lines on each side of every change."""
+    body = hunk[1:]
+    changed = [i for i, line in enumerate(body) if line[:1] in ("+", "-", "\\")]
+    keep = set()
+    for i in changed:
+        keep.update(range(max(0, i - context), min(len(body), i + context + 1)))
+    trimmed = [hunk[0]]
+    elided = False
+    for i, line in enumerate(body):
+        if i in keep:
+            if elided and len(trimmed) > 1:
+                trimmed.append(ELISION)
+            trimmed.append(line)
+            elided = False
+        else:
+            elided = True
+    return trimmed
+
+
+def _compact_file(lines: List[str], context: int) -> List[str]:
+    """Compact the patch section of one file."""
+    header_end = next((i for i, line in enumerate(lines) if line.startswith("@@")), len(lines))
+    header, hunk_lines = lines[:header_end], lines[header_end:]
+    if any(line.startswith(("Binary files ", "GIT binary patch")) for line in lines):
+        return []
+    # The blob hashes on the index line mean nothing to the summarizer
+    header = [line for line in header if not line.startswith("index ")]
+    if not hunk_lines:
+        return header
+
+    # GitPython diffs carry no diff --git line, so only their hunks are compacted
+    if lines[0].startswith("diff --git ") and _is_stat_only(_file_path(lines[0]), hunk_lines):
+        added = sum(1 for line in hunk_lines if line.startswith("+"))
+        removed = sum(1 for line in hunk_lines if line.startswith("-"))
+        return [lines[0], f"[+{added} -{removed} lines; generated or lock file, contents omitted]\n"]
+
+    compacted = header
+    for hunk in split_sections(hunk_lines, "@@"):
+        if _is_whitespace_only(hunk):
+            changed = sum(1 for line in hunk[1:] if line[:1] in ("+", "-"))
+            compacted += [hunk[0], f"[whitespace-only changes to {changed} lines]\n"]
+        else:
+            compacted += _trim_context(hunk, context)
+    return compacted
+
+
+def compact_diff(diff_text: str, context: Optional[int] = None) -> str:
+    """Trim a unified diff to what the summarizer needs.
+
+    Unchanged context is cut to ``context`` lines (Config.diff_context_lines
+    by default) around each change, whitespace-only hunks collapse to one
+    line, lock files and generated or minified files are replaced with their
+    line counts, and binary files are dropped.
+    """
+    if context is None:
+        context = Config.diff_context_lines
+    compacted: List[str] = []
+    for file_lines in split_sections(diff_text.splitlines(keepends=True), "diff --git "):
+        compacted += _compact_file(file_lines, context)
+    return "".join(compacted)
+
+
+def compact_for_ai(diff_text: str, count: Callable[[str], int],
+                   stats: Optional[CompactionStats] = None) -> str:
+    """Compact ``diff_text`` when Config.diff_compaction is on, adding token counts to ``stats``."""
+    if not Config.diff_compaction:
+        return diff_text
+    compacted = compact_diff(diff_text)
+    if stats is not None:
+        stats.add(count(diff_text), count(compacted))
+    return compacted
@@ -0,0 +1,135 @@
+"""Optional compression of stored diff.patch files."""
+
+import gzip
+import io
+import shutil
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+from .config import Config
+
+try:
+    import zstandard
+except ImportError:  # Optional dependency: pip install git-memory[zstd]
+    zstandard = None
+
+NONE = "none"
+GZIP = "gzip"
+ZSTD = "zstd"
+CODECS = (NONE, GZIP, ZSTD)
+
+PATCH_NAME = "diff.patch"
+SUFFIXES = {NONE: "", GZIP: ".gz", ZSTD: ".zst"}
+PATCH_NAMES = tuple(PATCH_NAME + suffix for suffix in SUFFIXES.values())
+
+# zstd dictionary trained on the repository's own patches, shared by every commit
+DICTIONARY_FILE = "patches.dict"
+
+
+def patch_codec() -> str:
+    """Codec new patches are stored with, from Config.patch_compression."""
+    codec = Config.patch_compression
+    if codec not in CODECS:
+        raise ValueError(f"Unknown patch compression: {codec} (expected one of {', '.join(CODECS)})")
+    if codec == ZSTD and zstandard is None:
+        raise ValueError("zstd patch compression requires the zstandard package (pip install git-memory[zstd])")
+    return codec
+
+
+def patch_name(codec: Optional[str] = None) -> str:
+    """File name of a patch stored with ``codec``."""
+    return PATCH_NAME + SUFFIXES[codec or patch_codec()]
+
+
+def codec_for(name: str) -> str:
+    """Codec of a stored patch, from its file name."""
+    for codec, suffix in SUFFIXES.items():
+        if suffix and name.endswith(suffix):
+            return codec
+    return NONE
+
+
+def _load_dictionary(history_dir: Path) -> Optional["zstandard.ZstdCompressionDict"]:
+    path = history_dir / DICTIONARY_FILE
+    if zstandard is None or not path.exists():
+        return None
+    return zstandard.ZstdCompressionDict(path.read_bytes())
+
+
+def train_patch_dictionary(history_dir: Path, samples: Iterable[str]) -> bool:
+    """Train the zstd dictionary for ``history_dir`` once, from sample patches.
+
+    Returns whether a dictionary exists afterwards. An existing dictionary is
+    never replaced, since patches compressed with it need it to decompress.
+    Too few or too small samples leave patches compressed without one.
+    """
+    path = history_dir / DICTIONARY_FILE
+    if path.exists():
+        return True
+    if zstandard is None:
+        return False
+    data = [sample.encode("utf-8") for sample in samples if sample]
+    try:
+        dictionary = zstandard.train_dictionary(Config.patch_dictionary_bytes, data)
+    except zstandard.ZstdError:
+        return False
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_bytes(dictionary.as_bytes())
+    tmp_path.replace(path)
+    return True
+
+
+def compress_patch(history_dir: Path, data: bytes, codec: Optional[str] = None) -> bytes:
+    """Compress a whole patch held in memory."""
+    codec = codec or patch_codec()
+    if codec == GZIP:
+        return gzip.compress(data, mtime=0)
+    if codec == ZSTD:
+        return zstandard.ZstdCompressor(level=Config.patch_compression_level,
+                                        dict_data=_load_dictionary(history_dir)).compress(data)
+    return data
+
+
+def compress_patch_file(history_dir: Path, path: Path, codec: Optional[str] = None) -> Path:
+    """Compress a patch file on disk in bounded memory and return the new path.
+
+    The plain file is removed once the compressed copy is complete.
+    """
+    codec = codec or patch_codec()
+    if codec == NONE:
+        return path
+    target = path.with_name(patch_name(codec))
+    tmp_path = target.with_suffix(".tmp")
+    with open(path, "rb") as source, open(tmp_path, "wb") as raw:
+        if codec == GZIP:
+            with gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+                shutil.copyfileobj(source, f)
+        else:
+            compressor = zstandard.ZstdCompressor(level=Config.patch_compression_level,
+                                                  dict_data=_load_dictionary(history_dir))
+            compressor.copy_stream(source, raw)
+    tmp_path.replace(target)
+    path.unlink()
+    return target
+
+
+def open_patch_stream(history_dir: Path, source: Union[Path, bytes], name: str) -> io.TextIOWrapper:
+    """Open a stored patch as text, decompressing lazily while it is read.
+
+    ``source`` is the patch file, or the still-compressed bytes of a packed
+    patch.
+    """
+    codec = codec_for(name)
+    if codec == ZSTD and zstandard is None:
+        raise ValueError(f"{name} needs the zstandard package (pip install git-memory[zstd])")
+    if codec == GZIP:
+        # Given a path, gzip owns the file and closes it with the stream
+        stream = gzip.open(source if isinstance(source, Path) else io.BytesIO(source), "rb")
+        return io.TextIOWrapper(stream, encoding="utf-8", errors="replace", newline="")
+    raw = open(source, "rb") if isinstance(source, Path) else io.BytesIO(source)
+    if codec == ZSTD:
+        stream = zstandard.ZstdDecompressor(dict_data=_load_dictionary(history_dir)).stream_reader(
+            raw, closefd=True)
+    else:
+        stream = raw
+    return io.TextIOWrapper(stream, encoding="utf-8", errors="replace", newline="")
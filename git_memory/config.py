@@ -1,7 +1,7 @@
 """Configuration management for git-memory."""
 
 import os
-from typing import Optional
+from typing import Dict, Optional
 
 
 class Config:
@@ -17,12 +17,68 @@ class Config:
     # Processing settings
     min_diff_lines: Optional[int] = None
     
+    # Diff extraction settings
+    diff_backend: str = "log"  # "log" (single streaming git log -p) or "gitpython"
+    first_parent: bool = True  # Follow only the first parent of merges
+    stream_patches: bool = False  # Write diff.patch while extracting instead of buffering it
+    diff_view_bytes: int = 100_000  # Patch bytes kept in memory for the LLM when streaming
+    huge_file_lines: int = 5000  # Files changing more lines than this are kept out of AI analysis
+    
+    # Diff compaction before summarization
+    diff_compaction: bool = True  # Trim context, whitespace-only hunks, lock and generated files from AI input
+    diff_context_lines: int = 1  # Unchanged lines kept around each change
+    diff_stat_only_patterns: tuple[str, ...] = (  # Files sent to the AI as a line count only
+        "package-lock.json", "npm-shrinkwrap.json", "yarn.lock", "pnpm-lock.yaml", "bun.lockb",
+        "poetry.lock", "Pipfile.lock", "uv.lock", "pdm.lock", "Cargo.lock", "Gemfile.lock",
+        "composer.lock", "go.sum", "flake.lock", "packages.lock.json", "*.min.js", "*.min.css",
+        "*.map", "*_pb2.py", "*_pb2_grpc.py", "*.pb.go", "*.generated.*", "*.snap",
+    )
+    
     # AI processing settings
     ai_temperature: float = 0.2
     ai_max_tokens: int = 2000
+    ai_commit_input_tokens: int = 16_000  # Prompt budget per commit call; larger diffs are split and merged
+    ai_commit_max_chunks: int = 8  # Most parts one commit's diff is split into
+    ai_batch_commits: int = 1  # Consecutive small commits summarized in one request; 1 turns batching off
+    ai_batch_commit_tokens: int = 1000  # Diffs up to this many tokens count as small enough to batch
+    ai_batch_input_tokens: int = 8000  # Diff tokens per batched request
     ai_aggregation_max_tokens: int = 3000
-    ai_timeout: int = 30  # seconds
-    ai_retry_attempts: int = 2
+    ai_aggregation_input_tokens: int = 24_000  # Prompt budget per aggregation node; longer histories reduce as a tree
+    ai_aggregation_workers: int = 4  # Aggregation nodes on the same tree level run in parallel
+    ai_timeout: int = 60  # seconds; deadline for each request attempt, after which it is retried
+    ai_retry_attempts: int = 4  # Retries of a request rejected with a 429 or timed out
+    ai_retry_base_delay: float = 1.0  # seconds; doubled per retry and jittered when there is no Retry-After
+    ai_retry_max_delay: float = 60.0  # seconds
+    aggregate_every_commits: Optional[int] = None  # Refresh root memory.md every N commits
+    aggregate_every_seconds: Optional[float] = None  # ...or every T seconds; always at the end of a run
+    memory_timeline_entries: int = 100  # Recent commits listed in the root memory.md
+    concurrency: int = 1  # Commits summarized at once; results are still written in order
+    extract_prefetch: int = 8  # Commits extracted ahead of summarization
+    retry_failed_commits: bool = True  # Summarize commits that got a fallback memory again on the next run
+    
+    # Client-side rate limits per provider; None leaves a limit to the adaptive concurrency control
+    ai_rate_limits: Dict[str, Dict[str, Optional[int]]] = {
+        "openai": {"requests_per_minute": 500, "tokens_per_minute": 200_000},
+        "openrouter": {"requests_per_minute": 200, "tokens_per_minute": None},
+        "local": {"requests_per_minute": None, "tokens_per_minute": None},
+    }
+    ai_initial_in_flight: int = 4  # Requests in flight to start with; grows by one per round of successes
+    ai_max_in_flight: int = 32
+    ai_backoff_factor: float = 0.5  # In-flight limit multiplier on a 429 or timeout
+    ai_hedge: bool = False  # Send a duplicate of requests slower than recent ones and take the first answer
+    ai_hedge_percentile: float = 0.95  # Latency percentile after which a request is hedged
+    ai_hedge_min_samples: int = 20  # Latencies observed before hedging starts
+    ai_hedge_max_rate: float = 0.1  # Most requests hedged, as a share of all requests
+    
+    # Shared HTTP connection pool for AI calls
+    ai_pool_max_connections: int = 20
+    ai_pool_max_keepalive: int = 10
+    ai_pool_keepalive_expiry: float = 60.0  # seconds
+    
+    # Response cache, keyed by the content of each AI request
+    ai_cache: bool = True
+    ai_cache_dir: Optional[str] = os.getenv("GIT_MEMORY_CACHE_DIR")  # Shared cache instead of .history/cache.db
+    ai_cache_max_bytes: int = 256 * 1024 * 1024
     
     # API configuration
     openai_api_key: Optional[str] = os.getenv("OPENAI_API_KEY")
@@ -37,6 +93,16 @@ class Config:
     
     # Output settings
     history_dir_name: str = ".history"
+    writer_queue_size: int = 64  # Pending writes before the processing loop waits for the disk
+    writer_fsync: bool = True  # fsync each batch of background writes
+    journal_fsync: bool = True  # fsync each journal entry, so stages survive power loss as well as crashes
+    history_layout: str = os.getenv("GIT_MEMORY_LAYOUT", "flat")  # "flat" or "sharded" (.history/ab/cdef.../)
+    storage_backend: str = os.getenv("GIT_MEMORY_STORAGE", "tree")  # "tree" (a directory per commit) or "pack"
+    pack_max_bytes: int = 256 * 1024 * 1024  # Start a new pack file past this size
+    patch_compression: str = os.getenv("GIT_MEMORY_PATCH_COMPRESSION", "none")  # "none", "gzip" or "zstd"
+    patch_compression_level: int = 10  # zstd level
+    patch_dictionary_samples: int = 200  # Patches a zstd dictionary is trained on
+    patch_dictionary_bytes: int = 64 * 1024
     
     @classmethod
     def get_api_key(cls, provider: str) -> Optional[str]:
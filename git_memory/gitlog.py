@@ -0,0 +1,383 @@
+"""Streaming `git log -p` extraction for git-memory."""
+
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional
+
+import git
+
+from .config import Config
+
+# Every commit header starts with this marker. NUL never appears at the start
+# of a text patch line, so it cannot be confused with diff content.
+COMMIT_MARKER = b"\x00commit\x00"
+LOG_FORMAT = "%x00commit%x00%H%x00%P%x00%an%x00%ae%x00%cI%x00%s"
+
+
+class LogCommit:
+    """Commit metadata parsed from a `git log` header.
+
+    Exposes the same attributes as ``git.Commit`` that CommitInfo reads, so
+    streamed commits can be used wherever a GitPython commit is expected.
+    """
+
+    def __init__(self, hexsha: str, parents: List[str], author: git.Actor,
+                 committed_datetime: datetime, summary: str):
+        self.hexsha = hexsha
+        self.parents = parents
+        self.author = author
+        self.committed_datetime = committed_datetime
+        self.summary = summary
+
+
+def parse_log_header(line: bytes) -> LogCommit:
+    """Parse a header line produced by LOG_FORMAT."""
+    fields = line[len(COMMIT_MARKER):].rstrip(b"\n").decode("utf-8", errors="replace").split("\x00")
+    if len(fields) != 6:
+        raise ValueError(f"Malformed git log header: {line[:80]!r}")
+    hexsha, parents, author_name, author_email, date, summary = fields
+    return LogCommit(
+        hexsha=hexsha,
+        parents=parents.split(),
+        author=git.Actor(author_name, author_email),
+        committed_datetime=datetime.fromisoformat(date),
+        summary=summary
+    )
+
+
+class FileStat:
+    """Added/deleted line counts for one file from `git log --numstat`."""
+
+    def __init__(self, path: str, added: Optional[int], deleted: Optional[int]):
+        self.path = path
+        self.added = added
+        self.deleted = deleted
+
+    @property
+    def binary(self) -> bool:
+        """git reports binary files without line counts."""
+        return self.added is None
+
+    @property
+    def lines(self) -> int:
+        return (self.added or 0) + (self.deleted or 0)
+
+
+def _numstat_path(raw: str) -> str:
+    """Resolve numstat rename notation (``a => b``, ``dir/{a => b}/f``) to the new path."""
+    if " => " not in raw:
+        return raw
+    if "{" in raw and "}" in raw:
+        prefix, rest = raw.split("{", 1)
+        inner, suffix = rest.split("}", 1)
+        new = inner.split(" => ", 1)[1]
+        return (prefix + new + suffix).replace("//", "/")
+    return raw.split(" => ", 1)[1]
+
+
+def parse_numstat_line(line: str) -> FileStat:
+    """Parse one ``added<TAB>deleted<TAB>path`` numstat line."""
+    added, deleted, path = line.rstrip("\n").split("\t", 2)
+    if added == "-":
+        return FileStat(_numstat_path(path), None, None)
+    return FileStat(_numstat_path(path), int(added), int(deleted))
+
+
+def git_log_command(repo: git.Repo, rev: str = "HEAD", first_parent: bool = True,
+                    patch: bool = True, stdin: bool = False, numstat: bool = False) -> List[str]:
+    """Build the `git log` command line used by the streaming backend.
+    
+    With ``stdin`` the commits to show are read from standard input in the
+    given order instead of walking ``rev``.
+    """
+    command = [
+        repo.git.GIT_PYTHON_GIT_EXECUTABLE or "git", "-C", str(repo.working_dir),
+        "-c", "core.quotepath=off",
+        "log", "--root", "--no-color", "--no-ext-diff", "--no-textconv",
+        "--format=%x00commit%x00%H" if numstat else f"--format={LOG_FORMAT}",
+    ]
+    if patch:
+        command.append("-p")
+    if numstat:
+        command.extend(["--numstat", "--diff-merges=first-parent"])
+    if first_parent:
+        command.append("--first-parent")
+    if stdin:
+        command.extend(["--no-walk=unsorted", "--stdin"])
+    else:
+        command.extend(["--reverse", rev])
+    return command
+
+
+def iter_rev_list(repo: git.Repo, rev: str = "HEAD", first_parent: Optional[bool] = None) -> Iterator[str]:
+    """Stream commit hashes oldest-first without computing any diffs."""
+    if first_parent is None:
+        first_parent = Config.first_parent
+
+    command = [repo.git.GIT_PYTHON_GIT_EXECUTABLE or "git", "-C", str(repo.working_dir), "rev-list", "--reverse"]
+    if first_parent:
+        command.append("--first-parent")
+    command.append(rev)
+    with subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE) as process:
+        try:
+            for raw in process.stdout:
+                yield raw.strip().decode("ascii")
+            stderr = process.stderr.read()
+        finally:
+            if process.poll() is None:
+                process.kill()
+    if process.returncode != 0:
+        raise git.exc.GitCommandError(command, process.returncode, stderr)
+
+
+def iter_numstat(repo: git.Repo, rev: str = "HEAD", first_parent: Optional[bool] = None,
+                 revs: Optional[List[str]] = None) -> Iterator[tuple[str, List[FileStat]]]:
+    """Stream ``(hexsha, file_stats)`` oldest-first without producing any patch text.
+    
+    When ``revs`` is given, only those commits are examined, in that order.
+    """
+    if first_parent is None:
+        first_parent = Config.first_parent
+    if revs is not None and not revs:
+        return
+
+    command = git_log_command(repo, rev, first_parent, patch=False, numstat=True, stdin=revs is not None)
+    hexsha: Optional[str] = None
+    files: List[FileStat] = []
+    with subprocess.Popen(command, stdin=subprocess.PIPE if revs is not None else None,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE) as process:
+        if revs is not None:
+            process.stdin.write("".join(f"{sha}\n" for sha in revs).encode("ascii"))
+            process.stdin.close()
+        try:
+            for raw in process.stdout:
+                if raw.startswith(COMMIT_MARKER):
+                    if hexsha is not None:
+                        yield hexsha, files
+                    hexsha = raw[len(COMMIT_MARKER):].strip().decode("ascii")
+                    files = []
+                elif raw.strip():
+                    files.append(parse_numstat_line(raw.decode("utf-8", errors="replace")))
+            if hexsha is not None:
+                yield hexsha, files
+            stderr = process.stderr.read()
+        finally:
+            if process.poll() is None:
+                process.kill()
+    if process.returncode != 0:
+        raise git.exc.GitCommandError(command, process.returncode, stderr)
+
+
+def drop_file_sections(diff_text: str, paths: set[str]) -> str:
+    """Remove the patch sections of ``paths`` from a unified diff."""
+    if not paths:
+        return diff_text
+    kept = []
+    keep = True
+    for line in diff_text.splitlines(keepends=True):
+        if line.startswith("diff --git "):
+            header = line.rstrip("\n")
+            keep = not any(header.endswith(f" b/{path}") for path in paths)
+        if keep:
+            kept.append(line)
+    return "".join(kept)
+
+
+def split_sections(lines: List[str], marker: str) -> List[List[str]]:
+    """Split lines before every line starting with ``marker``."""
+    sections: List[List[str]] = []
+    for line in lines:
+        if line.startswith(marker) or not sections:
+            sections.append([])
+        sections[-1].append(line)
+    return sections
+
+
+def _split_lines(lines: List[str], budget: int, count: Callable[[str], int]) -> List[str]:
+    """Cut lines into runs of at most ``budget`` tokens; a single longer line stays whole."""
+    parts, current, total = [], [], 0
+    for line in lines:
+        cost = count(line)
+        if current and total + cost > budget:
+            parts.append("".join(current))
+            current, total = [], 0
+        current.append(line)
+        total += cost
+    if current:
+        parts.append("".join(current))
+    return parts
+
+
+def split_diff(diff_text: str, budget: int, count: Callable[[str], int]) -> List[str]:
+    """Split a unified diff into chunks of at most ``budget`` tokens.
+    
+    Chunks break between files where possible. A file too large for one
+    chunk is split between its hunks, and each part repeats the file header
+    so it still reads as a patch. A single hunk over budget is cut between
+    lines. Consecutive small pieces share a chunk.
+    """
+    pieces: List[tuple[str, int]] = []
+    for file_lines in split_sections(diff_text.splitlines(keepends=True), "diff --git "):
+        section = "".join(file_lines)
+        cost = count(section)
+        if cost <= budget:
+            pieces.append((section, cost))
+            continue
+        header, *hunks = split_sections(file_lines, "@@")
+        if header and header[0].startswith("@@"):
+            hunks, header = [header] + hunks, []
+        header_text = "".join(header)
+        header_cost = count(header_text)
+        for hunk in hunks:
+            hunk_text = "".join(hunk)
+            if header_cost + count(hunk_text) <= budget:
+                pieces.append((header_text + hunk_text, header_cost + count(hunk_text)))
+            else:
+                for part in _split_lines(hunk, max(1, budget - header_cost), count):
+                    pieces.append((header_text + part, header_cost + count(part)))
+    
+    chunks: List[str] = []
+    current, total = "", 0
+    for piece, cost in pieces:
+        if current and total + cost > budget:
+            chunks.append(current)
+            current, total = "", 0
+        current += piece
+        total += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class PatchCollector:
+    """Collect one commit's patch, optionally streaming it straight to disk.
+
+    Lines are counted as they arrive. When ``path`` is set the full patch goes
+    to that file and only the first ``view_bytes`` are kept in memory as the
+    view handed to the LLM.
+    """
+
+    def __init__(self, path: Optional[Path] = None, view_bytes: Optional[int] = None):
+        self.path = path
+        self.view_bytes = view_bytes
+        self.lines = 0
+        self._view: List[bytes] = []
+        self._view_size = 0
+        self._view_lines = 0
+        self._file = None
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(path, "wb")
+
+    def add(self, line: bytes) -> None:
+        """Append one raw patch line."""
+        self.lines += 1
+        if self._file is not None:
+            self._file.write(line)
+        if self.view_bytes is None or self._view_size < self.view_bytes:
+            self._view.append(line)
+            self._view_size += len(line)
+            self._view_lines += 1
+
+    def close(self) -> tuple[str, int]:
+        """Finish the patch and return ``(view_text, total_lines)``."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        view = b"".join(self._view)
+        self._view = []
+        if self.view_bytes is not None and len(view) > self.view_bytes:
+            view = view[:self.view_bytes]
+        view_text = view.decode("utf-8", errors="ignore").rstrip("\n")
+        omitted = self.lines - self._view_lines
+        if self.view_bytes is not None and (omitted > 0 or self._view_size > self.view_bytes):
+            view_text += f"\n... [truncated: {self.lines} lines in total, see diff.patch] ..."
+        return view_text, self.lines
+
+
+def stream_diff(repo: git.Repo, parent: str, hexsha: str, path: Path,
+                view_bytes: Optional[int] = None) -> tuple[str, int]:
+    """Stream `git diff parent hexsha` into ``path`` and return a bounded view."""
+    command = [
+        repo.git.GIT_PYTHON_GIT_EXECUTABLE or "git", "-C", str(repo.working_dir),
+        "diff", "--no-color", "--no-ext-diff", "--no-textconv", parent, hexsha,
+    ]
+    collector = PatchCollector(path, view_bytes)
+    with subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE) as process:
+        for line in process.stdout:
+            collector.add(line)
+        stderr = process.stderr.read()
+    result = collector.close()
+    if process.returncode != 0:
+        raise git.exc.GitCommandError(command, process.returncode, stderr)
+    return result
+
+
+def iter_log_commits(repo: git.Repo, rev: str = "HEAD", first_parent: Optional[bool] = None,
+                     patch_path: Optional[Callable[[str], Path]] = None,
+                     view_bytes: Optional[int] = None,
+                     revs: Optional[List[str]] = None) -> Iterator[tuple[LogCommit, str, int]]:
+    """Stream commits oldest-first from a single `git log -p` process.
+
+    Yields ``(commit, diff_text, diff_lines)`` as soon as each commit's patch
+    has been read, so extraction runs at git's native speed instead of one
+    diff computation per commit. When ``patch_path`` is given, each patch is
+    written to ``patch_path(hexsha)`` while it streams and ``diff_text`` is
+    limited to the first ``view_bytes`` of it. When ``revs`` is given, only
+    those commits are shown, in that order.
+    """
+    if first_parent is None:
+        first_parent = Config.first_parent
+    if revs is not None and not revs:
+        return
+
+    command = git_log_command(repo, rev, first_parent, stdin=revs is not None)
+    process = subprocess.Popen(
+        command,
+        stdin=subprocess.PIPE if revs is not None else None,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+    if revs is not None:
+        # git reads the whole list before it starts writing output
+        process.stdin.write("".join(f"{sha}\n" for sha in revs).encode("ascii"))
+        process.stdin.close()
+    current: Optional[LogCommit] = None
+    collector: Optional[PatchCollector] = None
+    in_patch = False
+
+    def flush() -> tuple[LogCommit, str, int]:
+        diff_text, diff_lines = collector.close()
+        return current, diff_text, diff_lines
+
+    try:
+        for line in process.stdout:
+            if line.startswith(COMMIT_MARKER):
+                if current is not None:
+                    yield flush()
+                current = parse_log_header(line)
+                path = patch_path(current.hexsha) if patch_path else None
+                collector = PatchCollector(path, view_bytes if path else None)
+                in_patch = False
+            elif current is not None:
+                # git separates the header from the patch with a blank line
+                if not in_patch and line == b"\n":
+                    continue
+                in_patch = True
+                collector.add(line)
+
+        if current is not None:
+            yield flush()
+
+        stderr = process.stderr.read()
+        if process.wait() != 0:
+            raise git.exc.GitCommandError(command, process.returncode, stderr)
+    finally:
+        if collector is not None:
+            collector.close()
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+        process.stderr.close()
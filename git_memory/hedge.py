@@ -0,0 +1,165 @@
+"""Per-request deadlines and hedged requests for AI calls."""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Awaitable, Callable, List, Optional, TypeVar
+
+from .config import Config
+
+T = TypeVar("T")
+
+
+class HedgeStats:
+    """How often requests were hedged and how much latency the hedges saved."""
+
+    def __init__(self, requests: int = 0, hedged: int = 0, hedge_wins: int = 0, saved: float = 0.0):
+        self.requests = requests
+        self.hedged = hedged
+        self.hedge_wins = hedge_wins
+        # Seconds between a winning hedge and its original answering, when the original answered at all
+        self.saved = saved
+
+    @property
+    def hedge_rate(self) -> float:
+        return self.hedged / self.requests if self.requests else 0.0
+
+    def since(self, earlier: "HedgeStats") -> "HedgeStats":
+        """Counts accumulated after the ``earlier`` snapshot."""
+        return HedgeStats(self.requests - earlier.requests, self.hedged - earlier.hedged,
+                          self.hedge_wins - earlier.hedge_wins, self.saved - earlier.saved)
+
+    def snapshot(self) -> "HedgeStats":
+        return HedgeStats(self.requests, self.hedged, self.hedge_wins, self.saved)
+
+
+class Hedger:
+    """Run requests with a deadline, duplicating stragglers.
+
+    Every request must answer within Config.ai_timeout seconds or raises
+    TimeoutError. With Config.ai_hedge, a request still unanswered at the
+    Config.ai_hedge_percentile latency of recent requests is sent a second
+    time and whichever answers first wins. Hedging waits for
+    Config.ai_hedge_min_samples latencies, stays under
+    Config.ai_hedge_max_rate of requests and only fires when the ``can_hedge``
+    passed with the request grants the duplicate its rate-limit budget. The loser is left to finish
+    so the latency the hedge saved can be measured.
+    """
+
+    def __init__(self):
+        self.stats = HedgeStats()
+        self._latencies: deque = deque(maxlen=200)
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _hedge_delay(self) -> Optional[float]:
+        """Seconds after which a request is hedged, or None while hedging is off."""
+        if not Config.ai_hedge:
+            return None
+        with self._lock:
+            if len(self._latencies) < Config.ai_hedge_min_samples:
+                return None
+            if self.stats.requests and self.stats.hedged / self.stats.requests >= Config.ai_hedge_max_rate:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * Config.ai_hedge_percentile))]
+
+    def _start_hedge(self, can_hedge: Callable[[], bool]) -> bool:
+        if not can_hedge():
+            return False
+        with self._lock:
+            self.stats.hedged += 1
+        return True
+
+    def _finished(self, latency: float, hedge_won: bool) -> None:
+        with self._lock:
+            self.stats.requests += 1
+            self._latencies.append(latency)
+            if hedge_won:
+                self.stats.hedge_wins += 1
+
+    def _loser_finished(self, finished_at: float, winner_finished_at: float) -> None:
+        with self._lock:
+            self.stats.saved += max(0.0, finished_at - winner_finished_at)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=2 * Config.ai_max_in_flight,
+                                                    thread_name_prefix="git-memory-ai")
+            return self._executor
+
+    def run(self, request: Callable[[], T], can_hedge: Callable[[], bool] = lambda: True) -> T:
+        """Run ``request`` on a worker thread within the deadline, hedging it when it straggles."""
+        deadline = time.monotonic() + Config.ai_timeout
+        pool = self._pool()
+        started = time.monotonic()
+        futures: List[Future] = [pool.submit(request)]
+        delay = self._hedge_delay()
+        if delay is not None and delay < Config.ai_timeout:
+            done, _ = wait(futures, timeout=delay)
+            if not done and self._start_hedge(can_hedge):
+                futures.append(pool.submit(request))
+
+        pending = set(futures)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is not None:
+                    error = error or future.exception()
+                    continue
+                finished_at = time.monotonic()
+                hedge_won = future is not futures[0]
+                self._finished(finished_at - started, hedge_won)
+                if hedge_won:
+                    futures[0].add_done_callback(lambda _: self._loser_finished(time.monotonic(), finished_at))
+                return future.result()
+        if error is not None and not pending:
+            raise error
+        # Abandoned threads end on the client's own timeout
+        raise TimeoutError(f"No response within {Config.ai_timeout}s")
+
+    async def run_async(self, request: Callable[[], Awaitable[T]],
+                        can_hedge: Callable[[], bool] = lambda: True) -> T:
+        """Async variant of ``run``; requests still running at the deadline are cancelled."""
+        deadline = time.monotonic() + Config.ai_timeout
+        started = time.monotonic()
+        tasks: List[asyncio.Future] = [asyncio.ensure_future(request())]
+        delay = self._hedge_delay()
+        if delay is not None and delay < Config.ai_timeout:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and self._start_hedge(can_hedge):
+                tasks.append(asyncio.ensure_future(request()))
+
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, timeout=max(0.0, deadline - time.monotonic()),
+                                               return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+            for task in done:
+                if task.exception() is not None:
+                    error = error or task.exception()
+                    continue
+                finished_at = time.monotonic()
+                hedge_won = task is not tasks[0]
+                self._finished(finished_at - started, hedge_won)
+                def loser_done(loser: asyncio.Future) -> None:
+                    # Retrieving the exception keeps a failed loser from being reported as unhandled
+                    if not loser.cancelled() and loser.exception() is None and hedge_won:
+                        self._loser_finished(time.monotonic(), finished_at)
+
+                for loser in pending:
+                    loser.add_done_callback(loser_done)
+                return task.result()
+        for task in pending:
+            task.cancel()
+        if error is not None and not pending:
+            raise error
+        raise TimeoutError(f"No response within {Config.ai_timeout}s")
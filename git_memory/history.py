@@ -1,63 +1,245 @@
 """Git history processing and .history directory generation."""
 
+import asyncio
 import os
+import time
+from collections import deque
+from datetime import datetime
+from functools import partial
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator, Iterable, Iterator
 import git
+from pydantic import BaseModel, ValidationError
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
 from rich.table import Table
 from rich.panel import Panel
 
 from .config import Config
-from .ai import summarize_diff, generate_project_memory, CommitMemory, ProjectMemory
+from .gitlog import iter_log_commits, iter_numstat, iter_rev_list, stream_diff, drop_file_sections, FileStat
+from .ledger import SkipLedger
+from .index import HistoryIndex, PROCESSED, FAILED
+from .storage import (commit_dir, commit_location, export_tree, migrate_layout, read_commit_file,
+                      store_commit_files, write_atomic)
+from .cache import open_response_cache
+from .compression import (ZSTD, compress_patch, compress_patch_file, patch_codec, patch_name,
+                          train_patch_dictionary)
+from .journal import Journal, EXTRACTED, WRITTEN
+from .project_state import ProjectState
+from .writer import BackgroundWriter, note_write, run_write
+from .pipeline import StageStats, prefetch, stage_rows
+from .compact import CompactionStats, compact_for_ai
+from .hedge import HedgeStats
+from .ratelimit import rate_limiter
+from .watermark import Watermark, head_branch
+from .ai import (summarize_diff, summarize_diff_async, summarize_diffs, summarize_diffs_async, generate_project_memory, fold_project_memory,
+                 response_usage, estimate_tokens, AISession, CommitMemory, ProjectMemory)
 
 console = Console()
 
+# Hash of git's empty tree, used to diff root commits
+EMPTY_TREE_SHA = "4b825dc642cb6eb9a060e54bf8d69288fbee4904"
+
 
 class CommitInfo:
     """Information about a processed commit."""
     
-    def __init__(self, commit: git.Commit, diff_lines: int, diff_text: str):
+    def __init__(self, commit: git.Commit, diff_lines: int, diff_text: str,
+                 diff_path: Optional[Path] = None):
         self.hash = commit.hexsha
         self.short_hash = commit.hexsha[:7]
         self.message = commit.summary
         self.author = commit.author.name
         self.date = commit.committed_datetime
+        # git.Commit parents are Commit objects, streamed LogCommit parents are hashes
+        parents = commit.parents if isinstance(commit.parents, (list, tuple)) else []
+        self.parent = getattr(parents[0], "hexsha", parents[0]) if parents else None
         self.diff_lines = diff_lines
         self.diff_text = diff_text
+        # Set when the full patch was streamed to disk and diff_text is only a view
+        self.diff_path = diff_path
+        # Binary and huge files kept out of the summarizer's view
+        self.excluded_files: List[FileStat] = []
+        # Compacted diff for the summarizer, set by prepare_ai_diff
+        self.ai_diff_text: Optional[str] = None
+    
+    def release_diff(self) -> None:
+        """Drop the patch text once it has been written and summarized."""
+        self.diff_text = ""
+        self.ai_diff_text = None
+
+
+class CommitStats:
+    """Compact per-commit statistics kept for the run summary."""
+    
+    __slots__ = ("hash", "short_hash", "message", "date", "diff_lines")
+    
+    def __init__(self, commit_info: CommitInfo):
+        self.hash = commit_info.hash
+        self.short_hash = commit_info.short_hash
+        self.message = commit_info.message
+        self.date = commit_info.date
+        self.diff_lines = commit_info.diff_lines
+
 
+class CommitRecord(BaseModel):
+    """Machine-readable sidecar stored as .history/<commit_hash>/memory.json."""
+    hash: str
+    message: str
+    author: str
+    date: datetime
+    diff_lines: int
+    memory: CommitMemory
+    
+    @property
+    def short_hash(self) -> str:
+        return self.hash[:7]
+    
+    @classmethod
+    def from_commit(cls, commit_info: CommitInfo, commit_memory: CommitMemory) -> "CommitRecord":
+        return cls(hash=commit_info.hash, message=commit_info.message, author=commit_info.author,
+                   date=commit_info.date, diff_lines=commit_info.diff_lines, memory=commit_memory)
 
-def get_commit_diff(repo: git.Repo, commit: git.Commit) -> tuple[str, int]:
-    """Get diff text and line count for a commit."""
+
+def get_commit_diff(repo: git.Repo, commit: git.Commit, diff_file: Optional[Path] = None) -> tuple[str, int]:
+    """Get diff text and line count for a commit.
+    
+    When ``diff_file`` is given the patch is streamed straight into it and only
+    a bounded view of Config.diff_view_bytes is returned as the diff text.
+    """
     try:
+        if diff_file is not None:
+            parent = commit.parents[0].hexsha if commit.parents else EMPTY_TREE_SHA
+            return stream_diff(repo, parent, commit.hexsha, diff_file, Config.diff_view_bytes)
+        
         if commit.parents:
             # Compare with first parent
             diff_index = commit.diff(commit.parents[0], create_patch=True)
-            diff_text = ""
+            diff_parts = []
             for diff_item in diff_index:
                 if hasattr(diff_item, 'diff'):
                     if isinstance(diff_item.diff, bytes):
-                        diff_text += diff_item.diff.decode('utf-8', errors='ignore')
+                        diff_parts.append(diff_item.diff.decode('utf-8', errors='ignore'))
                     else:
-                        diff_text += str(diff_item.diff)
+                        diff_parts.append(str(diff_item.diff))
+            diff_text = "".join(diff_parts)
         else:
             # Initial commit - diff against empty tree
-            empty_tree = "4b825dc642cb6eb9a060e54bf8d69288fbee4904"
             try:
-                diff_output = repo.git.diff(empty_tree, commit.hexsha)
+                diff_output = repo.git.diff(EMPTY_TREE_SHA, commit.hexsha)
                 diff_text = diff_output
             except git.exc.GitCommandError:
                 diff_text = f"Initial commit: {commit.summary}"
         
-        diff_lines = len(diff_text.splitlines()) if diff_text else 0
-        return diff_text, diff_lines
+        return diff_text, _count_lines(diff_text)
         
     except Exception as e:
         console.print(f"[yellow]Warning: Could not generate diff for commit {commit.hexsha[:7]}: {e}[/]")
         return "", 0
 
 
+def _count_lines(text: str) -> int:
+    """Count lines without splitting the text into a list."""
+    if not text:
+        return 0
+    return text.count("\n") + (0 if text.endswith("\n") else 1)
+
+
+class PrefilterResult:
+    """Outcome of the numstat pre-pass over the commit walk."""
+    
+    def __init__(self):
+        self.total = 0
+        self.selected: List[str] = []
+        self.skipped: List[tuple[str, int]] = []
+        self.ledger_skipped = 0
+        self.excluded: Dict[str, List[FileStat]] = {}
+        # Added plus deleted lines of each selected commit, the unit of diff_lines
+        self.changed_lines: Dict[str, int] = {}
+
+
+def prefilter_commits(repo: git.Repo, processed_hashes: set[str], min_diff_lines: Optional[int],
+                      first_parent: Optional[bool] = None,
+                      ledger: Optional[SkipLedger] = None, rev: str = "HEAD") -> PrefilterResult:
+    """Decide which commits to process from `git log --numstat`, before any patch is produced.
+    
+    Commits whose added plus deleted lines fall below ``min_diff_lines`` are
+    skipped and recorded in ``ledger``. Commits already in the ledger are
+    decided from their recorded line count without any git work, so a lowered
+    threshold re-admits exactly the commits that now qualify. The changed
+    lines of selected commits are kept as their diff_lines. Binary files and
+    files with more than Config.huge_file_lines changed lines are recorded per
+    commit so they never reach the summarizer.
+    """
+    result = PrefilterResult()
+    pending: List[str] = []
+    readmitted: List[str] = []
+    for hexsha in iter_rev_list(repo, rev, first_parent=first_parent):
+        result.total += 1
+        if hexsha in processed_hashes:
+            continue
+        known_lines = ledger.changed_lines(hexsha) if ledger is not None else None
+        if known_lines is not None:
+            if min_diff_lines is not None and known_lines < min_diff_lines:
+                result.ledger_skipped += 1
+                continue
+            readmitted.append(hexsha)
+        pending.append(hexsha)
+    
+    for hexsha, files in iter_numstat(repo, first_parent=first_parent, revs=pending):
+        changed_lines = sum(f.lines for f in files)
+        if min_diff_lines is not None and changed_lines < min_diff_lines:
+            result.skipped.append((hexsha, changed_lines))
+            continue
+        
+        result.selected.append(hexsha)
+        result.changed_lines[hexsha] = changed_lines
+        excluded = [f for f in files if f.binary or f.lines > Config.huge_file_lines]
+        if excluded:
+            result.excluded[hexsha] = excluded
+    
+    if ledger is not None:
+        ledger.forget(readmitted)
+        if min_diff_lines is not None:
+            ledger.record(result.skipped, min_diff_lines)
+    return result
+
+
+def build_commit_info(repo: git.Repo, commit: Any, history_dir: Path) -> CommitInfo:
+    """Turn a commit from either diff backend into a CommitInfo."""
+    if isinstance(commit, CommitInfo):
+        # Streamed commits arrive with their diff already extracted
+        return commit
+    if Config.stream_patches:
+        diff_file = diff_patch_path(history_dir, commit.hexsha)
+        diff_text, diff_lines = get_commit_diff(repo, commit, diff_file)
+        return CommitInfo(commit, diff_lines, diff_text, diff_file if diff_file.exists() else None)
+    diff_text, diff_lines = get_commit_diff(repo, commit)
+    return CommitInfo(commit, diff_lines, diff_text)
+
+
+def iter_log_commit_infos(repo: git.Repo, revs: List[str],
+                          history_dir: Optional[Path] = None) -> Iterator[CommitInfo]:
+    """Stream the given commits, in order, from a single `git log -p` process.
+    
+    With Config.stream_patches and a ``history_dir``, patches are written to
+    their diff.patch files during extraction.
+    """
+    patch_path = None
+    if Config.stream_patches and history_dir is not None:
+        patch_path = partial(diff_patch_path, history_dir)
+    
+    for commit, diff_text, diff_lines in iter_log_commits(repo, revs=revs, patch_path=patch_path,
+                                                          view_bytes=Config.diff_view_bytes):
+        diff_path = patch_path(commit.hexsha) if patch_path else None
+        yield CommitInfo(commit, diff_lines, diff_text, diff_path)
+
+
+def diff_patch_path(history_dir: Path, commit_hash: str) -> Path:
+    """Path of the stored patch for a commit."""
+    return commit_dir(history_dir, commit_hash) / "diff.patch"
+
+
 def create_history_structure(repo_path: Path) -> Path:
     """Create .history directory structure."""
     history_dir = repo_path / Config.history_dir_name
@@ -65,20 +247,156 @@ def create_history_structure(repo_path: Path) -> Path:
     return history_dir
 
 
-def save_commit_files(history_dir: Path, commit_info: CommitInfo, model_provider: str, model: str) -> CommitMemory:
-    """Save commit files to .history/<commit_hash>/ and return AI-generated memory."""
-    commit_dir = history_dir / commit_info.hash
-    commit_dir.mkdir(exist_ok=True)
+def migrate_history_layout(repo_path: Path, layout: str) -> int:
+    """Move an existing .history to ``layout`` and return how many commits moved."""
+    history_dir = repo_path / Config.history_dir_name
+    if not history_dir.is_dir():
+        raise ValueError(f"No {Config.history_dir_name} directory in {repo_path}")
+    
+    index = HistoryIndex(history_dir)
+    try:
+        moved = migrate_layout(history_dir, layout)
+        index.update_paths({commit_hash: path.relative_to(history_dir).as_posix()
+                            for commit_hash, path in moved.items()})
+    finally:
+        index.close()
+    return len(moved)
+
+
+def export_history_tree(repo_path: Path) -> int:
+    """Write packed commits of an existing .history back as directories and return how many."""
+    history_dir = repo_path / Config.history_dir_name
+    if not history_dir.is_dir():
+        raise ValueError(f"No {Config.history_dir_name} directory in {repo_path}")
+    
+    index = HistoryIndex(history_dir)
+    try:
+        exported = export_tree(history_dir)
+        index.update_paths({commit_hash: path.relative_to(history_dir).as_posix()
+                            for commit_hash, path in exported.items()})
+    finally:
+        index.close()
+    return len(exported)
+
+
+def save_commit_files(history_dir: Path, commit_info: CommitInfo, model_provider: str, model: str,
+                      journal: Optional[Journal] = None, writer: Optional[BackgroundWriter] = None) -> CommitMemory:
+    """Save commit files to .history/<commit_hash>/ and return AI-generated memory.
     
-    # Save diff.patch
-    diff_file = commit_dir / "diff.patch"
-    with open(diff_file, "w", encoding="utf-8") as f:
-        f.write(commit_info.diff_text)
+    With a ``journal``, a summary journaled by an interrupted run is reused
+    and a new one is journaled before the files are written. With a
+    ``writer``, the files are written in the background.
+    """
+    commit_memory = journal.memory(commit_info.hash) if journal is not None else None
+    if commit_memory is None:
+        commit_memory = summarize_commit_info(commit_info, model_provider, model)
+        if journal is not None:
+            journal.record_summarized(commit_info.hash, commit_memory)
+    run_write(writer, write_commit_files, history_dir, commit_info, commit_memory, model_provider, model)
+    return commit_memory
+
+
+def prepare_ai_diff(commit_info: CommitInfo, model: Optional[str] = None,
+                    stats: Optional[CompactionStats] = None) -> None:
+    """Compute the diff text sent to the summarizer, ahead of summarization.
     
-    # Generate AI-powered memory
+    Binary and huge files are dropped and the rest is compacted; prompt
+    tokens before and after compaction, counted for ``model``, are added to
+    ``stats``.
+    """
+    diff_text = drop_file_sections(commit_info.diff_text, {f.path for f in commit_info.excluded_files})
+    commit_info.ai_diff_text = compact_for_ai(diff_text, partial(estimate_tokens, model=model), stats)
+
+
+def save_commit_batch(history_dir: Path, commit_infos: List[CommitInfo], model_provider: str, model: str,
+                      journal: Optional[Journal] = None,
+                      writer: Optional[BackgroundWriter] = None) -> List[CommitMemory]:
+    """Save the files of commits summarized together in one request, as save_commit_files does for one."""
+    if len(commit_infos) == 1:
+        return [save_commit_files(history_dir, commit_infos[0], model_provider, model, journal, writer)]
+    commit_memories = summarize_commit_batch(commit_infos, model_provider, model)
+    for commit_info, commit_memory in zip(commit_infos, commit_memories):
+        if journal is not None:
+            journal.record_summarized(commit_info.hash, commit_memory)
+        run_write(writer, write_commit_files, history_dir, commit_info, commit_memory, model_provider, model)
+    return commit_memories
+
+
+def batch_small_commits(commit_infos: Iterator[CommitInfo], batch_size: int, model: Optional[str] = None,
+                        journal: Optional[Journal] = None) -> Iterator[List[CommitInfo]]:
+    """Group consecutive small commits to be summarized in one request each.
+    
+    Commits whose diff for the AI is over Config.ai_batch_commit_tokens, and
+    commits with a journaled summary, travel alone. Small ones are grouped
+    up to ``batch_size`` commits and Config.ai_batch_input_tokens.
+    """
+    batch: List[CommitInfo] = []
+    total = 0
+    for commit_info in commit_infos:
+        tokens = 0
+        small = batch_size > 1 and (journal is None or journal.memory(commit_info.hash) is None)
+        if small:
+            tokens = estimate_tokens(_diff_for_ai(commit_info), model)
+            small = tokens <= Config.ai_batch_commit_tokens
+        if batch and (not small or len(batch) >= batch_size or total + tokens > Config.ai_batch_input_tokens):
+            yield batch
+            batch, total = [], 0
+        if not small:
+            yield [commit_info]
+            continue
+        batch.append(commit_info)
+        total += tokens
+    if batch:
+        yield batch
+
+
+def _diff_for_ai(commit_info: CommitInfo) -> str:
+    """Diff text sent to the summarizer."""
+    if commit_info.ai_diff_text is None:
+        prepare_ai_diff(commit_info)
+    return commit_info.ai_diff_text
+
+
+def fallback_commit_memory(commit_info: CommitInfo) -> CommitMemory:
+    """Memory used when the AI client cannot be reached at all."""
+    from .ai import CommitChange
+    memory = CommitMemory(
+        added=[CommitChange(
+            description=f"Changes from commit: {commit_info.message}",
+            files=[],
+            impact="moderate" if commit_info.diff_lines > 50 else "minor"
+        )],
+        removed=[],
+        changed=[],
+        summary=commit_info.message,
+        technical_details=f"Fallback memory - {commit_info.diff_lines} lines changed"
+    )
+    memory._fallback = True
+    return memory
+
+
+def summarize_commit_info(commit_info: CommitInfo, model_provider: str, model: str) -> CommitMemory:
+    """Generate AI-powered memory for a commit, falling back on errors."""
     try:
         commit_memory = summarize_diff(
-            diff_text=commit_info.diff_text,
+            diff_text=_diff_for_ai(commit_info),
+            commit_message=commit_info.message,
+            commit_hash=commit_info.hash,
+            provider=model_provider,
+            model=model
+        )
+        console.print(f"  [green]→ AI analysis complete for {commit_info.short_hash}[/]")
+    except Exception as e:
+        console.print(f"  [yellow]→ AI analysis failed for {commit_info.short_hash}: {e}[/]")
+        commit_memory = fallback_commit_memory(commit_info)
+    return commit_memory
+
+
+async def summarize_commit_info_async(commit_info: CommitInfo, model_provider: str, model: str) -> CommitMemory:
+    """Async variant of summarize_commit_info."""
+    try:
+        commit_memory = await summarize_diff_async(
+            diff_text=_diff_for_ai(commit_info),
             commit_message=commit_info.message,
             commit_hash=commit_info.hash,
             provider=model_provider,
@@ -87,23 +405,116 @@ def save_commit_files(history_dir: Path, commit_info: CommitInfo, model_provider
         console.print(f"  [green]→ AI analysis complete for {commit_info.short_hash}[/]")
     except Exception as e:
         console.print(f"  [yellow]→ AI analysis failed for {commit_info.short_hash}: {e}[/]")
-        # Create fallback memory
-        from .ai import CommitChange
-        commit_memory = CommitMemory(
-            added=[CommitChange(
-                description=f"Changes from commit: {commit_info.message}",
-                files=[],
-                impact="moderate" if commit_info.diff_lines > 50 else "minor"
-            )],
-            removed=[],
-            changed=[],
-            summary=commit_info.message,
-            technical_details=f"Fallback memory - {commit_info.diff_lines} lines changed"
+        commit_memory = fallback_commit_memory(commit_info)
+    return commit_memory
+
+
+def summarize_commit_batch(commit_infos: List[CommitInfo], model_provider: str, model: str) -> List[CommitMemory]:
+    """Generate AI-powered memories for several small commits in one request, falling back on errors."""
+    try:
+        commit_memories = summarize_diffs(
+            [(_diff_for_ai(commit_info), commit_info.message, commit_info.hash) for commit_info in commit_infos],
+            provider=model_provider,
+            model=model
+        )
+        console.print(f"  [green]→ AI analysis complete for {len(commit_infos)} commits in one request[/]")
+    except Exception as e:
+        console.print(f"  [yellow]→ AI analysis failed for {len(commit_infos)} batched commits: {e}[/]")
+        commit_memories = [fallback_commit_memory(commit_info) for commit_info in commit_infos]
+    return commit_memories
+
+
+async def summarize_commit_batch_async(commit_infos: List[CommitInfo], model_provider: str,
+                                       model: str) -> List[CommitMemory]:
+    """Async variant of summarize_commit_batch."""
+    try:
+        commit_memories = await summarize_diffs_async(
+            [(_diff_for_ai(commit_info), commit_info.message, commit_info.hash) for commit_info in commit_infos],
+            provider=model_provider,
+            model=model
         )
+        console.print(f"  [green]→ AI analysis complete for {len(commit_infos)} commits in one request[/]")
+    except Exception as e:
+        console.print(f"  [yellow]→ AI analysis failed for {len(commit_infos)} batched commits: {e}[/]")
+        commit_memories = [fallback_commit_memory(commit_info) for commit_info in commit_infos]
+    return commit_memories
+
+
+async def summarize_in_order(commit_infos: Iterator[CommitInfo], concurrency: int,
+                             model_provider: str, model: str,
+                             journal: Optional[Journal] = None,
+                             stats: Optional[StageStats] = None,
+                             batch_size: int = 1) -> AsyncIterator[tuple[CommitInfo, CommitMemory]]:
+    """Keep up to ``concurrency`` summarizations in flight, yielding results in commit order.
+    
+    With a ``journal``, journaled summaries are reused and new ones are
+    journaled as soon as they complete, even before their turn to be written.
+    With ``batch_size`` above 1, consecutive small commits share one request.
+    Time each summarization takes is added to ``stats``.
+    """
+    async def summarize(commit_info: CommitInfo) -> CommitMemory:
+        start = time.perf_counter()
+        commit_memory = journal.memory(commit_info.hash) if journal is not None else None
+        if commit_memory is None:
+            commit_memory = await summarize_commit_info_async(commit_info, model_provider, model)
+            if journal is not None:
+                journal.record_summarized(commit_info.hash, commit_memory)
+        if stats is not None:
+            stats.add(busy=time.perf_counter() - start, items=1)
+        return commit_memory
+    
+    async def summarize_batch(batch: List[CommitInfo]) -> List[CommitMemory]:
+        if len(batch) == 1:
+            return [await summarize(batch[0])]
+        start = time.perf_counter()
+        commit_memories = await summarize_commit_batch_async(batch, model_provider, model)
+        if journal is not None:
+            for commit_info, commit_memory in zip(batch, commit_memories):
+                journal.record_summarized(commit_info.hash, commit_memory)
+        if stats is not None:
+            stats.add(busy=time.perf_counter() - start, items=len(batch))
+        return commit_memories
+    
+    batches = batch_small_commits(commit_infos, batch_size, model, journal)
+    in_flight: deque[tuple[List[CommitInfo], asyncio.Task]] = deque()
+    exhausted = False
+    
+    while True:
+        while not exhausted and len(in_flight) < concurrency:
+            # Extraction reads from a git subprocess, so keep it off the event loop
+            batch = await asyncio.to_thread(next, batches, None)
+            if batch is None:
+                exhausted = True
+                break
+            task = asyncio.create_task(summarize_batch(batch))
+            in_flight.append((batch, task))
+        
+        if not in_flight:
+            return
+        batch, task = in_flight.popleft()
+        for commit_info, commit_memory in zip(batch, await task):
+            yield commit_info, commit_memory
+
+
+def write_commit_files(history_dir: Path, commit_info: CommitInfo, commit_memory: CommitMemory,
+                       model_provider: str, model: str) -> None:
+    """Store diff.patch, memory.md, memory.json and structure.mmd with the configured backend."""
+    files = {}
+    
+    # Save diff.patch unless it was already streamed to disk during extraction
+    codec = patch_codec()
+    diff_file = diff_patch_path(history_dir, commit_info.hash)
+    streamed_patch = commit_info.diff_path if commit_info.diff_path == diff_file else None
+    if streamed_patch is not None:
+        streamed_patch = compress_patch_file(history_dir, streamed_patch, codec)
+    else:
+        files[patch_name(codec)] = compress_patch(history_dir, commit_info.diff_text.encode("utf-8"), codec)
+    
+    # Save the structured memory for later aggregation without the AI
+    files["memory.json"] = CommitRecord.from_commit(commit_info, commit_memory).model_dump_json()
     
     # Save AI-generated memory.md
-    memory_file = commit_dir / "memory.md"
-    memory_content = f"""# Commit Memory: {commit_info.short_hash}
+    files["memory.md"] = f"""# Commit Memory: {commit_info.short_hash}
 
 **Commit:** {commit_info.hash}
 **Author:** {commit_info.author}
@@ -126,26 +537,35 @@ def save_commit_files(history_dir: Path, commit_info: CommitInfo, model_provider
 
 ## Technical Details
 {commit_memory.technical_details if commit_memory.technical_details else 'No additional technical details.'}
-
+{_format_excluded_files(commit_info.excluded_files)}
 ---
 *Generated by git-memory v{Config.version} using {model_provider}/{model}*
 """
-    with open(memory_file, "w", encoding="utf-8") as f:
-        f.write(memory_content)
     
     # Save placeholder structure.mmd (TODO: integrate with AI)
-    structure_file = commit_dir / "structure.mmd"
-    structure_content = f"""graph TD
+    files["structure.mmd"] = f"""graph TD
     A["{commit_info.short_hash}"] --> B["Commit: {commit_info.message[:50]}..."]
     B --> C["{commit_info.diff_lines} lines changed"]
     
     %% Structure diagram generation coming soon
     %% Will be replaced with AI-generated structure diagrams
 """
-    with open(structure_file, "w", encoding="utf-8") as f:
-        f.write(structure_content)
     
-    return commit_memory
+    store_commit_files(history_dir, commit_info.hash, files, streamed_patch)
+
+
+def _format_history_entry(commit_info: CommitInfo) -> str:
+    """Format one commit's section of history.md."""
+    entry = f"## Commit {commit_info.short_hash}: {commit_info.message}\n\n"
+    entry += f"**Author:** {commit_info.author}\n"
+    entry += f"**Date:** {commit_info.date.strftime('%Y-%m-%d %H:%M:%S')}\n"
+    entry += f"**Lines changed:** {commit_info.diff_lines}\n\n"
+    entry += "```diff\n"
+    entry += commit_info.diff_text[:1000]  # Truncate for readability
+    if len(commit_info.diff_text) > 1000:
+        entry += "\n... [truncated] ..."
+    entry += "\n```\n\n---\n\n"
+    return entry
 
 
 def save_aggregated_files(history_dir: Path, processed_commits: List[CommitInfo], 
@@ -157,19 +577,36 @@ def save_aggregated_files(history_dir: Path, processed_commits: List[CommitInfo]
     history_content += f"Generated by git-memory v{Config.version}\n\n"
     
     for commit_info in processed_commits:
-        history_content += f"## Commit {commit_info.short_hash}: {commit_info.message}\n\n"
-        history_content += f"**Author:** {commit_info.author}\n"
-        history_content += f"**Date:** {commit_info.date.strftime('%Y-%m-%d %H:%M:%S')}\n"
-        history_content += f"**Lines changed:** {commit_info.diff_lines}\n\n"
-        history_content += "```diff\n"
-        history_content += commit_info.diff_text[:1000]  # Truncate for readability
-        if len(commit_info.diff_text) > 1000:
-            history_content += "\n... [truncated] ..."
-        history_content += "\n```\n\n---\n\n"
+        history_content += _format_history_entry(commit_info)
     
     with open(history_dir / "history.md", "w", encoding="utf-8") as f:
         f.write(history_content)
     
+    save_project_memory(history_dir, processed_commits, commit_memories, model_provider, model)
+
+
+def append_history_entry(history_dir: Path, commit_info: CommitInfo) -> None:
+    """Append one commit to history.md, creating the file on first use."""
+    history_file = history_dir / "history.md"
+    
+    if history_file.exists():
+        with open(history_file, "a", encoding="utf-8") as f:
+            f.write(f"\n{_format_history_entry(commit_info)}")
+        note_write(history_file)
+    else:
+        history_content = "# Git History\n\n"
+        history_content += f"Generated by git-memory v{Config.version}\n\n"
+        history_content += _format_history_entry(commit_info)
+        
+        write_atomic(history_file, history_content)
+
+
+def save_project_memory(history_dir: Path, processed_commits: List[Any],
+                        commit_memories: List[CommitMemory], model_provider: str, model: str) -> None:
+    """Write the root memory.md and structure.mmd from an AI project analysis.
+    
+    ``processed_commits`` may be CommitInfo or CommitStats objects.
+    """
     # Generate AI-powered aggregated memory
     try:
         project_memory = generate_project_memory(
@@ -190,6 +627,75 @@ def save_aggregated_files(history_dir: Path, processed_commits: List[CommitInfo]
             next_steps=["Complete AI integration", "Improve error handling"]
         )
     
+    write_project_memory_files(
+        history_dir, project_memory, commit_memories, model_provider, model,
+        total_commits=len(processed_commits),
+        total_lines=sum(c.diff_lines for c in processed_commits),
+        memories_generated=len(commit_memories),
+        timeline=_format_commit_timeline(processed_commits, commit_memories)
+    )
+
+
+def update_project_memory(history_dir: Path, new_commits: List[Any], new_memories: List[CommitMemory],
+                          model_provider: str, model: str, recounted: Iterable[str] = (),
+                          writer: Optional[BackgroundWriter] = None) -> None:
+    """Fold new commits into the persisted project memory and rewrite the root files.
+    
+    Only ``new_commits`` are sent to the AI, together with the memory stored
+    by earlier runs in ProjectState. Commits in ``recounted`` are already
+    included in the totals and timeline and are only folded in again. With
+    a ``writer``, the state and root files are written in the background.
+    """
+    if writer is not None:
+        # The stored state must include every refresh queued before this one
+        writer.flush()
+    state = ProjectState(history_dir)
+    recounted = set(recounted)
+    counted = [(c, m) for c, m in zip(new_commits, new_memories) if c.hash not in recounted]
+    counted_commits = [c for c, _ in counted]
+    counted_memories = [m for _, m in counted]
+    total_commits = state.total_commits + len(counted_commits)
+    
+    try:
+        project_memory = fold_project_memory(
+            previous=state.memory,
+            commit_memories=new_memories,
+            total_commits=total_commits,
+            provider=model_provider,
+            model=model
+        )
+        state.memory = project_memory
+        console.print(f"[green]→ AI project analysis complete[/]")
+    except Exception as e:
+        console.print(f"[yellow]→ AI project analysis failed: {e}[/]")
+        # Keep the stored memory for the next run to fold into
+        project_memory = state.memory or ProjectMemory(
+            major_features=["Feature extraction failed - using fallback"],
+            architecture_evolution=["Architecture analysis failed - using fallback"],
+            key_decisions=["Decision analysis failed - using fallback"],
+            current_state=f"Project with {total_commits} commits analyzed",
+            next_steps=["Complete AI integration", "Improve error handling"]
+        )
+    
+    timeline = _format_commit_timeline(counted_commits, counted_memories).splitlines() if counted_commits else []
+    state.add_commits(len(counted_commits), sum(c.diff_lines for c in counted_commits), len(counted_memories), timeline)
+    run_write(writer, state.save)
+    
+    run_write(
+        writer, write_project_memory_files,
+        history_dir, project_memory, new_memories, model_provider, model,
+        total_commits=state.total_commits,
+        total_lines=state.total_lines,
+        memories_generated=state.memories_generated,
+        timeline="\n".join(state.timeline) or "*No commits processed*"
+    )
+
+
+def write_project_memory_files(history_dir: Path, project_memory: ProjectMemory,
+                               commit_memories: List[CommitMemory], model_provider: str, model: str,
+                               total_commits: int, total_lines: int, memories_generated: int,
+                               timeline: str) -> None:
+    """Render the root memory.md and structure.mmd."""
     # Generate memory.md (AI-powered aggregated memories)
     memory_content = f"""# Project Memory
 
@@ -211,149 +717,157 @@ Generated by git-memory v{Config.version} using {model_provider}/{model}
 {_format_list_items(project_memory.next_steps)}
 
 ## Commit Statistics
-- **Total commits processed:** {len(processed_commits)}
-- **Total lines changed:** {sum(c.diff_lines for c in processed_commits)}
-- **AI memories generated:** {len(commit_memories)}
+- **Total commits processed:** {total_commits}
+- **Total lines changed:** {total_lines}
+- **AI memories generated:** {memories_generated}
 
 ## Commit Timeline
-{_format_commit_timeline(processed_commits, commit_memories)}
+{timeline}
 """
     
-    with open(history_dir / "memory.md", "w", encoding="utf-8") as f:
-        f.write(memory_content)
+    write_atomic(history_dir / "memory.md", memory_content)
     
     # Generate AI-enhanced structure diagram
     from .ai import generate_diagram
     structure_content = generate_diagram(commit_memories, project_memory)
     
-    with open(history_dir / "structure.mmd", "w", encoding="utf-8") as f:
-        f.write(structure_content)
+    write_atomic(history_dir / "structure.mmd", structure_content)
 
 
-def get_processed_commits(history_dir: Path) -> set[str]:
-    """Get set of already processed commit hashes."""
-    processed = set()
-    if history_dir.exists():
-        for item in history_dir.iterdir():
-            if item.is_dir() and len(item.name) == 40:  # Git commit hash length
-                processed.add(item.name)
-    return processed
+def get_processed_commits(history_dir: Path, candidates: Optional[Iterable[str]] = None) -> set[str]:
+    """Get set of already processed commit hashes.
+    
+    Answered from the history index. With ``candidates`` only those commits
+    are checked.
+    """
+    if not history_dir.exists():
+        return set()
+    index = HistoryIndex(history_dir)
+    try:
+        return index.processed_hashes(candidates)
+    finally:
+        index.close()
 
 
-def load_existing_memories(history_dir: Path, processed_hashes: set[str]) -> List[CommitMemory]:
-    """Load existing commit memories from processed commits."""
-    memories = []
-    # TODO: Implement loading from existing memory.md files
-    # For now, return empty list - will be enhanced when needed
-    return memories
+def iter_commit_records(history_dir: Path, hashes: Iterable[str]) -> Iterator[CommitRecord]:
+    """Stream the memory.json sidecars of ``hashes`` in the given order.
+    
+    Commits without a sidecar, such as those processed by older versions,
+    are skipped.
+    """
+    for commit_hash in hashes:
+        data = read_commit_file(history_dir, commit_hash, "memory.json")
+        if data is None:
+            continue
+        try:
+            yield CommitRecord.model_validate_json(data)
+        except ValidationError:
+            console.print(f"  [yellow]→ Ignoring unreadable memory.json for {commit_hash[:7]}[/]")
 
 
-def update_aggregated_files(history_dir: Path, new_commit_info: CommitInfo, 
-                           new_commit_memory: CommitMemory, model_provider: str, model: str) -> None:
-    """Update root-level memory.md and structure.mmd files incrementally."""
-    
-    # Load existing aggregated memory if it exists
-    memory_file = history_dir / "memory.md"
-    existing_memories = []
+def load_existing_memories(history_dir: Path, processed_hashes: Iterable[str]) -> List[CommitMemory]:
+    """Load existing commit memories from processed commits, in the order given."""
+    return [record.memory for record in iter_commit_records(history_dir, processed_hashes)]
+
+
+class AggregationScheduler:
+    """Decide when the root project memory is regenerated during a run.
     
-    if memory_file.exists():
-        # TODO: Parse existing memory file to extract commit memories
-        # For now, we'll regenerate - can be optimized later
-        pass
+    history.md is appended for every commit, but the AI project analysis that
+    rewrites memory.md and structure.mmd only runs every ``every_commits``
+    commits, every ``every_seconds`` seconds, and on the final flush. With
+    neither set it runs once at the end of the run. Each run folds only the
+    commits that arrived since the previous one into the stored memory, and
+    records them as aggregated in the ``journal`` if one is given. File
+    writes go through ``writer`` when one is given.
+    """
     
-    # Update history.md incrementally
-    history_file = history_dir / "history.md"
+    def __init__(self, history_dir: Path, model_provider: str, model: str,
+                 every_commits: Optional[int] = None, every_seconds: Optional[float] = None,
+                 journal: Optional[Journal] = None, writer: Optional[BackgroundWriter] = None):
+        self.history_dir = history_dir
+        self.model_provider = model_provider
+        self.model = model
+        self.every_commits = Config.aggregate_every_commits if every_commits is None else every_commits
+        self.every_seconds = Config.aggregate_every_seconds if every_seconds is None else every_seconds
+        self.commits: List[CommitStats] = []
+        self._pending_commits: List[Any] = []
+        self._pending: List[CommitMemory] = []
+        self._recounted: set[str] = set()
+        self._last_run = time.monotonic()
+        self.journal = journal
+        self.writer = writer
     
-    if history_file.exists():
-        # Append new commit to existing history
-        with open(history_file, "a", encoding="utf-8") as f:
-            f.write(f"\n## Commit {new_commit_info.short_hash}: {new_commit_info.message}\n\n")
-            f.write(f"**Author:** {new_commit_info.author}\n")
-            f.write(f"**Date:** {new_commit_info.date.strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"**Lines changed:** {new_commit_info.diff_lines}\n\n")
-            f.write("```diff\n")
-            f.write(new_commit_info.diff_text[:1000])  # Truncate for readability
-            if len(new_commit_info.diff_text) > 1000:
-                f.write("\n... [truncated] ...")
-            f.write("\n```\n\n---\n\n")
-    else:
-        # Create new history file
-        history_content = "# Git History\n\n"
-        history_content += f"Generated by git-memory v{Config.version}\n\n"
-        history_content += f"## Commit {new_commit_info.short_hash}: {new_commit_info.message}\n\n"
-        history_content += f"**Author:** {new_commit_info.author}\n"
-        history_content += f"**Date:** {new_commit_info.date.strftime('%Y-%m-%d %H:%M:%S')}\n"
-        history_content += f"**Lines changed:** {new_commit_info.diff_lines}\n\n"
-        history_content += "```diff\n"
-        history_content += new_commit_info.diff_text[:1000]
-        if len(new_commit_info.diff_text) > 1000:
-            history_content += "\n... [truncated] ..."
-        history_content += "\n```\n\n---\n\n"
+    def add(self, commit_info: CommitInfo, commit_memory: CommitMemory, retried: bool = False) -> None:
+        """Record a processed commit and aggregate if the cadence is due.
         
-        with open(history_file, "w", encoding="utf-8") as f:
-            f.write(history_content)
+        A ``retried`` commit was already listed and counted with a fallback
+        memory by an earlier run; only its new memory is folded in.
+        """
+        if retried:
+            self._recounted.add(commit_info.hash)
+        else:
+            run_write(self.writer, append_history_entry, self.history_dir, commit_info)
+        stats = CommitStats(commit_info)
+        self.commits.append(stats)
+        self._pending_commits.append(stats)
+        self._pending.append(commit_memory)
+        if self._due():
+            self.flush()
     
-    # For now, regenerate memory.md and structure.mmd with single commit
-    # TODO: Implement true incremental updates
-    try:
-        project_memory = generate_project_memory(
-            commit_memories=[new_commit_memory],
-            total_commits=1,
-            provider=model_provider,
-            model=model
-        )
-    except Exception as e:
-        console.print(f"[yellow]→ AI project analysis failed: {e}[/]")
-        project_memory = ProjectMemory(
-            major_features=["Feature extraction failed - using fallback"],
-            architecture_evolution=["Architecture analysis failed - using fallback"],
-            key_decisions=["Decision analysis failed - using fallback"],
-            current_state=f"Latest commit: {new_commit_info.message}",
-            next_steps=["Complete AI integration", "Improve error handling"]
-        )
+    def add_existing(self, records: Iterable[CommitRecord]) -> int:
+        """Queue commits processed by earlier runs for the next fold."""
+        count = 0
+        for record in records:
+            self._pending_commits.append(record)
+            self._pending.append(record.memory)
+            count += 1
+        return count
     
-    # Update memory.md (for now, overwrite - TODO: make truly incremental)
-    memory_content = f"""# Project Memory
-
-Generated by git-memory v{Config.version} using {model_provider}/{model}
-
-## Current State
-{project_memory.current_state}
-
-## Major Features Implemented
-{_format_list_items(project_memory.major_features)}
-
-## Architecture Evolution
-{_format_list_items(project_memory.architecture_evolution)}
-
-## Key Technical Decisions
-{_format_list_items(project_memory.key_decisions)}
+    def _due(self) -> bool:
+        if self.every_commits and len(self._pending) >= self.every_commits:
+            return True
+        return bool(self.every_seconds) and time.monotonic() - self._last_run >= self.every_seconds
+    
+    def flush(self) -> None:
+        """Fold commits that arrived since the last run into the root project memory."""
+        if not self._pending:
+            return
+        update_project_memory(self.history_dir, self._pending_commits, self._pending,
+                              self.model_provider, self.model, recounted=self._recounted, writer=self.writer)
+        if self.journal is not None:
+            run_write(self.writer, self.journal.record_aggregated, [c.hash for c in self._pending_commits])
+        self._pending_commits = []
+        self._pending = []
+        self._recounted = set()
+        self._last_run = time.monotonic()
 
-## Suggested Next Steps
-{_format_list_items(project_memory.next_steps)}
 
-## Latest Commit
-- **{new_commit_info.short_hash}** ({new_commit_info.date.strftime('%Y-%m-%d')}): {new_commit_info.message} ({new_commit_info.diff_lines} lines)
-"""
-    
-    with open(memory_file, "w", encoding="utf-8") as f:
-        f.write(memory_content)
-    
-    # Update structure.mmd
-    from .ai import generate_diagram
-    structure_content = generate_diagram([new_commit_memory], project_memory)
-    
-    with open(history_dir / "structure.mmd", "w", encoding="utf-8") as f:
-        f.write(structure_content)
+def resume_aggregation(history_dir: Path, journal: Journal, model_provider: str, model: str) -> None:
+    """Fold commits an interrupted run wrote but never aggregated."""
+    if not journal.unaggregated():
+        return
+    aggregation = AggregationScheduler(history_dir, model_provider, model, journal=journal)
+    resumed = aggregation.add_existing(iter_commit_records(history_dir, journal.unaggregated()))
+    console.print(f"  [yellow]→ Resuming aggregation of {resumed} commits from an interrupted run[/]")
+    aggregation.flush()
+    journal.compact()
 
 
 def generate_history(
     repo_path: Path,
     model_provider: str,
     model: str,
-    min_diff_lines: Optional[int] = None
+    min_diff_lines: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    batch_size: Optional[int] = None
 ) -> None:
-    """Generate .history directory with commit-by-commit documentation."""
+    """Generate .history directory with commit-by-commit documentation.
+    
+    With ``concurrency`` above 1, up to that many commits are summarized at
+    once while files are still written in commit order. With ``batch_size``
+    above 1, up to that many consecutive small commits share one request.
+    """
     
     try:
         # Open repository
@@ -364,73 +878,202 @@ def generate_history(
         # Create .history structure
         history_dir = create_history_structure(repo_path)
         
-        # Get already processed commits
-        processed_hashes = get_processed_commits(history_dir)
+        if not repo.head.is_valid():
+            console.print("[yellow]Repository has no commits yet[/]")
+            return
+        
+        # Only walk commits added since the last fully processed tip
+        use_log = Config.diff_backend == "log"
+        first_parent = Config.first_parent if use_log else False
+        branch = head_branch(repo)
+        head_sha = repo.head.commit.hexsha
+        watermark = Watermark(history_dir)
+        rev = watermark.walk_range(repo, branch, min_diff_lines, first_parent)
         
-        # Get all commits (oldest first)
+        index = HistoryIndex(history_dir)
+        journal = Journal(history_dir)
         try:
-            all_commits = list(repo.iter_commits('HEAD'))
-            all_commits.reverse()
-        except git.exc.GitCommandError as e:
-            if "bad revision 'HEAD'" in str(e):
-                console.print("[yellow]Repository has no commits yet[/]")
-                return
-            raise
+            # Commits that only got a fallback memory are summarized again, wherever they are
+            retry = {c["hash"] for c in index.commits(status=FAILED)} if Config.retry_failed_commits else set()
+            if retry:
+                rev = "HEAD"
+            
+            # Get already processed commits
+            if rev == "HEAD":
+                processed_hashes = index.processed_hashes() - retry
+            else:
+                processed_hashes = index.processed_hashes(iter_rev_list(repo, rev, first_parent))
         
-        # Filter out already processed commits
-        new_commits = [c for c in all_commits if c.hexsha not in processed_hashes]
+            # Decide what to process from cheap numstat output (oldest first)
+            prefilter = prefilter_commits(repo, processed_hashes, min_diff_lines,
+                                          first_parent=first_parent,
+                                          ledger=SkipLedger(history_dir), rev=rev)
+            new_count = len(prefilter.selected)
+            skipped_count = len(prefilter.skipped) + prefilter.ledger_skipped
+            index.record_skipped(prefilter.skipped)
         
-        console.print(f"\n[blue]Found {len(all_commits)} total commits, {len(processed_hashes)} already processed[/]")
-        console.print(f"[blue]Processing {len(new_commits)} new commits[/]")
+            if rev == "HEAD":
+                console.print(f"\n[blue]Found {prefilter.total} total commits, {len(processed_hashes)} already processed[/]")
+            else:
+                console.print(f"\n[blue]Found {prefilter.total} commits since {rev[:7]}, {len(processed_hashes)} already processed[/]")
+            if prefilter.ledger_skipped:
+                console.print(f"  [yellow]→ Skipping {prefilter.ledger_skipped} commits recorded in the skip ledger[/]")
+            for hexsha, changed_lines in prefilter.skipped:
+                console.print(f"  [yellow]→ Skipping {hexsha[:7]}: {changed_lines} lines < {min_diff_lines} threshold[/]")
+            console.print(f"[blue]Processing {new_count} new commits[/]")
         
-        if not new_commits:
-            console.print("[green]✅ All commits already processed![/]")
-            return
+            if not new_count:
+                resume_aggregation(history_dir, journal, model_provider, model)
+                watermark.update(branch, head_sha, min_diff_lines, first_parent)
+                if skipped_count:
+                    display_summary([], skipped_count, history_dir, index=index)
+                else:
+                    console.print("[green]✅ All commits already processed![/]")
+                return
         
-        processed_commits: List[CommitInfo] = []
-        skipped_count = 0
+            if patch_codec() == ZSTD and use_log:
+                # Small diffs compress far better against a dictionary of the repo's own patches
+                sample = prefilter.selected[:Config.patch_dictionary_samples]
+                train_patch_dictionary(history_dir, (diff_text[:Config.diff_view_bytes]
+                                                     for _, diff_text, _ in iter_log_commits(repo, revs=sample)))
+            
+            if use_log:
+                new_commits = iter_log_commit_infos(repo, prefilter.selected, history_dir)
+            else:
+                selected = set(prefilter.selected)
+                new_commits = (c for c in repo.iter_commits(rev, reverse=True) if c.hexsha in selected)
         
-        # Process new commits with progress bar
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            BarColumn(),
-            TaskProgressColumn(),
-            console=console
-        ) as progress:
+            if concurrency is None:
+                concurrency = Config.concurrency
+            if batch_size is None:
+                batch_size = Config.ai_batch_commits
+            aggregation = AggregationScheduler(history_dir, model_provider, model, journal=journal)
+            if not ProjectState(history_dir).total_commits:
+                # .history may predate project_memory.json: fold in what earlier runs stored
+                previous = processed_hashes if rev == "HEAD" else index.processed_hashes()
+                ordered = (h for h in iter_rev_list(repo, "HEAD", first_parent) if h in previous) if previous else ()
+                seeded = aggregation.add_existing(iter_commit_records(history_dir, ordered))
+                if seeded:
+                    console.print(f"  [yellow]→ Seeding project memory from {seeded} previously processed commits[/]")
+            else:
+                # Commits an interrupted run wrote but never folded into the project memory
+                resumed = aggregation.add_existing(iter_commit_records(history_dir, journal.unaggregated()))
+                if resumed:
+                    console.print(f"  [yellow]→ Resuming aggregation of {resumed} commits from an interrupted run[/]")
+            excluded_files: List[FileStat] = []
+            stages = [StageStats("extract"), StageStats("compact"), StageStats("summarize", concurrency),
+                      StageStats("persist")]
+            extract_stats, compact_stats, summarize_stats, persist_stats = stages
+            compaction = CompactionStats()
+            hedging = rate_limiter(model_provider).hedger.stats
+            hedging_before = hedging.snapshot()
+            started = time.perf_counter()
+        
+            # Process new commits with progress bar, sharing one AI client for the run;
+            # files are written in the background while the next commits are summarized
+            with AISession(model_provider, model, cache=open_response_cache(history_dir)) as session, BackgroundWriter(stats=persist_stats) as writer, Progress(
+                SpinnerColumn(),
+                TextColumn("[progress.description]{task.description}"),
+                BarColumn(),
+                TaskProgressColumn(),
+                console=console
+            ) as progress:
             
-            task = progress.add_task("Processing commits...", total=len(new_commits))
+                task = progress.add_task("Processing commits...", total=new_count)
+                aggregation.writer = writer
             
-            for commit in new_commits:
-                # Update progress description
-                progress.update(task, description=f"Processing {commit.hexsha[:7]}: {commit.summary[:40]}...")
-                
-                # Get commit diff
-                diff_text, diff_lines = get_commit_diff(repo, commit)
-                
-                # Apply min_diff_lines filter
-                if min_diff_lines is not None and diff_lines < min_diff_lines:
-                    console.print(f"  [yellow]→ Skipping {commit.hexsha[:7]}: {diff_lines} lines < {min_diff_lines} threshold[/]")
-                    skipped_count += 1
-                    progress.advance(task)
-                    continue
-                
-                # Create commit info
-                commit_info = CommitInfo(commit, diff_lines, diff_text)
-                processed_commits.append(commit_info)
+                def extract() -> Iterator[CommitInfo]:
+                    for commit in new_commits:
+                        commit_info = build_commit_info(repo, commit, history_dir)
+                        journal.record(commit_info.hash, EXTRACTED)
+                        # Count lines as the --min-diff-lines threshold does, not patch lines with headers
+                        commit_info.diff_lines = prefilter.changed_lines.pop(commit_info.hash, commit_info.diff_lines)
+                        commit_info.excluded_files = prefilter.excluded.pop(commit_info.hash, [])
+                        excluded_files.extend(commit_info.excluded_files)
+                    
+                        # Update progress description
+                        progress.update(task, description=f"Processing {commit_info.short_hash}: {commit_info.message[:40]}...")
+                        yield commit_info
+            
+                def compact(extracted: Iterator[CommitInfo]) -> Iterator[CommitInfo]:
+                    try:
+                        for commit_info in extracted:
+                            start = time.perf_counter()
+                            prepare_ai_diff(commit_info, model, compaction)
+                            compact_stats.add(busy=time.perf_counter() - start, items=1)
+                            yield commit_info
+                    finally:
+                        extracted.close()
+            
+                def record_written(commit_info: CommitInfo, commit_memory: CommitMemory) -> None:
+                    journal.record(commit_info.hash, WRITTEN)
+                    prompt_tokens, completion_tokens = response_usage(commit_memory)
+                    index.record_commit(commit_info, FAILED if commit_memory.is_fallback else PROCESSED,
+                                        model=f"{model_provider}/{model}", prompt_tokens=prompt_tokens,
+                                        completion_tokens=completion_tokens,
+                                        path=commit_location(history_dir, commit_info.hash))
+                    persist_stats.add(items=1)
+            
+                def finish(commit_info: CommitInfo, commit_memory: CommitMemory) -> None:
+                    # Queued behind the commit's files, so it is only recorded once they are on disk
+                    writer.submit(record_written, commit_info, commit_memory)
                 
-                # Save commit files and get AI memory
-                commit_memory = save_commit_files(history_dir, commit_info, model_provider, model)
+                    # Root memory is refreshed on the scheduler's cadence, not per commit
+                    aggregation.add(commit_info, commit_memory, retried=commit_info.hash in retry)
                 
-                # Update aggregated files incrementally after each commit
-                update_aggregated_files(history_dir, commit_info, commit_memory, model_provider, model)
+                    # Only compact stats outlive the loop iteration, once the writer is done with the diff
+                    writer.submit(commit_info.release_diff)
                 
-                console.print(f"  [green]✅ Processed {commit_info.short_hash}: {commit_info.message} ({commit_info.diff_lines} lines)[/]")
+                    console.print(f"  [green]✅ Processed {commit_info.short_hash}: {commit_info.message} ({commit_info.diff_lines} lines)[/]")
                 
-                progress.advance(task)
+                    progress.advance(task)
+            
+                # Extraction and compaction run ahead on their own threads while commits are summarized and written
+                commit_infos = prefetch(compact(prefetch(extract(), Config.extract_prefetch, extract_stats)),
+                                        Config.extract_prefetch)
+                try:
+                    if concurrency > 1:
+                        async def run_concurrent() -> None:
+                            try:
+                                async for commit_info, commit_memory in summarize_in_order(
+                                        commit_infos, concurrency, model_provider, model, journal, summarize_stats,
+                                        batch_size):
+                                    # Writes and aggregation stay in commit order, off the event loop
+                                    start = time.perf_counter()
+                                    await asyncio.to_thread(writer.submit, write_commit_files, history_dir, commit_info,
+                                                            commit_memory, model_provider, model)
+                                    await asyncio.to_thread(finish, commit_info, commit_memory)
+                                    summarize_stats.add(blocked=time.perf_counter() - start)
+                            finally:
+                                await session.aclose()
+                    
+                        asyncio.run(run_concurrent())
+                    else:
+                        for batch in batch_small_commits(commit_infos, batch_size, model, journal):
+                            # Save commit files and get AI memory
+                            start = time.perf_counter()
+                            commit_memories = save_commit_batch(history_dir, batch, model_provider, model,
+                                                                journal, writer)
+                            for commit_info, commit_memory in zip(batch, commit_memories):
+                                finish(commit_info, commit_memory)
+                            summarize_stats.add(busy=time.perf_counter() - start, items=len(batch))
+                finally:
+                    commit_infos.close()
+            
+                progress.update(task, description="Aggregating project memory...")
+                aggregation.flush()
+            journal.compact()
+        
+            # Every commit up to the starting HEAD has now been decided
+            watermark.update(branch, head_sha, min_diff_lines, first_parent)
         
-        # Display summary
-        display_summary(processed_commits, skipped_count, history_dir)
+            # Display summary
+            display_summary(aggregation.commits, skipped_count, history_dir, len(excluded_files), index, compaction)
+            display_pipeline_stats(stages, time.perf_counter() - started)
+            if Config.ai_hedge:
+                display_hedging(hedging.since(hedging_before))
+        finally:
+            index.close()
         
     except git.exc.InvalidGitRepositoryError:
         raise ValueError(f"{repo_path} is not a valid Git repository")
@@ -438,8 +1081,30 @@ def generate_history(
         raise ValueError(f"Error processing repository: {e}")
 
 
-def display_summary(processed_commits: List[CommitInfo], skipped_count: int, history_dir: Path) -> None:
-    """Display processing summary."""
+def display_pipeline_stats(stages: List[StageStats], elapsed: float) -> None:
+    """Display how busy each pipeline stage was, which points at the bottleneck."""
+    table = Table(title="Pipeline Stages", show_header=True, header_style="bold blue")
+    for column in ("Stage", "Workers", "Items", "Busy", "Blocked", "Utilization"):
+        table.add_column(column, style="cyan" if column == "Stage" else "green")
+    for row in stage_rows(stages, elapsed):
+        table.add_row(*row)
+    console.print(table)
+    
+    bottleneck = max(stages, key=lambda stage: stage.utilization(elapsed))
+    if bottleneck.busy:
+        console.print(f"[blue]Bottleneck: {bottleneck.name} stage ({bottleneck.utilization(elapsed):.0%} busy)[/]")
+
+
+def display_hedging(stats: HedgeStats) -> None:
+    """Display how many AI requests were hedged and the tail latency that saved."""
+    console.print(f"[blue]Hedged {stats.hedged} of {stats.requests} AI requests ({stats.hedge_rate:.1%}); "
+                  f"{stats.hedge_wins} hedges answered first, saving {stats.saved:.1f}s of tail latency[/]")
+
+
+def display_summary(processed_commits: List[CommitStats], skipped_count: int, history_dir: Path,
+                    excluded_count: int = 0, index: Optional[HistoryIndex] = None,
+                    compaction: Optional[CompactionStats] = None) -> None:
+    """Display processing summary, with totals across runs when the index is given."""
     
     table = Table(title="Processing Summary", show_header=True, header_style="bold blue")
     table.add_column("Metric", style="cyan")
@@ -449,7 +1114,17 @@ def display_summary(processed_commits: List[CommitInfo], skipped_count: int, his
     
     table.add_row("Commits processed", str(len(processed_commits)))
     table.add_row("Commits skipped", str(skipped_count))
+    table.add_row("Binary/huge files excluded", str(excluded_count))
     table.add_row("Total lines changed", str(total_lines))
+    if compaction is not None and compaction.commits:
+        table.add_row("Diff tokens (raw → compacted)",
+                      f"{compaction.tokens_before} → {compaction.tokens_after} ({compaction.saved:.0%} saved)")
+    if index is not None:
+        counts = index.status_counts()
+        prompt_tokens, completion_tokens = index.token_totals()
+        table.add_row("Commits in history", str(counts.get(PROCESSED, 0) + counts.get(FAILED, 0)))
+        table.add_row("Fallback memories (AI failed)", str(counts.get(FAILED, 0)))
+        table.add_row("Tokens used (prompt/completion)", f"{prompt_tokens}/{completion_tokens}")
     table.add_row("History directory", str(history_dir.relative_to(history_dir.parent)))
     
     console.print("\n")
@@ -482,6 +1157,18 @@ def _format_changes(changes) -> str:
     return "\n".join(formatted)
 
 
+def _format_excluded_files(files: List[FileStat]) -> str:
+    """Format files kept out of AI analysis as a markdown section."""
+    if not files:
+        return ""
+    
+    lines = ["", "## Excluded From Analysis"]
+    for file_stat in files:
+        detail = "binary" if file_stat.binary else f"+{file_stat.added} -{file_stat.deleted} lines"
+        lines.append(f"- `{file_stat.path}` ({detail})")
+    return "\n".join(lines) + "\n"
+
+
 def _format_list_items(items: List[str]) -> str:
     """Format list of strings as markdown bullet points."""
     if not items:
@@ -0,0 +1,170 @@
+"""SQLite catalog of the commits in a .history directory."""
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .storage import iter_commit_dirs, iter_packed_commits, read_commit_file
+
+PROCESSED = "processed"
+FAILED = "failed"  # AI analysis failed and a fallback memory was written
+SKIPPED = "skipped"
+
+# Statuses that have commit files on disk
+WRITTEN_STATUSES = (PROCESSED, FAILED)
+
+
+class HistoryIndex:
+    """Catalog of every commit git-memory has decided on, stored in ``.history/index.db``.
+
+    Resume checks, run summaries and queries are answered from indexed
+    lookups instead of listing the history directory. An index created
+    next to an existing .history is backfilled from the commit directories
+    once.
+    """
+
+    file_name = "index.db"
+
+    def __init__(self, history_dir: Path):
+        self.history_dir = history_dir
+        self.path = history_dir / self.file_name
+        is_new = not self.path.exists()
+        self._lock = threading.Lock()
+        # Written from the extraction thread and the async writer; access is serialized by _lock
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS commits ("
+                "hash TEXT PRIMARY KEY, parent TEXT, date TEXT, author TEXT, message TEXT, "
+                "diff_lines INTEGER, status TEXT NOT NULL, model TEXT, "
+                "prompt_tokens INTEGER NOT NULL DEFAULT 0, completion_tokens INTEGER NOT NULL DEFAULT 0, "
+                "path TEXT, updated REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS commits_status ON commits (status)")
+        if is_new:
+            self._backfill()
+
+    def _backfill(self) -> None:
+        """Import commits written before the index existed, skipping incomplete ones."""
+        locations = dict(iter_packed_commits(self.history_dir))
+        locations.update((commit_hash, item.relative_to(self.history_dir).as_posix())
+                         for commit_hash, item in iter_commit_dirs(self.history_dir))
+        rows = []
+        for commit_hash, location in locations.items():
+            if read_commit_file(self.history_dir, commit_hash, "memory.md") is None:
+                continue  # Interrupted before the commit was fully written
+            row = {"hash": commit_hash, "status": PROCESSED, "path": location}
+            try:
+                record = json.loads(read_commit_file(self.history_dir, commit_hash, "memory.json") or b"{}")
+                row.update(date=record.get("date"), author=record.get("author"),
+                           message=record.get("message"), diff_lines=record.get("diff_lines"))
+            except (OSError, ValueError):
+                pass
+            rows.append(row)
+        self._upsert(rows)
+
+    def _upsert(self, rows: List[Dict[str, Any]]) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO commits (hash, parent, date, author, message, diff_lines, status, model, "
+                "prompt_tokens, completion_tokens, path, updated) "
+                "VALUES (:hash, :parent, :date, :author, :message, :diff_lines, :status, :model, "
+                ":prompt_tokens, :completion_tokens, :path, :updated) "
+                "ON CONFLICT(hash) DO UPDATE SET "
+                "parent = COALESCE(excluded.parent, parent), date = COALESCE(excluded.date, date), "
+                "author = COALESCE(excluded.author, author), message = COALESCE(excluded.message, message), "
+                "diff_lines = COALESCE(excluded.diff_lines, diff_lines), status = excluded.status, "
+                "model = COALESCE(excluded.model, model), prompt_tokens = excluded.prompt_tokens, "
+                "completion_tokens = excluded.completion_tokens, path = excluded.path, "
+                "updated = excluded.updated",
+                [{"parent": None, "date": None, "author": None, "message": None, "diff_lines": None,
+                  "model": None, "prompt_tokens": 0, "completion_tokens": 0, "path": None,
+                  **row, "updated": now} for row in rows]
+            )
+
+    def record_commit(self, commit_info: Any, status: str, model: Optional[str] = None,
+                      prompt_tokens: int = 0, completion_tokens: int = 0,
+                      path: Optional[str] = None) -> None:
+        """Record a processed or failed commit and where its files were written."""
+        self._upsert([{
+            "hash": commit_info.hash,
+            "parent": commit_info.parent,
+            "date": commit_info.date.isoformat(),
+            "author": commit_info.author,
+            "message": commit_info.message,
+            "diff_lines": commit_info.diff_lines,
+            "status": status,
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "path": path if path is not None else commit_info.hash,
+        }])
+
+    def record_skipped(self, decisions: Iterable[tuple[str, int]]) -> None:
+        """Record ``(hash, changed_lines)`` pairs skipped by the diff threshold."""
+        self._upsert([{"hash": commit_hash, "diff_lines": changed_lines, "status": SKIPPED}
+                      for commit_hash, changed_lines in decisions])
+
+    def processed_hashes(self, candidates: Optional[Iterable[str]] = None) -> set[str]:
+        """Hashes with files on disk, optionally limited to ``candidates``."""
+        placeholders = ", ".join("?" for _ in WRITTEN_STATUSES)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT hash FROM commits WHERE status IN ({placeholders})", WRITTEN_STATUSES
+            ).fetchall()
+        processed = {row["hash"] for row in rows}
+        if candidates is None:
+            return processed
+        return {commit_hash for commit_hash in candidates if commit_hash in processed}
+
+    def get(self, commit_hash: str) -> Optional[Dict[str, Any]]:
+        """Catalog entry for one commit."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM commits WHERE hash = ?", (commit_hash,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def commits(self, status: Optional[str] = None, author: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Catalog entries oldest first, optionally filtered by status and author."""
+        query = "SELECT * FROM commits"
+        clauses, params = [], []
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if author is not None:
+            clauses.append("author = ?")
+            params.append(author)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY date, hash", params).fetchall()
+        for row in rows:
+            yield dict(row)
+
+    def status_counts(self) -> Dict[str, int]:
+        """Number of commits per status."""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) AS n FROM commits GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def token_totals(self) -> tuple[int, int]:
+        """Total prompt and completion tokens recorded."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COALESCE(SUM(prompt_tokens), 0), COALESCE(SUM(completion_tokens), 0) FROM commits"
+            ).fetchone()
+        return row[0], row[1]
+
+    def update_paths(self, paths: Dict[str, str]) -> None:
+        """Point entries at new directories after a layout migration."""
+        with self._lock, self._conn:
+            self._conn.executemany("UPDATE commits SET path = ? WHERE hash = ?",
+                                   [(path, commit_hash) for commit_hash, path in paths.items()])
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,109 @@
+"""Write-ahead journal of per-commit processing stages."""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from pydantic import ValidationError
+
+from .ai import CommitMemory
+from .config import Config
+
+EXTRACTED = "extracted"
+SUMMARIZED = "summarized"
+WRITTEN = "written"
+AGGREGATED = "aggregated"
+STAGES = (EXTRACTED, SUMMARIZED, WRITTEN, AGGREGATED)
+
+
+class Journal:
+    """Stages each commit reached, appended to ``.history/journal.jsonl``.
+
+    Every line records one stage of one commit and is flushed to disk before
+    the run moves on, so after a crash a rerun redoes only the stages that
+    never completed. The summarized stage carries the AI memory itself: a
+    commit summarized but not yet written is written from the journal
+    instead of paying for the AI call again. Fallback memories are not
+    journaled, so their commits are summarized again.
+    """
+
+    file_name = "journal.jsonl"
+
+    def __init__(self, history_dir: Path):
+        self.path = history_dir / self.file_name
+        self.stages: Dict[str, str] = {}
+        self._memories: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        commit_hash, stage = entry["hash"], entry["stage"]
+                    except (ValueError, KeyError, TypeError):
+                        continue  # Torn final line from an interrupted write
+                    self._apply(commit_hash, stage, entry.get("memory"))
+
+    def _apply(self, commit_hash: str, stage: str, memory: Optional[dict]) -> None:
+        if stage not in STAGES:
+            return
+        self.stages[commit_hash] = stage
+        if stage == SUMMARIZED and memory is not None:
+            self._memories[commit_hash] = memory
+        elif stage in (WRITTEN, AGGREGATED):
+            self._memories.pop(commit_hash, None)
+
+    def _append(self, entries: List[dict]) -> None:
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(entry, separators=(",", ":")) + "\n" for entry in entries)
+                f.flush()
+                if Config.journal_fsync:
+                    os.fsync(f.fileno())
+            for entry in entries:
+                self._apply(entry["hash"], entry["stage"], entry.get("memory"))
+
+    def record(self, commit_hash: str, stage: str) -> None:
+        """Record that ``commit_hash`` completed ``stage``."""
+        self._append([{"hash": commit_hash, "stage": stage}])
+
+    def record_summarized(self, commit_hash: str, memory: CommitMemory) -> None:
+        """Record an AI summary, keeping the memory until the commit is written."""
+        if memory.is_fallback:
+            return
+        self._append([{"hash": commit_hash, "stage": SUMMARIZED, "memory": memory.model_dump(mode="json")}])
+
+    def record_aggregated(self, commit_hashes: Iterable[str]) -> None:
+        """Record commits folded into the project memory."""
+        entries = [{"hash": commit_hash, "stage": AGGREGATED} for commit_hash in commit_hashes]
+        if entries:
+            self._append(entries)
+
+    def memory(self, commit_hash: str) -> Optional[CommitMemory]:
+        """Journaled summary of a commit that was summarized but never written."""
+        data = self._memories.get(commit_hash)
+        if data is None:
+            return None
+        try:
+            return CommitMemory.model_validate(data)
+        except ValidationError:
+            return None
+
+    def unaggregated(self) -> List[str]:
+        """Commits written to disk but never folded into the project memory, in journal order."""
+        return [commit_hash for commit_hash, stage in self.stages.items() if stage == WRITTEN]
+
+    def compact(self) -> None:
+        """Atomically rewrite the journal without commits that completed every stage."""
+        with self._lock:
+            self.stages = {h: stage for h, stage in self.stages.items() if stage != AGGREGATED}
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for commit_hash, stage in self.stages.items():
+                    entry = {"hash": commit_hash, "stage": stage}
+                    if commit_hash in self._memories:
+                        entry["memory"] = self._memories[commit_hash]
+                    f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            tmp_path.replace(self.path)
@@ -0,0 +1,63 @@
+"""Persistent record of commits skipped by --min-diff-lines."""
+
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+
+class SkipLedger:
+    """Append-only ledger of skip decisions stored in ``.history/skipped.tsv``.
+    
+    Each line holds ``<hash>\\t<changed lines>\\t<threshold>``. Because the line
+    count is stored, a rerun can decide again for any threshold without asking
+    git: commits below the new threshold stay skipped, the rest are re-admitted.
+    """
+    
+    file_name = "skipped.tsv"
+    
+    def __init__(self, history_dir: Path):
+        self.path = history_dir / self.file_name
+        self.entries: Dict[str, tuple[int, int]] = {}
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    fields = line.rstrip("\n").split("\t")
+                    if len(fields) != 3:
+                        continue  # Torn final line from an interrupted write
+                    commit_hash, changed_lines, threshold = fields
+                    self.entries[commit_hash] = (int(changed_lines), int(threshold))
+    
+    def __len__(self) -> int:
+        return len(self.entries)
+    
+    def __contains__(self, commit_hash: str) -> bool:
+        return commit_hash in self.entries
+    
+    def changed_lines(self, commit_hash: str) -> Optional[int]:
+        """Recorded line count for a skipped commit, or None if unknown."""
+        entry = self.entries.get(commit_hash)
+        return entry[0] if entry else None
+    
+    def record(self, decisions: Iterable[tuple[str, int]], threshold: int) -> None:
+        """Append skip decisions made with ``threshold``."""
+        lines = []
+        for commit_hash, changed_lines in decisions:
+            self.entries[commit_hash] = (changed_lines, threshold)
+            lines.append(f"{commit_hash}\t{changed_lines}\t{threshold}\n")
+        if lines:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.writelines(lines)
+    
+    def forget(self, commit_hashes: Iterable[str]) -> None:
+        """Drop entries for re-admitted commits and rewrite the ledger."""
+        removed = False
+        for commit_hash in commit_hashes:
+            removed = self.entries.pop(commit_hash, None) is not None or removed
+        if not removed:
+            return
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(
+                f"{commit_hash}\t{changed_lines}\t{threshold}\n"
+                for commit_hash, (changed_lines, threshold) in self.entries.items()
+            )
+        tmp_path.replace(self.path)
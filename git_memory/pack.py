@@ -0,0 +1,148 @@
+"""Append-only pack files for per-commit artifacts."""
+
+import json
+import mmap
+import struct
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from .config import Config
+from .writer import note_write
+
+PACK_DIR = "packs"
+INDEX_FILE = "pack.idx"
+
+# Every record starts with the big-endian length of its JSON header
+HEADER_LENGTH = struct.Struct(">I")
+
+
+class PackStore:
+    """Commit artifacts appended to a few pack files, like git packfiles.
+
+    A record holds all files of one commit: a JSON header naming the commit
+    and the size of each file, followed by the file contents. ``pack.idx``
+    maps each commit hash to its pack, offset and length, and reads go
+    through memory-mapped pack files. A new pack is started once the current
+    one exceeds Config.pack_max_bytes.
+    """
+
+    def __init__(self, history_dir: Path):
+        self.history_dir = history_dir
+        self.pack_dir = history_dir / PACK_DIR
+        self.index_path = self.pack_dir / INDEX_FILE
+        self.entries: Dict[str, tuple[str, int, int]] = {}
+        self._maps: Dict[str, mmap.mmap] = {}
+        self._lock = threading.Lock()
+        self.index_size = self._stat_index()
+        if self.index_size:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    parts = line.rstrip("\n").split("\t")
+                    if len(parts) != 4:
+                        continue  # Torn write from an interrupted run
+                    try:
+                        self.entries[parts[0]] = (parts[1], int(parts[2]), int(parts[3]))
+                    except ValueError:
+                        continue
+
+    def _stat_index(self) -> int:
+        try:
+            return self.index_path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def __contains__(self, commit_hash: str) -> bool:
+        return commit_hash in self.entries
+
+    def hashes(self) -> List[str]:
+        """Hashes of every packed commit, in the order they were appended."""
+        return list(self.entries)
+
+    def _current_pack(self) -> Path:
+        packs = sorted(self.pack_dir.glob("pack-*.pack"))
+        if packs and packs[-1].stat().st_size < Config.pack_max_bytes:
+            return packs[-1]
+        return self.pack_dir / f"pack-{len(packs) + 1:04d}.pack"
+
+    def append(self, commit_hash: str, files: Dict[str, bytes]) -> None:
+        """Append one commit's files, replacing any earlier record for it."""
+        header = json.dumps({"hash": commit_hash, "files": [[name, len(data)] for name, data in files.items()]},
+                            separators=(",", ":")).encode("utf-8")
+        record = HEADER_LENGTH.pack(len(header)) + header + b"".join(files.values())
+        with self._lock:
+            self.pack_dir.mkdir(parents=True, exist_ok=True)
+            pack = self._current_pack()
+            with open(pack, "ab") as f:
+                offset = f.tell()
+                f.write(record)
+            # The index line is written last, so a crash never indexes a partial record
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(f"{commit_hash}\t{pack.name}\t{offset}\t{len(record)}\n")
+            self.entries[commit_hash] = (pack.name, offset, len(record))
+            self.index_size = self._stat_index()
+        note_write(pack)
+        note_write(self.index_path)
+
+    def _map(self, pack_name: str, end: int) -> mmap.mmap:
+        mapped = self._maps.get(pack_name)
+        if mapped is None or len(mapped) < end:
+            # Packs only grow, so remap when a record lies past the current mapping
+            if mapped is not None:
+                mapped.close()
+            with open(self.pack_dir / pack_name, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[pack_name] = mapped
+        return mapped
+
+    def read(self, commit_hash: str) -> Optional[Dict[str, bytes]]:
+        """Files of one packed commit, or None when it is not packed."""
+        entry = self.entries.get(commit_hash)
+        if entry is None:
+            return None
+        pack_name, offset, length = entry
+        with self._lock:
+            mapped = self._map(pack_name, offset + length)
+            record = mapped[offset:offset + length]
+        (header_length,) = HEADER_LENGTH.unpack_from(record)
+        header = json.loads(record[HEADER_LENGTH.size:HEADER_LENGTH.size + header_length])
+        files = {}
+        position = HEADER_LENGTH.size + header_length
+        for name, size in header["files"]:
+            files[name] = record[position:position + size]
+            position += size
+        return files
+
+    def read_file(self, commit_hash: str, name: str) -> Optional[bytes]:
+        """One file of a packed commit."""
+        files = self.read(commit_hash)
+        return files.get(name) if files is not None else None
+
+    def __iter__(self) -> Iterator[tuple[str, Dict[str, bytes]]]:
+        for commit_hash in self.hashes():
+            yield commit_hash, self.read(commit_hash)
+
+    def close(self) -> None:
+        with self._lock:
+            for mapped in self._maps.values():
+                mapped.close()
+            self._maps.clear()
+
+
+_stores: Dict[Path, PackStore] = {}
+_stores_lock = threading.Lock()
+
+
+def open_pack_store(history_dir: Path) -> PackStore:
+    """Shared PackStore for ``history_dir``, so the index is loaded once per process.
+
+    The store is reloaded when pack.idx was changed or removed behind its back.
+    """
+    key = history_dir.resolve()
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None or store.index_size != store._stat_index():
+            if store is not None:
+                store.close()
+            store = _stores[key] = PackStore(history_dir)
+        return store
@@ -0,0 +1,104 @@
+"""Stage accounting and prefetching for the extract → summarize → persist pipeline."""
+
+import queue
+import threading
+import time
+from typing import Iterator, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+class StageStats:
+    """Time one pipeline stage spent working and blocked.
+
+    ``busy`` is summed over all workers of the stage, so utilization is
+    ``busy / (elapsed * workers)``. ``blocked`` is time a worker could not
+    hand its result on because the next stage's queue was full. A stage
+    near full utilization while the others idle is the bottleneck.
+    """
+
+    def __init__(self, name: str, workers: int = 1):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.busy = 0.0
+        self.blocked = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, busy: float = 0.0, blocked: float = 0.0, items: int = 0) -> None:
+        with self._lock:
+            self.busy += busy
+            self.blocked += blocked
+            self.items += items
+
+    def utilization(self, elapsed: float) -> float:
+        """Share of the stage's worker time spent working."""
+        if elapsed <= 0:
+            return 0.0
+        return min(1.0, self.busy / (elapsed * self.workers))
+
+
+def prefetch(items: Iterator[T], depth: int, stats: Optional[StageStats] = None) -> Iterator[T]:
+    """Produce ``items`` on a background thread, running up to ``depth`` ahead of the consumer.
+
+    Exceptions raised by ``items`` are re-raised to the consumer. Closing the
+    returned generator stops the producer.
+    """
+    buffer: queue.Queue = queue.Queue(max(1, depth))
+    stop = threading.Event()
+
+    def put(item: object) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    item = next(items)
+                except StopIteration:
+                    break
+                produced = time.perf_counter()
+                delivered = put(item)
+                if stats is not None:
+                    stats.add(busy=produced - start, blocked=time.perf_counter() - produced, items=1)
+                if not delivered:
+                    return
+            put(_DONE)
+        except BaseException as e:
+            put(e)
+        finally:
+            close = getattr(items, "close", None)
+            if close is not None:
+                close()  # Generators run their cleanup, e.g. stopping a git subprocess
+
+    thread = threading.Thread(target=produce, name="git-memory-extract", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def stage_rows(stages: List[StageStats], elapsed: float) -> List[tuple[str, str, str, str, str, str]]:
+    """Rows of ``(stage, workers, items, busy, blocked, utilization)`` for display."""
+    return [
+        (stage.name, str(stage.workers), str(stage.items), f"{stage.busy:.1f}s", f"{stage.blocked:.1f}s",
+         f"{stage.utilization(elapsed):.0%}")
+        for stage in stages
+    ]
@@ -0,0 +1,65 @@
+"""Structured project memory carried forward between runs."""
+
+import json
+from pathlib import Path
+from typing import List, Optional
+
+from pydantic import ValidationError
+
+from .ai import ProjectMemory
+from .config import Config
+from .writer import note_write
+
+
+class ProjectState:
+    """Folded ProjectMemory plus running totals, stored in ``.history/project_memory.json``.
+
+    Each run folds only its new commit memories into the stored memory, so
+    the cost of an update depends on how many commits arrived, not on how
+    long the history is. Only the most recent Config.memory_timeline_entries
+    timeline lines are kept.
+    """
+
+    file_name = "project_memory.json"
+
+    def __init__(self, history_dir: Path):
+        self.path = history_dir / self.file_name
+        self.memory: Optional[ProjectMemory] = None
+        self.total_commits = 0
+        self.total_lines = 0
+        self.memories_generated = 0
+        self.timeline: List[str] = []
+        if self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                memory = data.get("memory")
+                self.memory = ProjectMemory.model_validate(memory) if memory is not None else None
+                self.total_commits = data.get("total_commits", 0)
+                self.total_lines = data.get("total_lines", 0)
+                self.memories_generated = data.get("memories_generated", 0)
+                self.timeline = data.get("timeline", [])
+            except (ValueError, AttributeError, ValidationError):
+                pass  # Corrupt state - start over from the next folded commits
+
+    def add_commits(self, commit_count: int, diff_lines: int, memories: int, timeline: List[str]) -> None:
+        """Account for newly folded commits."""
+        self.total_commits += commit_count
+        self.total_lines += diff_lines
+        self.memories_generated += memories
+        self.timeline = (self.timeline + timeline)[-Config.memory_timeline_entries:]
+
+    def save(self) -> None:
+        """Atomically write the state file."""
+        data = {
+            "memory": self.memory.model_dump(mode="json") if self.memory is not None else None,
+            "total_commits": self.total_commits,
+            "total_lines": self.total_lines,
+            "memories_generated": self.memories_generated,
+            "timeline": self.timeline,
+        }
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        tmp_path.replace(self.path)
+        note_write(self.path)
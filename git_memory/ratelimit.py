@@ -0,0 +1,305 @@
+"""Client-side rate limiting and adaptive concurrency for AI requests."""
+
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, TypeVar
+
+import httpx
+import openai
+from rich.console import Console
+
+from .config import Config
+from .hedge import Hedger
+
+console = Console()
+
+T = TypeVar("T")
+
+# How often an async caller checks for a free concurrency slot
+POLL_SECONDS = 0.05
+
+SUCCESS = "success"
+THROTTLED = "throttled"
+FAILED = "failed"
+
+
+class TokenBucket:
+    """Budget of ``per_minute`` units that refills continuously, holding at most a minute's worth.
+
+    A reservation always succeeds but may leave the bucket in debt; the
+    caller then waits for the debt to refill. Waits therefore queue up in
+    reservation order instead of callers racing for each refill.
+    """
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take ``amount`` units and return the seconds to wait before using them."""
+        with self._lock:
+            self._refill()
+            # A request over a minute's budget still goes through once the bucket is full
+            self.level -= min(amount, self.capacity)
+            return 0.0 if self.level >= 0 else -self.level / self.rate
+
+    def try_reserve(self, amount: float) -> bool:
+        """Take ``amount`` units only if they are available without waiting."""
+        with self._lock:
+            self._refill()
+            if self.level < min(amount, self.capacity):
+                return False
+            self.level -= min(amount, self.capacity)
+            return True
+
+    def refund(self, amount: float) -> None:
+        """Return units reserved but not used."""
+        with self._lock:
+            self._refill()
+            self.level = min(self.capacity, self.level + amount)
+
+
+class AdaptiveConcurrency:
+    """Limit on requests in flight, adapted by AIMD like TCP congestion control.
+
+    Each success raises the limit by ``1 / limit``, about one more slot per
+    round of requests. A 429 or timeout multiplies it by ``backoff``, at
+    most once per ``cooldown`` seconds so one burst of rejections counts as
+    one signal.
+    """
+
+    def __init__(self, initial: int, maximum: int, minimum: int = 1, backoff: float = 0.5,
+                 cooldown: float = 2.0):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.in_flight = 0
+        self._last_backoff = float("-inf")
+        self._condition = threading.Condition()
+
+    def _has_slot(self) -> bool:
+        return self.in_flight < max(self.minimum, int(self.limit))
+
+    def try_acquire(self) -> bool:
+        """Take a slot if one is free."""
+        with self._condition:
+            if not self._has_slot():
+                return False
+            self.in_flight += 1
+            return True
+
+    def acquire(self) -> None:
+        """Wait for a free slot and take it."""
+        with self._condition:
+            while not self._has_slot():
+                self._condition.wait()
+            self.in_flight += 1
+
+    async def acquire_async(self) -> None:
+        """Wait for a free slot without blocking the event loop."""
+        while not self.try_acquire():
+            await asyncio.sleep(POLL_SECONDS)
+
+    def release(self, outcome: str) -> None:
+        """Free a slot and adapt the limit to how its request went."""
+        with self._condition:
+            self.in_flight -= 1
+            if outcome == SUCCESS:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            elif outcome == THROTTLED:
+                now = time.monotonic()
+                if now - self._last_backoff >= self.cooldown:
+                    self.limit = max(self.minimum, self.limit * self.backoff)
+                    self._last_backoff = now
+            self._condition.notify_all()
+
+
+def _error_chain(error: BaseException) -> Iterator[BaseException]:
+    """The error and the errors it wraps, e.g. the provider error inside an instructor retry error."""
+    seen = set()
+    pending = [error]
+    while pending:
+        current = pending.pop()
+        if current is None or id(current) in seen:
+            continue
+        seen.add(id(current))
+        yield current
+        pending.extend([current.__cause__, current.__context__])
+        pending.extend(arg for arg in current.args if isinstance(arg, BaseException))
+
+
+def is_throttle(error: BaseException) -> bool:
+    """Whether ``error`` is a rate limit or timeout worth backing off and retrying."""
+    return any(
+        isinstance(e, (openai.RateLimitError, openai.APITimeoutError, httpx.TimeoutException, TimeoutError))
+        or getattr(e, "status_code", None) == 429
+        for e in _error_chain(error)
+    )
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the provider asked to wait, from the Retry-After headers of the error's response."""
+    for e in _error_chain(error):
+        headers = getattr(getattr(e, "response", None), "headers", None)
+        if not headers:
+            continue
+        try:
+            if headers.get("retry-after-ms"):
+                return max(0.0, float(headers["retry-after-ms"]) / 1000)
+            value = headers.get("retry-after")
+            if value:
+                try:
+                    return max(0.0, float(value))
+                except ValueError:
+                    return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+class RateLimiter:
+    """Requests and tokens per minute, plus adaptive concurrency, for one provider.
+
+    Every request reserves one request and its estimated tokens from the
+    buckets and then a concurrency slot. A 429 or timeout shrinks the
+    concurrency limit and is retried up to Config.ai_retry_attempts times
+    after the provider's Retry-After, or a jittered exponential backoff
+    without one. A Retry-After pauses every request to the provider, not
+    only the one that was rejected. Other errors are raised at once.
+    Attempts run under the Hedger's deadline, and a hedged duplicate is
+    only sent when the buckets have room for it right away.
+    """
+
+    def __init__(self, provider: str, requests_per_minute: Optional[int] = None,
+                 tokens_per_minute: Optional[int] = None):
+        self.provider = provider
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.concurrency = AdaptiveConcurrency(Config.ai_initial_in_flight, Config.ai_max_in_flight,
+                                               backoff=Config.ai_backoff_factor)
+        self.throttled = 0
+        self.hedger = Hedger()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: int) -> float:
+        """Reserve budget for one request and return the seconds to wait first."""
+        waits = [self._paused_until - time.monotonic()]
+        if self.requests is not None:
+            waits.append(self.requests.reserve(1))
+        if self.tokens is not None and tokens:
+            waits.append(self.tokens.reserve(tokens))
+        return max(0.0, *waits)
+
+    def _can_hedge(self, tokens: int) -> bool:
+        """Reserve budget for a duplicate request if there is room without waiting."""
+        if time.monotonic() < self._paused_until:
+            return False
+        if self.requests is not None and not self.requests.try_reserve(1):
+            return False
+        if self.tokens is not None and tokens and not self.tokens.try_reserve(tokens):
+            if self.requests is not None:
+                self.requests.refund(1)
+            return False
+        return True
+
+    def _settle(self, reserved: int, used: int) -> None:
+        """Give back tokens reserved beyond what the provider reported using."""
+        if self.tokens is not None and used and reserved > used:
+            self.tokens.refund(reserved - used)
+
+    def _retry_delay(self, error: BaseException, attempt: int) -> float:
+        """Delay before retrying a throttled request, pausing the whole provider on a Retry-After."""
+        with self._lock:
+            self.throttled += 1
+            wait = retry_after(error)
+            if wait is not None:
+                # Jitter keeps the paused requests from returning in one burst
+                wait += random.uniform(0, Config.ai_retry_base_delay)
+                self._paused_until = max(self._paused_until, time.monotonic() + wait)
+            else:
+                wait = random.uniform(0, min(Config.ai_retry_max_delay, Config.ai_retry_base_delay * 2 ** attempt))
+        console.print(f"[yellow]Warning: {self.provider} throttled a request, retrying in {wait:.1f}s[/]")
+        return wait
+
+    def call(self, request: Callable[[], T], tokens: int = 0,
+             usage: Optional[Callable[[T], int]] = None) -> T:
+        """Run ``request`` within the limits, retrying it when throttled.
+
+        ``usage`` returns the tokens a response actually used, so unused
+        reserved tokens go back to the bucket.
+        """
+        attempts = Config.ai_retry_attempts + 1
+        for attempt in range(attempts):
+            delay = self._reserve(tokens)
+            if delay:
+                time.sleep(delay)
+            self.concurrency.acquire()
+            try:
+                response = self.hedger.run(request, lambda: self._can_hedge(tokens))
+            except Exception as e:
+                throttled = is_throttle(e)
+                self.concurrency.release(THROTTLED if throttled else FAILED)
+                if not throttled or attempt == attempts - 1:
+                    raise
+                time.sleep(self._retry_delay(e, attempt))
+                continue
+            self.concurrency.release(SUCCESS)
+            if usage is not None:
+                self._settle(tokens, usage(response))
+            return response
+
+    async def call_async(self, request: Callable[[], Awaitable[T]], tokens: int = 0,
+                         usage: Optional[Callable[[T], int]] = None) -> T:
+        """Async variant of ``call``."""
+        attempts = Config.ai_retry_attempts + 1
+        for attempt in range(attempts):
+            delay = self._reserve(tokens)
+            if delay:
+                await asyncio.sleep(delay)
+            await self.concurrency.acquire_async()
+            try:
+                response = await self.hedger.run_async(request, lambda: self._can_hedge(tokens))
+            except Exception as e:
+                throttled = is_throttle(e)
+                self.concurrency.release(THROTTLED if throttled else FAILED)
+                if not throttled or attempt == attempts - 1:
+                    raise
+                await asyncio.sleep(self._retry_delay(e, attempt))
+                continue
+            self.concurrency.release(SUCCESS)
+            if usage is not None:
+                self._settle(tokens, usage(response))
+            return response
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def rate_limiter(provider: str) -> RateLimiter:
+    """Shared RateLimiter for ``provider``, configured from Config.ai_rate_limits.
+
+    Limits apply per provider account, so every client in the process
+    draws from the same one.
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            limits: Dict[str, Any] = Config.ai_rate_limits.get(provider, {})
+            limiter = _limiters[provider] = RateLimiter(provider, limits.get("requests_per_minute"),
+                                                        limits.get("tokens_per_minute"))
+        return limiter
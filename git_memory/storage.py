@@ -0,0 +1,200 @@
+"""Placement of per-commit files inside .history."""
+
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, Optional, TextIO, Union
+
+from .compression import PATCH_NAMES, open_patch_stream
+from .config import Config
+from .pack import PACK_DIR, open_pack_store
+from .writer import note_write
+
+FLAT = "flat"  # .history/<hash>/
+SHARDED = "sharded"  # .history/<hash[:2]>/<hash[2:]>/, like git's loose objects
+LAYOUTS = (FLAT, SHARDED)
+
+TREE = "tree"  # A directory of files per commit
+PACK = "pack"  # Records appended to .history/packs/
+BACKENDS = (TREE, PACK)
+
+# Records the layout of an existing .history so later runs keep writing it
+LAYOUT_FILE = "layout"
+
+
+@lru_cache(maxsize=None)
+def history_layout(history_dir: Path) -> str:
+    """Layout new commit directories are written in.
+
+    The layout recorded in ``history_dir`` wins over Config.history_layout,
+    so a migrated history is never extended in the old layout.
+    """
+    try:
+        layout = (history_dir / LAYOUT_FILE).read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return Config.history_layout
+    return layout if layout in LAYOUTS else Config.history_layout
+
+
+def set_history_layout(history_dir: Path, layout: str) -> None:
+    """Record ``layout`` for ``history_dir``."""
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown history layout: {layout} (expected one of {', '.join(LAYOUTS)})")
+    (history_dir / LAYOUT_FILE).write_text(f"{layout}\n", encoding="utf-8")
+    history_layout.cache_clear()
+
+
+def commit_dir(history_dir: Path, commit_hash: str, layout: Optional[str] = None) -> Path:
+    """Directory a commit's files are written to."""
+    if (layout or history_layout(history_dir)) == SHARDED:
+        return history_dir / commit_hash[:2] / commit_hash[2:]
+    return history_dir / commit_hash
+
+
+def find_commit_dir(history_dir: Path, commit_hash: str) -> Optional[Path]:
+    """Existing directory of a commit in either layout."""
+    for layout in (history_layout(history_dir), *LAYOUTS):
+        path = commit_dir(history_dir, commit_hash, layout)
+        if path.is_dir():
+            return path
+    return None
+
+
+def iter_commit_dirs(history_dir: Path) -> Iterator[tuple[str, Path]]:
+    """List ``(hash, directory)`` for every commit directory in either layout."""
+    if not history_dir.exists():
+        return
+    for item in history_dir.iterdir():
+        if not item.is_dir():
+            continue
+        if len(item.name) == 40:  # Git commit hash length
+            yield item.name, item
+        elif len(item.name) == 2:
+            for child in item.iterdir():
+                if child.is_dir() and len(child.name) == 38:
+                    yield item.name + child.name, child
+
+
+def migrate_layout(history_dir: Path, layout: str) -> Dict[str, Path]:
+    """Move every commit directory into ``layout`` and record it as current.
+
+    Returns the new directory of each moved commit. Safe to rerun after an
+    interruption, since directories already in place are left alone.
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown history layout: {layout} (expected one of {', '.join(LAYOUTS)})")
+    moved = {}
+    for commit_hash, path in list(iter_commit_dirs(history_dir)):
+        target = commit_dir(history_dir, commit_hash, layout)
+        if path == target:
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        path.rename(target)
+        moved[commit_hash] = target
+        if layout == FLAT and not any(path.parent.iterdir()):
+            path.parent.rmdir()
+    set_history_layout(history_dir, layout)
+    return moved
+
+
+def write_atomic(path: Path, content: Union[str, bytes]) -> None:
+    """Write a file through a temporary file, so readers never see it half-written."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    if isinstance(content, bytes):
+        tmp_path.write_bytes(content)
+    else:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+    tmp_path.replace(path)
+    note_write(path)
+
+
+def store_commit_files(history_dir: Path, commit_hash: str, files: Dict[str, Union[str, bytes]],
+                       streamed_patch: Optional[Path] = None) -> None:
+    """Write a commit's files with the configured Config.storage_backend.
+
+    ``streamed_patch`` is a patch already written to the commit's directory
+    during extraction; the pack backend moves it into the pack. Text is
+    stored as UTF-8 and bytes as they are.
+    """
+    if Config.storage_backend not in BACKENDS:
+        raise ValueError(f"Unknown storage backend: {Config.storage_backend} "
+                         f"(expected one of {', '.join(BACKENDS)})")
+    
+    if Config.storage_backend == TREE:
+        path = commit_dir(history_dir, commit_hash)
+        path.mkdir(parents=True, exist_ok=True)
+        for name, content in files.items():
+            write_atomic(path / name, content)
+        return
+    
+    data = {}
+    if streamed_patch is not None:
+        data[streamed_patch.name] = streamed_patch.read_bytes()
+    data.update((name, content if isinstance(content, bytes) else content.encode("utf-8"))
+                for name, content in files.items())
+    open_pack_store(history_dir).append(commit_hash, data)
+    if streamed_patch is not None:
+        streamed_patch.unlink()
+        # Drop the directory (and shard) the patch was streamed into once empty
+        for parent in (streamed_patch.parent, streamed_patch.parent.parent):
+            if parent == history_dir or any(parent.iterdir()):
+                break
+            parent.rmdir()
+
+
+def read_commit_file(history_dir: Path, commit_hash: str, name: str) -> Optional[bytes]:
+    """Contents of one of a commit's files from either backend, or None."""
+    path = find_commit_dir(history_dir, commit_hash)
+    if path is not None and (path / name).is_file():
+        return (path / name).read_bytes()
+    return open_pack_store(history_dir).read_file(commit_hash, name)
+
+
+def open_commit_patch(history_dir: Path, commit_hash: str) -> Optional[TextIO]:
+    """Open a commit's stored patch as text from either backend, or None.
+
+    Compressed patches are decompressed lazily as the stream is read.
+    """
+    path = find_commit_dir(history_dir, commit_hash)
+    if path is not None:
+        for name in PATCH_NAMES:
+            if (path / name).is_file():
+                return open_patch_stream(history_dir, path / name, name)
+    files = open_pack_store(history_dir).read(commit_hash) or {}
+    for name in PATCH_NAMES:
+        if name in files:
+            return open_patch_stream(history_dir, files[name], name)
+    return None
+
+
+def commit_location(history_dir: Path, commit_hash: str) -> str:
+    """Where a commit's files are stored, relative to ``history_dir``."""
+    store = open_pack_store(history_dir)
+    entry = store.entries.get(commit_hash)
+    if entry is not None and find_commit_dir(history_dir, commit_hash) is None:
+        return f"{PACK_DIR}/{entry[0]}"
+    return commit_dir(history_dir, commit_hash).relative_to(history_dir).as_posix()
+
+
+def iter_packed_commits(history_dir: Path) -> Iterator[tuple[str, str]]:
+    """List ``(hash, location)`` for every packed commit."""
+    store = open_pack_store(history_dir)
+    for commit_hash, (pack_name, _offset, _length) in list(store.entries.items()):
+        yield commit_hash, f"{PACK_DIR}/{pack_name}"
+
+
+def export_tree(history_dir: Path) -> Dict[str, Path]:
+    """Write every packed commit out as a commit directory.
+
+    Returns the directory of each exported commit. The packs are left in
+    place; readers prefer the exported directories from then on.
+    """
+    exported = {}
+    store = open_pack_store(history_dir)
+    for commit_hash, files in store:
+        path = commit_dir(history_dir, commit_hash)
+        path.mkdir(parents=True, exist_ok=True)
+        for name, data in files.items():
+            write_atomic(path / name, data)
+        exported[commit_hash] = path
+    return exported
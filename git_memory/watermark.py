@@ -0,0 +1,72 @@
+"""Per-branch watermark of the last fully processed tip."""
+
+import json
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import git
+
+
+class Watermark:
+    """Last processed tip per branch, stored in ``.history/watermark.json``.
+    
+    Each entry also remembers the walk settings it was produced with, since a
+    watermark is only valid for a rerun that would make the same decisions.
+    """
+    
+    file_name = "watermark.json"
+    
+    def __init__(self, history_dir: Path):
+        self.path = history_dir / self.file_name
+        self.branches: Dict[str, Dict[str, Any]] = {}
+        if self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.branches = json.load(f).get("branches", {})
+            except (ValueError, AttributeError):
+                self.branches = {}  # Corrupt watermark - fall back to a full walk
+    
+    def get(self, branch: str) -> Optional[Dict[str, Any]]:
+        """Watermark entry for ``branch``, if any."""
+        return self.branches.get(branch)
+    
+    def update(self, branch: str, tip: str, min_diff_lines: Optional[int], first_parent: bool) -> None:
+        """Record ``tip`` as fully processed for ``branch``."""
+        self.branches[branch] = {
+            "tip": tip,
+            "min_diff_lines": min_diff_lines,
+            "first_parent": first_parent,
+        }
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"branches": self.branches}, f, indent=2)
+        tmp_path.replace(self.path)
+    
+    def walk_range(self, repo: git.Repo, branch: str, min_diff_lines: Optional[int],
+                   first_parent: bool) -> str:
+        """Revision range still to walk for ``branch``: ``tip..HEAD`` or ``HEAD``.
+        
+        Falls back to a full walk when there is no watermark, when the settings
+        could now admit commits the previous run skipped, or when history was
+        rewritten and the watermark is no longer an ancestor of HEAD.
+        """
+        entry = self.get(branch)
+        if entry is None or entry.get("first_parent") != first_parent:
+            return "HEAD"
+        
+        previous_threshold = entry.get("min_diff_lines")
+        if previous_threshold is not None and (min_diff_lines is None or min_diff_lines < previous_threshold):
+            return "HEAD"
+        
+        try:
+            repo.git.merge_base("--is-ancestor", entry["tip"], "HEAD")
+        except git.exc.GitCommandError:
+            return "HEAD"
+        return f"{entry['tip']}..HEAD"
+
+
+def head_branch(repo: git.Repo) -> str:
+    """Name of the checked-out branch, or ``HEAD`` when detached."""
+    if repo.head.is_detached:
+        return "HEAD"
+    return repo.head.ref.path
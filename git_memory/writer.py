@@ -0,0 +1,139 @@
+"""Background thread that performs .history writes off the processing loop."""
+
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, List, Optional
+
+from .config import Config
+from .pipeline import StageStats
+
+_tracked = threading.local()
+
+
+def note_write(path: Path) -> None:
+    """Register a written file for the running writer batch to fsync."""
+    paths = getattr(_tracked, "paths", None)
+    if paths is not None:
+        paths.append(path)
+
+
+def _fsync_paths(paths: List[Path]) -> None:
+    directories = set()
+    for path in dict.fromkeys(paths):
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except FileNotFoundError:
+            continue  # Replaced or removed later in the same batch
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        directories.add(path.parent)
+    # Persist the renames that put the files in place
+    for directory in directories:
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass  # Some filesystems cannot fsync directories
+        finally:
+            os.close(fd)
+
+
+class BackgroundWriter:
+    """Run write tasks on one thread, in submission order.
+
+    ``submit`` blocks once Config.writer_queue_size tasks are pending, so a
+    slow disk applies backpressure instead of buffering without bound. The
+    thread drains whatever is queued as one batch and, with
+    Config.writer_fsync, fsyncs every file the batch wrote once at its end.
+    The first error stops later tasks and is raised on the submitting
+    thread by the next ``submit``, ``flush`` or ``close``. Time spent
+    writing is added to ``stats``.
+    """
+
+    def __init__(self, max_pending: Optional[int] = None, fsync: Optional[bool] = None,
+                 stats: Optional[StageStats] = None):
+        self.fsync = Config.writer_fsync if fsync is None else fsync
+        self.stats = stats
+        self._queue: queue.Queue = queue.Queue(Config.writer_queue_size if max_pending is None else max_pending)
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="git-memory-writer", daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> "BackgroundWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        try:
+            self.close()
+        except Exception:
+            if exc_type is None:
+                raise
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while batch[-1] is not None:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            _tracked.paths = []
+            start = time.perf_counter()
+            try:
+                for item in batch:
+                    if item is None or self._error is not None:
+                        continue
+                    fn, args, kwargs = item
+                    try:
+                        fn(*args, **kwargs)
+                    except BaseException as e:
+                        self._error = e
+                if self.fsync and self._error is None:
+                    _fsync_paths(_tracked.paths)
+            except BaseException as e:
+                self._error = self._error or e
+            finally:
+                _tracked.paths = None
+                if self.stats is not None:
+                    self.stats.add(busy=time.perf_counter() - start)
+                for _ in batch:
+                    self._queue.task_done()
+            if batch[-1] is None:
+                return
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+        """Queue ``fn(*args, **kwargs)`` behind every earlier task."""
+        self._raise_error()
+        self._queue.put((fn, args, kwargs))
+
+    def flush(self) -> None:
+        """Wait until every queued task has run."""
+        self._queue.join()
+        self._raise_error()
+
+    def close(self) -> None:
+        """Run the remaining tasks and stop the thread."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._raise_error()
+
+
+def run_write(writer: Optional[BackgroundWriter], fn: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+    """Queue a write on ``writer``, or perform it right away without one."""
+    if writer is None:
+        fn(*args, **kwargs)
+    else:
+        writer.submit(fn, *args, **kwargs)
@@ -1,17 +1,31 @@
 """Tests for the AI module."""
 
+import asyncio
+
+import httpx
+import openai
 import pytest
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import AsyncMock, Mock, patch, MagicMock
 from git_memory.ai import (
     CommitChange,
     CommitMemory,
+    BatchedCommitMemory,
+    CommitMemoryBatch,
     ProjectMemory,
     InstructorAIClient,
+    AsyncInstructorAIClient,
     create_ai_client,
+    get_ai_client,
+    AISession,
+    batch_by_budget,
+    estimate_tokens,
+    response_usage,
     summarize_diff,
     generate_project_memory,
     generate_diagram
 )
+from git_memory.cache import ResponseCache
+from git_memory.config import Config
 
 
 class TestCommitChange:
@@ -189,6 +203,34 @@ class TestInstructorAIClient:
             assert len(result.added) == 1
             assert result.added[0].description == "Changes from commit: Fix bug"
     
+    @patch('git_memory.ai.InstructorAIClient._create_client')
+    def test_summarize_commit_uses_cache(self, mock_create_client, sample_commit_memory, temp_dir):
+        """Test that a cached response is returned without another request."""
+        mock_client = Mock()
+        mock_client.chat.completions.create.side_effect = [sample_commit_memory, Exception("API Error")]
+        mock_create_client.return_value = mock_client
+        
+        ai_client = InstructorAIClient(cache=ResponseCache(temp_dir / "cache.db"))
+        
+        first = ai_client.summarize_commit("+ added authentication", "Add auth", "abc123")
+        # Same message and diff under a rewritten hash still hits
+        second = ai_client.summarize_commit("+ added authentication", "Add auth", "fff999")
+        
+        assert first == second == sample_commit_memory
+        mock_client.chat.completions.create.assert_called_once()
+    
+    @patch('git_memory.ai.InstructorAIClient._create_client')
+    def test_fallback_is_not_cached(self, mock_create_client, sample_commit_memory, temp_dir):
+        """Test that fallback memories from failed requests are not cached."""
+        mock_client = Mock()
+        mock_client.chat.completions.create.side_effect = [Exception("API Error"), sample_commit_memory]
+        mock_create_client.return_value = mock_client
+        
+        ai_client = InstructorAIClient(cache=ResponseCache(temp_dir / "cache.db"))
+        
+        assert ai_client.summarize_commit("+ fix", "Fix bug", "abc123").summary == "Fix bug"
+        assert ai_client.summarize_commit("+ fix", "Fix bug", "abc123") == sample_commit_memory
+    
     def test_load_prompt_file_not_found(self):
         """Test loading non-existent prompt file."""
         ai_client = InstructorAIClient()
@@ -198,6 +240,386 @@ class TestInstructorAIClient:
             assert result == ""
 
 
+class TestHierarchicalAggregation:
+    """Test cases for map-reduce aggregation of long histories."""
+    
+    def test_batch_by_budget(self):
+        """Test splitting consecutive items into budgeted batches."""
+        assert batch_by_budget([3, 3, 3, 3], 6) == [range(0, 2), range(2, 4)]
+        assert batch_by_budget([10, 1, 1], 5) == [range(0, 1), range(1, 3)]
+        assert batch_by_budget([], 5) == []
+    
+    def test_batch_by_budget_min_size(self):
+        """Test that reduction batches always merge at least two items."""
+        assert batch_by_budget([10, 10, 10], 5, min_size=2) == [range(0, 3)]
+        assert batch_by_budget([3, 3, 3, 3, 3], 6, min_size=2) == [range(0, 2), range(2, 5)]
+    
+    @patch('git_memory.ai.InstructorAIClient._create_client')
+    def test_short_history_single_prompt(self, mock_create_client):
+        """Test that histories within budget are aggregated in one call."""
+        mock_client = Mock()
+        mock_client.chat.completions.create.return_value = ProjectMemory(current_state="Done")
+        mock_create_client.return_value = mock_client
+        
+        ai_client = InstructorAIClient()
+        result = ai_client.aggregate_memories([CommitMemory(summary=f"Commit {i}") for i in range(3)], 3)
+        
+        assert result.current_state == "Done"
+        mock_client.chat.completions.create.assert_called_once()
+    
+    @patch('git_memory.ai.InstructorAIClient._create_client')
+    def test_long_history_reduces_as_tree(self, mock_create_client):
+        """Test that long histories are mapped over leaf batches and merged."""
+        calls = []
+        
+        def create(**kwargs):
+            user_prompt = kwargs["messages"][1]["content"]
+            calls.append("merge" if user_prompt.startswith("Merge") else "leaf")
+            return ProjectMemory(current_state=f"State {len(calls)}", major_features=[f"Feature {len(calls)}"])
+        
+        mock_client = Mock()
+        mock_client.chat.completions.create.side_effect = create
+        mock_create_client.return_value = mock_client
+        memories = [CommitMemory(summary=f"Commit {i} " + "x" * 200) for i in range(20)]
+        
+        ai_client = InstructorAIClient()
+        with patch.object(ai_client, '_load_prompt', return_value=""), \
+                patch.object(Config, 'ai_aggregation_input_tokens', 200):
+            result = ai_client.aggregate_memories(memories, 20)
+        
+        assert calls.count("leaf") > 1
+        assert calls.count("merge") >= 1
+        assert calls[-1] == "merge"
+        assert isinstance(result, ProjectMemory)
+    
+    @patch('git_memory.ai.InstructorAIClient._create_client')
+    def test_every_node_fits_the_budget(self, mock_create_client):
+        """Test that leaf prompts, timeline and system prompt included, stay within the input budget."""
+        ai_client = InstructorAIClient()
+        sizes = []
+        
+        def create(**kwargs):
+            sizes.append(ai_client._messages_tokens(kwargs["messages"]))
+            return ProjectMemory(current_state="State")
+        
+        mock_client = Mock()
+        mock_client.chat.completions.create.side_effect = create
+        ai_client.client = mock_client
+        memories = [CommitMemory(summary=f"Fix typo {i}") for i in range(300)]
+        
+        with patch.object(Config, 'ai_aggregation_input_tokens', 1000):
+            ai_client.aggregate_memories(memories, 300)
+        
+        assert len(sizes) > 2
+        assert max(sizes) <= 1000
+    
+    @patch('git_memory.ai.InstructorAIClient._create_client')
+    def test_merge_failure_falls_back_to_concatenation(self, mock_create_client):
+        """Test that a failed merge keeps the partial memories' content."""
+        mock_client = Mock()
+        mock_client.chat.completions.create.side_effect = Exception("API Error")
+        mock_create_client.return_value = mock_client
+        parts = [ProjectMemory(current_state="Old", major_features=["Auth"]),
+                 ProjectMemory(current_state="New", major_features=["Auth", "Billing"])]
+        
+        ai_client = InstructorAIClient()
+        with patch.object(ai_client, '_load_prompt', return_value=""):
+            result = ai_client._merge_project_memories(parts, 10)
+        
+        assert result.major_features == ["Auth", "Billing"]
+        assert result.current_state == "New"
+
+
+class TestFoldMemories:
+    """Test cases for folding new commits into an existing project memory."""
+    
+    @patch('git_memory.ai.InstructorAIClient._create_client')
+    def test_fold_sends_previous_and_new_commits(self, mock_create_client):
+        """Test that a fold prompt holds the previous memory and only the new commits."""
+        mock_client = Mock()
+        mock_client.chat.completions.create.return_value = ProjectMemory(current_state="Updated")
+        mock_create_client.return_value = mock_client
+        previous = ProjectMemory(current_state="Before", major_features=["Auth"])
+        
+        ai_client = InstructorAIClient()
+        result = ai_client.fold_memories(previous, [CommitMemory(summary="Add billing")], 11)
+        
+        assert result.current_state == "Updated"
+        user_prompt = mock_client.chat.completions.create.call_args.kwargs["messages"][1]["content"]
+        assert "Before" in user_prompt and "Auth" in user_prompt
+        assert "Commit 11: Add billing" in user_prompt
+    
+    @patch('git_memory.ai.InstructorAIClient._create_client')
+    def test_fold_failure_keeps_previous(self, mock_create_client):
+        """Test that a failed fold returns the previous memory."""
+        mock_client = Mock()
+        mock_client.chat.completions.create.side_effect = Exception("API Error")
+        mock_create_client.return_value = mock_client
+        previous = ProjectMemory(current_state="Before")
+        
+        ai_client = InstructorAIClient()
+        
+        assert ai_client.fold_memories(previous, [CommitMemory(summary="Add billing")], 2) is previous
+
+
+
+def _large_diff(files=4):
+    return "".join(
+        f"diff --git a/f{i}.py b/f{i}.py\n--- a/f{i}.py\n+++ b/f{i}.py\n@@ -1,1 +1,1 @@\n" + "+x = 1\n" * 100
+        for i in range(files)
+    )
+
+
+class TestLargeCommits:
+    """Test cases for map-reduce summarization of diffs over the prompt budget."""
+    
+    def test_estimate_tokens_without_model(self):
+        """Test the character-based estimate used when no tokenizer applies."""
+        assert estimate_tokens("x" * 400) == 101
+    
+    @patch('git_memory.ai.InstructorAIClient._create_client')
+    def test_small_diff_single_call(self, mock_create_client):
+        """Test that a diff within budget is summarized in one call."""
+        mock_client = Mock()
+        mock_client.chat.completions.create.return_value = CommitMemory(summary="Small")
+        mock_create_client.return_value = mock_client
+        
+        ai_client = InstructorAIClient()
+        with patch.object(ai_client, '_load_prompt', return_value=""):
+            result = ai_client.summarize_commit(_large_diff(1), "Small change", "abc123")
+        
+        assert result.summary == "Small"
+        mock_client.chat.completions.create.assert_called_once()
+    
+    @patch('git_memory.ai.InstructorAIClient._create_client')
+    def test_large_diff_split_and_merged(self, mock_create_client):
+        """Test that every part of a large diff is summarized and the parts merged."""
+        prompts = []
+        
+        def create(**kwargs):
+            user_prompt = kwargs["messages"][1]["content"]
+            prompts.append(user_prompt)
+            if user_prompt.startswith("Merge"):
+                return CommitMemory(summary="Merged")
+            return CommitMemory(summary="Part", added=[CommitChange(description="Part change", impact="minor")])
+        
+        mock_client = Mock()
+        mock_client.chat.completions.create.side_effect = create
+        mock_create_client.return_value = mock_client
+        
+        ai_client = InstructorAIClient()
+        with patch.object(ai_client, '_load_prompt', return_value=""), \
+                patch.object(Config, 'ai_commit_input_tokens', 400):
+            result = ai_client.summarize_commit(_large_diff(4), "Big change", "abc123")
+        
+        parts = [prompt for prompt in prompts if not prompt.startswith("Merge")]
+        assert len(parts) == 4
+        assert all("of 4 of a large diff" in prompt for prompt in parts)
+        assert prompts[-1].startswith("Merge")
+        assert result.summary == "Merged"
+    
+    @patch('git_memory.ai.InstructorAIClient._create_client')
+    def test_chunk_count_is_capped(self, mock_create_client):
+        """Test that at most Config.ai_commit_max_chunks parts are summarized."""
+        ai_client = InstructorAIClient()
+        with patch.object(ai_client, '_load_prompt', return_value=""), \
+                patch.object(Config, 'ai_commit_input_tokens', 400), \
+                patch.object(Config, 'ai_commit_max_chunks', 2):
+            chunks = ai_client._diff_chunks(_large_diff(4), "Big change", "abc123")
+        
+        assert len(chunks) == 2
+        assert "2 more parts of this diff omitted" in chunks[-1]
+    
+    @patch('git_memory.ai.InstructorAIClient._create_client')
+    def test_merge_failure_concatenates_parts(self, mock_create_client):
+        """Test that a failed merge keeps the changes found in every part."""
+        mock_client = Mock()
+        mock_client.chat.completions.create.side_effect = Exception("API Error")
+        mock_create_client.return_value = mock_client
+        parts = [CommitMemory(summary="A", added=[CommitChange(description="Add auth", impact="major")]),
+                 CommitMemory(summary="B", changed=[CommitChange(description="Update models", impact="minor")])]
+        
+        ai_client = InstructorAIClient()
+        with patch.object(ai_client, '_load_prompt', return_value=""):
+            result = ai_client._merge_commit_memories(parts, "Big change", "abc123", "diff")
+        
+        assert [c.description for c in result.added] == ["Add auth"]
+        assert [c.description for c in result.changed] == ["Update models"]
+        assert result.summary == "Big change"
+        assert not result.is_fallback
+    
+    @patch('git_memory.ai.InstructorAIClient._create_client')
+    def test_all_parts_failed_falls_back(self, mock_create_client):
+        """Test that a commit whose every part failed gets a fallback memory."""
+        mock_client = Mock()
+        mock_client.chat.completions.create.side_effect = Exception("API Error")
+        mock_create_client.return_value = mock_client
+        
+        ai_client = InstructorAIClient()
+        with patch.object(ai_client, '_load_prompt', return_value=""), \
+                patch.object(Config, 'ai_commit_input_tokens', 400):
+            result = ai_client.summarize_commit(_large_diff(4), "Big change", "abc123")
+        
+        assert result.is_fallback
+        assert mock_client.chat.completions.create.call_count == 4
+    
+    @patch('git_memory.ai.AsyncInstructorAIClient._create_client')
+    def test_async_large_diff_split_and_merged(self, mock_create_client):
+        """Test that the async client summarizes parts concurrently and merges them."""
+        async def create(**kwargs):
+            if kwargs["messages"][1]["content"].startswith("Merge"):
+                return CommitMemory(summary="Merged")
+            return CommitMemory(summary="Part")
+        
+        mock_client = Mock()
+        mock_client.chat.completions.create = AsyncMock(side_effect=create)
+        mock_create_client.return_value = mock_client
+        
+        ai_client = AsyncInstructorAIClient()
+        with patch.object(ai_client, '_load_prompt', return_value=""), \
+                patch.object(Config, 'ai_commit_input_tokens', 400):
+            result = asyncio.run(ai_client.summarize_commit_async(_large_diff(4), "Big change", "abc123"))
+        
+        assert result.summary == "Merged"
+        assert mock_client.chat.completions.create.await_count == 5
+
+
+class TestBatchedCommits:
+    """Test cases for summarizing several small commits in one request."""
+    
+    COMMITS = [("+a\n", "Fix typo", "a" * 40), ("+b\n", "Bump version", "b" * 40), ("+c\n", "Tidy", "c" * 40)]
+    
+    @patch('git_memory.ai.InstructorAIClient._create_client')
+    def test_one_request_keyed_by_hash(self, mock_create_client):
+        """Test that memories are matched to commits by hash, whatever their order."""
+        mock_client = Mock()
+        batch = CommitMemoryBatch(memories=[
+            BatchedCommitMemory(commit_hash="c" * 40, summary="C"),
+            BatchedCommitMemory(commit_hash="a" * 7, summary="A"),
+            BatchedCommitMemory(commit_hash="b" * 40, summary="B"),
+        ])
+        batch._raw_response = Mock(usage=Mock(prompt_tokens=300, completion_tokens=90))
+        mock_client.chat.completions.create.return_value = batch
+        mock_create_client.return_value = mock_client
+        
+        ai_client = InstructorAIClient()
+        with patch.object(ai_client, '_load_prompt', return_value=""):
+            memories = ai_client.summarize_commits(self.COMMITS)
+        
+        assert [m.summary for m in memories] == ["A", "B", "C"]
+        assert all(type(m) is CommitMemory for m in memories)
+        assert response_usage(memories[0]) == (100, 30)
+        mock_client.chat.completions.create.assert_called_once()
+        kwargs = mock_client.chat.completions.create.call_args.kwargs
+        assert kwargs["response_model"] is CommitMemoryBatch
+        assert all(commit_hash in kwargs["messages"][1]["content"] for _, _, commit_hash in self.COMMITS)
+    
+    @patch('git_memory.ai.InstructorAIClient._create_client')
+    def test_missing_commit_summarized_alone(self, mock_create_client):
+        """Test that a commit left out of the response gets its own request."""
+        def create(**kwargs):
+            if kwargs["response_model"] is CommitMemoryBatch:
+                return CommitMemoryBatch(memories=[BatchedCommitMemory(commit_hash="a" * 40, summary="A"),
+                                                   BatchedCommitMemory(commit_hash="c" * 40, summary="C")])
+            return CommitMemory(summary="Alone")
+        
+        mock_client = Mock()
+        mock_client.chat.completions.create.side_effect = create
+        mock_create_client.return_value = mock_client
+        
+        ai_client = InstructorAIClient()
+        with patch.object(ai_client, '_load_prompt', return_value=""):
+            memories = ai_client.summarize_commits(self.COMMITS)
+        
+        assert [m.summary for m in memories] == ["A", "Alone", "C"]
+        assert mock_client.chat.completions.create.call_count == 2
+    
+    @patch('git_memory.ai.InstructorAIClient._create_client')
+    def test_failed_batch_falls_back_to_single_requests(self, mock_create_client):
+        """Test that every commit of a failed batch is summarized on its own."""
+        def create(**kwargs):
+            if kwargs["response_model"] is CommitMemoryBatch:
+                raise Exception("API Error")
+            return CommitMemory(summary="Alone")
+        
+        mock_client = Mock()
+        mock_client.chat.completions.create.side_effect = create
+        mock_create_client.return_value = mock_client
+        
+        ai_client = InstructorAIClient()
+        with patch.object(ai_client, '_load_prompt', return_value=""):
+            memories = ai_client.summarize_commits(self.COMMITS)
+        
+        assert [m.summary for m in memories] == ["Alone"] * 3
+        assert mock_client.chat.completions.create.call_count == 4
+    
+    @patch('git_memory.ai.InstructorAIClient._create_client')
+    def test_batch_is_cached(self, mock_create_client, temp_dir):
+        """Test that a repeated batch is answered from the cache."""
+        mock_client = Mock()
+        mock_client.chat.completions.create.return_value = CommitMemoryBatch(memories=[
+            BatchedCommitMemory(commit_hash=commit_hash, summary=message) for _, message, commit_hash in self.COMMITS])
+        mock_create_client.return_value = mock_client
+        
+        ai_client = InstructorAIClient(cache=ResponseCache(temp_dir / "cache.db"))
+        with patch.object(ai_client, '_load_prompt', return_value=""):
+            first = ai_client.summarize_commits(self.COMMITS)
+            second = ai_client.summarize_commits(self.COMMITS)
+        
+        assert [m.summary for m in second] == [m.summary for m in first]
+        mock_client.chat.completions.create.assert_called_once()
+    
+    @patch('git_memory.ai.AsyncInstructorAIClient._create_client')
+    def test_async_batch(self, mock_create_client):
+        """Test that the async client matches batch memories and fills in missing ones."""
+        async def create(**kwargs):
+            if kwargs["response_model"] is CommitMemoryBatch:
+                return CommitMemoryBatch(memories=[BatchedCommitMemory(commit_hash="b" * 40, summary="B")])
+            return CommitMemory(summary="Alone")
+        
+        mock_client = Mock()
+        mock_client.chat.completions.create = AsyncMock(side_effect=create)
+        mock_create_client.return_value = mock_client
+        
+        ai_client = AsyncInstructorAIClient()
+        with patch.object(ai_client, '_load_prompt', return_value=""):
+            memories = asyncio.run(ai_client.summarize_commits_async(self.COMMITS))
+        
+        assert [m.summary for m in memories] == ["Alone", "B", "Alone"]
+
+
+
+class TestRateLimiting:
+    """Test cases for requests sent through the provider's rate limiter."""
+    
+    @patch('git_memory.ai.InstructorAIClient._create_client')
+    def test_throttled_commit_is_retried_not_fallback(self, mock_create_client):
+        """Test that a 429 is retried instead of becoming a fallback memory."""
+        request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+        throttle = openai.RateLimitError("Rate limit reached", body=None,
+                                         response=httpx.Response(429, headers={"retry-after": "1"}, request=request))
+        mock_client = Mock()
+        mock_client.chat.completions.create.side_effect = [throttle, CommitMemory(summary="Analyzed")]
+        mock_create_client.return_value = mock_client
+        
+        ai_client = InstructorAIClient()
+        with patch.object(ai_client, '_load_prompt', return_value=""), \
+                patch('git_memory.ratelimit.time.sleep'), patch('git_memory.ratelimit.console'):
+            result = ai_client.summarize_commit("+x\n", "Small change", "abc123")
+        
+        assert result.summary == "Analyzed"
+        assert not result.is_fallback
+        assert mock_client.chat.completions.create.call_count == 2
+    
+    @patch('git_memory.ai.openai.OpenAI')
+    @patch('git_memory.ai.instructor.from_openai')
+    def test_sdk_retries_disabled(self, mock_from_openai, mock_openai):
+        """Test that the OpenAI SDK leaves retries to the rate limiter."""
+        with patch('git_memory.ai.Config.openai_api_key', 'test-key'):
+            InstructorAIClient()
+        
+        assert mock_openai.call_args.kwargs["max_retries"] == 0
+
 class TestFactoryFunctions:
     """Test module factory functions."""
     
@@ -250,6 +672,57 @@ class TestFactoryFunctions:
         assert result == mock_project_memory
 
 
+class TestAISession:
+    """Test the shared AI client session."""
+    
+    @patch('git_memory.ai.InstructorAIClient')
+    def test_session_reuses_one_client(self, mock_client_class):
+        """Test that calls inside a session share one pooled client."""
+        mock_client = Mock()
+        mock_client_class.return_value = mock_client
+        
+        with AISession("openai", "gpt-4o") as session:
+            summarize_diff("+ a", "First", "abc1")
+            summarize_diff("+ b", "Second", "abc2")
+            generate_project_memory([], 2)
+        
+        mock_client_class.assert_called_once_with("openai", "gpt-4o", http_client=session.http_client, cache=None)
+        assert mock_client.summarize_commit.call_count == 2
+        mock_client.aggregate_memories.assert_called_once()
+        assert session.http_client.is_closed
+    
+    @patch('git_memory.ai.create_ai_client')
+    def test_get_ai_client_outside_session(self, mock_create_client):
+        """Test that a fresh client is created when no matching session is open."""
+        with patch('git_memory.ai.InstructorAIClient'):
+            with AISession("openai", "gpt-4o"):
+                get_ai_client("local", "llama3")
+        get_ai_client("openai", "gpt-4o")
+        
+        assert mock_create_client.call_count == 2
+    
+    def test_session_pool_settings(self):
+        """Test that pool limits and timeouts come from Config."""
+        with patch('git_memory.ai.Config.ai_timeout', 12), \
+             patch('git_memory.ai.Config.ai_pool_max_connections', 7):
+            session = AISession("local", "llama3")
+        
+        assert session.http_client.timeout.read == 12
+        assert session.http_client._transport._pool._max_connections == 7
+        session.close()
+    
+    @patch('git_memory.ai.instructor.from_openai')
+    @patch('git_memory.ai.openai.OpenAI')
+    def test_client_uses_session_pool(self, mock_openai, mock_instructor):
+        """Test that the OpenAI client is built on the session's HTTP client."""
+        session = AISession("local", "llama3")
+        
+        session.client
+        
+        assert mock_openai.call_args.kwargs["http_client"] is session.http_client
+        session.close()
+
+
 class TestDiagramGeneration:
     """Test diagram generation functionality."""
     
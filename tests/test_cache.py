@@ -0,0 +1,114 @@
+"""Tests for git_memory.cache module."""
+
+import pytest
+from unittest.mock import patch
+
+from git_memory.ai import CommitMemory, ProjectMemory
+from git_memory.cache import ResponseCache, prompts_digest, open_response_cache
+from git_memory.config import Config
+
+
+@pytest.fixture
+def prompts_dir(temp_dir):
+    """Create a prompts directory with a single prompt file."""
+    path = temp_dir / "prompts"
+    path.mkdir()
+    (path / "memory_prompt.md").write_text("Summarize the commit.")
+    return path
+
+
+class TestPromptsDigest:
+    """Test cases for prompts_digest function."""
+
+    def test_digest_changes_with_content(self, prompts_dir):
+        """Test that editing or adding a prompt file changes the digest."""
+        before = prompts_digest(prompts_dir)
+        (prompts_dir / "memory_prompt.md").write_text("Summarize the commit briefly.")
+        edited = prompts_digest(prompts_dir)
+        (prompts_dir / "extra.md").write_text("More")
+
+        assert before != edited
+        assert edited != prompts_digest(prompts_dir)
+
+    def test_missing_directory(self, temp_dir):
+        """Test that a missing prompts directory still yields a digest."""
+        assert prompts_digest(temp_dir / "missing") == prompts_digest(temp_dir / "also-missing")
+
+
+class TestResponseCache:
+    """Test cases for ResponseCache class."""
+
+    def test_roundtrip_across_instances(self, temp_dir, prompts_dir):
+        """Test that cached responses survive reopening the cache."""
+        memory = CommitMemory(summary="Add auth", technical_details="JWT")
+        cache = ResponseCache(temp_dir / "cache.db", prompts_dir=prompts_dir)
+        key = cache.key("commit", "openai", "gpt-4o", "Add auth", "+auth")
+        cache.put(key, memory)
+        cache.close()
+
+        reopened = ResponseCache(temp_dir / "cache.db", prompts_dir=prompts_dir)
+
+        assert reopened.get(key, CommitMemory) == memory
+        assert reopened.get(reopened.key("commit", "openai", "gpt-4o", "Add auth", "+other"), CommitMemory) is None
+
+    def test_prompt_change_invalidates(self, temp_dir, prompts_dir):
+        """Test that editing a prompt drops entries written under the old prompts."""
+        cache = ResponseCache(temp_dir / "cache.db", prompts_dir=prompts_dir)
+        old_key = cache.key("commit", "Add auth")
+        cache.put(old_key, CommitMemory(summary="Add auth"))
+        cache.close()
+
+        (prompts_dir / "memory_prompt.md").write_text("New instructions")
+        reopened = ResponseCache(temp_dir / "cache.db", prompts_dir=prompts_dir)
+
+        assert len(reopened) == 0
+        assert reopened.key("commit", "Add auth") != old_key
+
+    def test_lru_eviction(self, temp_dir, prompts_dir):
+        """Test that the least recently used entries are evicted past the size bound."""
+        entry_size = len(CommitMemory(summary="commit 0").model_dump_json())
+        cache = ResponseCache(temp_dir / "cache.db", max_bytes=entry_size * 2, prompts_dir=prompts_dir)
+
+        with patch("git_memory.cache.time.time", side_effect=[1.0, 2.0, 3.0, 4.0]):
+            cache.put("a", CommitMemory(summary="commit 0"))
+            cache.put("b", CommitMemory(summary="commit 1"))
+            cache.get("a", CommitMemory)
+            cache.put("c", CommitMemory(summary="commit 2"))
+
+        assert len(cache) == 2
+        assert cache.get("b", CommitMemory) is None
+        assert cache.get("a", CommitMemory).summary == "commit 0"
+        assert cache.get("c", CommitMemory).summary == "commit 2"
+
+    def test_incompatible_entry_is_a_miss(self, temp_dir, prompts_dir):
+        """Test that entries failing validation are treated as misses."""
+        cache = ResponseCache(temp_dir / "cache.db", prompts_dir=prompts_dir)
+        cache.put("key", CommitMemory(summary="Add auth"))
+
+        assert cache.get("key", ProjectMemory) is None
+        assert len(cache) == 0
+
+
+class TestOpenResponseCache:
+    """Test cases for open_response_cache function."""
+
+    def test_default_location(self, temp_dir):
+        """Test that the cache lives in a file inside .history by default."""
+        with patch.object(Config, "ai_cache", True), patch.object(Config, "ai_cache_dir", None):
+            cache = open_response_cache(temp_dir / ".history")
+
+        assert cache.path == temp_dir / ".history" / "cache.db"
+        cache.close()
+
+    def test_shared_directory(self, temp_dir):
+        """Test that a configured cache directory is shared across repositories."""
+        with patch.object(Config, "ai_cache", True), patch.object(Config, "ai_cache_dir", str(temp_dir / "shared")):
+            cache = open_response_cache(temp_dir / ".history")
+
+        assert cache.path == temp_dir / "shared" / "responses.db"
+        cache.close()
+
+    def test_disabled(self, temp_dir):
+        """Test that no cache is opened when disabled."""
+        with patch.object(Config, "ai_cache", False):
+            assert open_response_cache(temp_dir / ".history") is None
@@ -0,0 +1,111 @@
+"""Tests for git_memory.compact module."""
+
+from unittest.mock import patch
+
+from git_memory.compact import CompactionStats, compact_diff, compact_for_ai
+from git_memory.config import Config
+
+
+def _section(path, body, header_extra=""):
+    return (f"diff --git a/{path} b/{path}\n{header_extra}index 1111111..2222222 100644\n"
+            f"--- a/{path}\n+++ b/{path}\n{body}")
+
+
+class TestCompactDiff:
+    """Test cases for trimming diffs before summarization."""
+
+    def test_context_trimmed_around_changes(self):
+        """Test that unchanged lines beyond the context window are elided."""
+        body = ("@@ -1,9 +1,9 @@\n"
+                " a\n b\n c\n-old\n+new\n d\n e\n f\n g\n h\n+tail\n")
+
+        compacted = compact_diff(_section("app.py", body), context=1)
+
+        assert compacted == ("diff --git a/app.py b/app.py\n--- a/app.py\n+++ b/app.py\n"
+                             "@@ -1,9 +1,9 @@\n c\n-old\n+new\n d\n ...\n h\n+tail\n")
+
+    def test_zero_context(self):
+        """Test that no context keeps only the changed lines."""
+        body = "@@ -1,3 +1,3 @@\n a\n-old\n+new\n b\n"
+
+        compacted = compact_diff(_section("app.py", body), context=0)
+
+        assert compacted.endswith("@@ -1,3 +1,3 @@\n-old\n+new\n")
+
+    def test_whitespace_only_hunk_collapses(self):
+        """Test that a reindented hunk becomes a single line."""
+        body = ("@@ -1,2 +1,3 @@\n-if x:\n-  y()\n+if x:\n+    y()\n+\n"
+                "@@ -10,1 +11,1 @@\n-a = 1\n+a = 2\n")
+
+        compacted = compact_diff(_section("app.py", body))
+
+        assert "[whitespace-only changes to 5 lines]" in compacted
+        assert "y()" not in compacted
+        assert "-a = 1\n+a = 2\n" in compacted
+
+    def test_lockfile_replaced_with_stat(self):
+        """Test that lock files are reduced to their line counts."""
+        body = "@@ -1,2 +1,3 @@\n-old\n+new\n+newer\n pinned\n"
+
+        compacted = compact_diff(_section("web/package-lock.json", body) + _section("app.py", body))
+
+        assert ("diff --git a/web/package-lock.json b/web/package-lock.json\n"
+                "[+2 -1 lines; generated or lock file, contents omitted]\n") in compacted
+        assert "+newer" in compacted.split("diff --git a/app.py")[1]
+
+    def test_generated_and_minified_files_replaced_with_stat(self):
+        """Test that generated markers and very long lines mark files as stat-only."""
+        generated = compact_diff(_section("api.py", "@@ -0,0 +1,2 @@\n+# @generated by protoc\n+x = 1\n"))
+        minified = compact_diff(_section("bundle.js", "@@ -0,0 +1,1 @@\n+" + "a;" * 400 + "\n"))
+
+        assert "contents omitted" in generated and "protoc" not in generated
+        assert "contents omitted" in minified
+
+    def test_binary_files_dropped(self):
+        """Test that binary file sections are removed entirely."""
+        binary = "diff --git a/logo.png b/logo.png\nindex 1111111..2222222 100644\nBinary files a/logo.png and b/logo.png differ\n"
+        text = _section("app.py", "@@ -1 +1 @@\n-a\n+b\n")
+
+        assert compact_diff(binary + text) == compact_diff(text)
+        assert "logo.png" not in compact_diff(binary + text)
+
+    def test_index_lines_dropped(self):
+        """Test that blob hashes are removed from file headers."""
+        compacted = compact_diff(_section("app.py", "@@ -1 +1 @@\n-a\n+b\n", "new file mode 100644\n"))
+
+        assert "index " not in compacted
+        assert "new file mode 100644\n" in compacted
+
+    def test_hunks_without_file_header(self):
+        """Test that GitPython-style diffs without diff --git lines are still trimmed."""
+        compacted = compact_diff("@@ -1,5 +1,5 @@\n a\n b\n-c\n+d\n e\n f\n", context=0)
+
+        assert compacted == "@@ -1,5 +1,5 @@\n-c\n+d\n"
+
+
+class TestCompactForAI:
+    """Test cases for configurable compaction with token accounting."""
+
+    def test_reports_tokens_before_and_after(self):
+        """Test that token counts are summed across commits."""
+        diff = _section("app.py", "@@ -1,6 +1,6 @@\n a\n b\n c\n-old\n+new\n d\n e\n f\n")
+        stats = CompactionStats()
+
+        for _ in range(2):
+            compacted = compact_for_ai(diff, len, stats)
+
+        assert stats.commits == 2
+        assert stats.tokens_before == 2 * len(diff)
+        assert stats.tokens_after == 2 * len(compacted)
+        assert 0 < stats.saved < 1
+
+    def test_disabled(self):
+        """Test that compaction can be turned off."""
+        diff = _section("yarn.lock", "@@ -1 +1 @@\n-a\n+b\n")
+        stats = CompactionStats()
+
+        with patch.object(Config, 'diff_compaction', False):
+            assert compact_for_ai(diff, len, stats) == diff
+
+        assert stats.commits == 0
+        assert stats.saved == 0.0
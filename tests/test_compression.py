@@ -0,0 +1,104 @@
+"""Tests for git_memory.compression module."""
+
+import gzip
+
+import pytest
+from unittest.mock import patch
+
+from git_memory import compression
+from git_memory.compression import (
+    compress_patch,
+    compress_patch_file,
+    open_patch_stream,
+    patch_codec,
+    patch_name,
+    train_patch_dictionary
+)
+from git_memory.config import Config
+
+PATCH = "diff --git a/app.py b/app.py\n+print('hello')\n-print('bye')\n"
+
+
+class TestPatchCodec:
+    """Test cases for codec selection."""
+
+    def test_names(self):
+        """Test the stored file name of each codec."""
+        assert patch_name("none") == "diff.patch"
+        assert patch_name("gzip") == "diff.patch.gz"
+        assert patch_name("zstd") == "diff.patch.zst"
+
+    def test_unknown_codec(self):
+        """Test that an unknown codec is rejected."""
+        with patch.object(Config, "patch_compression", "lzma"), pytest.raises(ValueError, match="Unknown patch compression"):
+            patch_codec()
+
+    def test_zstd_without_package(self):
+        """Test that zstd without zstandard installed fails clearly."""
+        with patch.object(Config, "patch_compression", "zstd"), patch.object(compression, "zstandard", None):
+            with pytest.raises(ValueError, match="zstandard"):
+                patch_codec()
+
+
+class TestGzip:
+    """Test cases for gzip-compressed patches."""
+
+    def test_compress_and_stream(self, temp_dir):
+        """Test that a compressed patch reads back line by line."""
+        data = compress_patch(temp_dir, PATCH.encode("utf-8"), "gzip")
+
+        assert gzip.decompress(data).decode("utf-8") == PATCH
+        with open_patch_stream(temp_dir, data, "diff.patch.gz") as stream:
+            assert list(stream) == PATCH.splitlines(keepends=True)
+
+    def test_compress_file(self, temp_dir):
+        """Test that a streamed patch file is replaced by its compressed copy."""
+        path = temp_dir / "diff.patch"
+        path.write_text(PATCH)
+
+        compressed = compress_patch_file(temp_dir, path, "gzip")
+
+        assert compressed == temp_dir / "diff.patch.gz"
+        assert not path.exists()
+        with open_patch_stream(temp_dir, compressed, compressed.name) as stream:
+            assert stream.read() == PATCH
+
+    def test_none_is_passthrough(self, temp_dir):
+        """Test that without compression files and bytes are left alone."""
+        path = temp_dir / "diff.patch"
+        path.write_text(PATCH)
+
+        assert compress_patch_file(temp_dir, path, "none") == path
+        assert compress_patch(temp_dir, b"+a", "none") == b"+a"
+        with open_patch_stream(temp_dir, path, path.name) as stream:
+            assert stream.read() == PATCH
+
+
+class TestZstd:
+    """Test cases for zstd-compressed patches."""
+
+    def test_roundtrip_with_dictionary(self, temp_dir):
+        """Test that patches compressed against a trained dictionary read back."""
+        pytest.importorskip("zstandard")
+        samples = [f"diff --git a/f{i}.py b/f{i}.py\n+value = {i}\n-value = {i - 1}\n" * 20 for i in range(200)]
+        with patch.object(Config, "patch_dictionary_bytes", 4096):
+            assert train_patch_dictionary(temp_dir, samples)
+
+        data = compress_patch(temp_dir, PATCH.encode("utf-8"), "zstd")
+
+        with open_patch_stream(temp_dir, data, "diff.patch.zst") as stream:
+            assert stream.read() == PATCH
+
+    def test_dictionary_is_never_replaced(self, temp_dir):
+        """Test that an existing dictionary is kept."""
+        (temp_dir / "patches.dict").write_bytes(b"dictionary")
+
+        assert train_patch_dictionary(temp_dir, [PATCH])
+        assert (temp_dir / "patches.dict").read_bytes() == b"dictionary"
+
+    def test_too_few_samples(self, temp_dir):
+        """Test that training on too little data leaves no dictionary."""
+        pytest.importorskip("zstandard")
+
+        assert not train_patch_dictionary(temp_dir, [PATCH])
+        assert not (temp_dir / "patches.dict").exists()
@@ -0,0 +1,285 @@
+"""Tests for git_memory.gitlog module."""
+
+import pytest
+from datetime import datetime
+import git
+
+from git_memory.gitlog import (
+    COMMIT_MARKER,
+    LogCommit,
+    parse_log_header,
+    iter_log_commits,
+    stream_diff,
+    iter_numstat,
+    iter_rev_list,
+    parse_numstat_line,
+    drop_file_sections,
+    split_diff,
+    PatchCollector
+)
+
+
+@pytest.fixture
+def log_repo(temp_dir):
+    """Create a small repository with an empty commit in the middle."""
+    repo_path = temp_dir / "log_repo"
+    repo_path.mkdir()
+    repo = git.Repo.init(repo_path)
+    repo.config_writer().set_value("user", "name", "Test User").release()
+    repo.config_writer().set_value("user", "email", "test@example.com").release()
+
+    readme = repo_path / "README.md"
+    readme.write_text("# Project\n")
+    repo.index.add([str(readme)])
+    repo.index.commit("Initial commit")
+
+    repo.git.commit("--allow-empty", "-m", "Empty commit")
+
+    readme.write_text("# Project\n\nMore text\n")
+    repo.index.add([str(readme)])
+    repo.index.commit("Extend README")
+
+    return repo
+
+
+class TestParseLogHeader:
+    """Test cases for parse_log_header function."""
+
+    def test_parse_header(self):
+        """Test parsing a formatted header line."""
+        line = COMMIT_MARKER + b"\x00".join([
+            b"a" * 40,
+            b"b" * 40 + b" " + b"c" * 40,
+            b"Test Author",
+            b"test@example.com",
+            b"2023-01-01T12:00:00+02:00",
+            b"Add feature"
+        ]) + b"\n"
+
+        commit = parse_log_header(line)
+
+        assert isinstance(commit, LogCommit)
+        assert commit.hexsha == "a" * 40
+        assert commit.parents == ["b" * 40, "c" * 40]
+        assert commit.author.name == "Test Author"
+        assert commit.committed_datetime == datetime.fromisoformat("2023-01-01T12:00:00+02:00")
+        assert commit.summary == "Add feature"
+
+    def test_parse_header_malformed(self):
+        """Test that malformed headers are rejected."""
+        with pytest.raises(ValueError, match="Malformed git log header"):
+            parse_log_header(COMMIT_MARKER + b"abc\n")
+
+
+class TestIterLogCommits:
+    """Test cases for iter_log_commits function."""
+
+    def test_commits_oldest_first(self, log_repo):
+        """Test that commits are streamed oldest first with their patches."""
+        results = list(iter_log_commits(log_repo))
+
+        assert [c.summary for c, _, _ in results] == ["Initial commit", "Empty commit", "Extend README"]
+        assert [c.hexsha for c, _, _ in results] == [c.hexsha for c in reversed(list(log_repo.iter_commits("HEAD")))]
+
+        initial_commit, initial_diff, initial_lines = results[0]
+        assert initial_commit.parents == []
+        assert initial_diff.startswith("diff --git a/README.md b/README.md")
+        assert "+# Project" in initial_diff
+        assert initial_lines == len(initial_diff.splitlines())
+
+    def test_empty_commit_has_no_diff(self, log_repo):
+        """Test that commits without changes yield an empty patch."""
+        _, diff_text, diff_lines = list(iter_log_commits(log_repo))[1]
+
+        assert diff_text == ""
+        assert diff_lines == 0
+
+    def test_bad_revision_raises(self, log_repo):
+        """Test that git failures surface as GitCommandError."""
+        with pytest.raises(git.exc.GitCommandError):
+            list(iter_log_commits(log_repo, rev="does-not-exist"))
+
+    def test_early_close_stops_process(self, log_repo):
+        """Test that abandoning the generator does not leave git running."""
+        stream = iter_log_commits(log_repo)
+        next(stream)
+        stream.close()
+
+
+class TestPatchCollector:
+    """Test cases for PatchCollector class."""
+
+    def test_collect_in_memory(self):
+        """Test collecting a patch without a file keeps the full text."""
+        collector = PatchCollector()
+        for line in [b"diff --git a/x b/x\n", b"+one\n", b"+two\n"]:
+            collector.add(line)
+
+        diff_text, diff_lines = collector.close()
+
+        assert diff_text == "diff --git a/x b/x\n+one\n+two"
+        assert diff_lines == 3
+
+    def test_stream_to_file_with_bounded_view(self, temp_dir):
+        """Test that the full patch goes to disk and only a view stays in memory."""
+        path = temp_dir / "abc" / "diff.patch"
+        collector = PatchCollector(path, view_bytes=20)
+        lines = [f"+line {i}\n".encode() for i in range(100)]
+        for line in lines:
+            collector.add(line)
+
+        diff_text, diff_lines = collector.close()
+
+        assert path.read_bytes() == b"".join(lines)
+        assert diff_lines == 100
+        assert diff_text.startswith("+line 0\n+line 1\n")
+        assert "truncated: 100 lines in total" in diff_text
+        assert len(diff_text) < 100
+
+
+class TestStreaming:
+    """Test cases for streaming patches to disk."""
+
+    def test_iter_log_commits_streams_patches(self, log_repo, temp_dir):
+        """Test that patch_path receives every commit's full patch."""
+        out_dir = temp_dir / "patches"
+        in_memory = list(iter_log_commits(log_repo))
+        streamed = list(iter_log_commits(log_repo, patch_path=lambda sha: out_dir / sha / "diff.patch",
+                                         view_bytes=1000))
+
+        for (commit, diff_text, diff_lines), (_, streamed_text, streamed_lines) in zip(in_memory, streamed):
+            patch_file = out_dir / commit.hexsha / "diff.patch"
+            assert patch_file.read_text().rstrip("\n") == diff_text
+            assert streamed_text == diff_text
+            assert streamed_lines == diff_lines
+
+    def test_stream_diff(self, log_repo, temp_dir):
+        """Test streaming a single commit diff into a file."""
+        head = log_repo.head.commit
+        path = temp_dir / "head.patch"
+
+        diff_text, diff_lines = stream_diff(log_repo, head.parents[0].hexsha, head.hexsha, path)
+
+        assert "+More text" in diff_text
+        assert path.read_text().rstrip("\n") == diff_text
+        assert diff_lines == len(diff_text.splitlines())
+
+
+class TestNumstat:
+    """Test cases for the numstat pre-pass helpers."""
+
+    def test_parse_numstat_line(self):
+        """Test parsing text and binary numstat lines."""
+        text = parse_numstat_line("12\t3\tsrc/app.py\n")
+        binary = parse_numstat_line("-\t-\tlogo.png\n")
+
+        assert (text.path, text.added, text.deleted, text.lines) == ("src/app.py", 12, 3, 15)
+        assert not text.binary
+        assert binary.binary
+        assert binary.lines == 0
+
+    def test_parse_numstat_renames(self):
+        """Test that renames resolve to the new path."""
+        assert parse_numstat_line("0\t0\ta.txt => b.txt").path == "b.txt"
+        assert parse_numstat_line("1\t1\tsrc/{old => new}/mod.py").path == "src/new/mod.py"
+        assert parse_numstat_line("1\t1\tsrc/{ => pkg}/mod.py").path == "src/pkg/mod.py"
+
+    def test_iter_numstat(self, log_repo):
+        """Test that numstat streams every commit in walk order."""
+        stats = list(iter_numstat(log_repo))
+
+        assert [sha for sha, _ in stats] == [c.hexsha for c, _, _ in iter_log_commits(log_repo)]
+        assert [f.path for f in stats[0][1]] == ["README.md"]
+        assert stats[1][1] == []
+        assert stats[2][1][0].added == 2
+
+    def test_iter_rev_list(self, log_repo):
+        """Test that rev-list walks in the same order as the log stream."""
+        assert list(iter_rev_list(log_repo)) == [c.hexsha for c, _, _ in iter_log_commits(log_repo)]
+
+    def test_iter_numstat_selected_revs(self, log_repo):
+        """Test that numstat can be limited to selected commits."""
+        hashes = list(iter_rev_list(log_repo))
+
+        stats = list(iter_numstat(log_repo, revs=[hashes[2]]))
+
+        assert [sha for sha, _ in stats] == [hashes[2]]
+        assert list(iter_numstat(log_repo, revs=[])) == []
+
+    def test_iter_log_commits_selected_revs(self, log_repo):
+        """Test that only the requested commits are shown, in the given order."""
+        all_commits = [c for c, _, _ in iter_log_commits(log_repo)]
+        wanted = [all_commits[0].hexsha, all_commits[2].hexsha]
+
+        selected = list(iter_log_commits(log_repo, revs=wanted))
+
+        assert [c.hexsha for c, _, _ in selected] == wanted
+        assert "+More text" in selected[1][1]
+        assert list(iter_log_commits(log_repo, revs=[])) == []
+
+    def test_drop_file_sections(self):
+        """Test removing file sections from a patch."""
+        diff_text = (
+            "diff --git a/keep.py b/keep.py\n+keep\n"
+            "diff --git a/logo.png b/logo.png\nBinary files differ\n"
+            "diff --git a/other.py b/other.py\n+other\n"
+        )
+
+        result = drop_file_sections(diff_text, {"logo.png"})
+
+        assert "logo.png" not in result
+        assert "+keep" in result and "+other" in result
+        assert drop_file_sections(diff_text, set()) == diff_text
+
+
+def _file_diff(name, hunks, lines_per_hunk=3):
+    header = f"diff --git a/{name} b/{name}\n--- a/{name}\n+++ b/{name}\n"
+    body = "".join(
+        f"@@ -{h * 10},3 +{h * 10},3 @@\n" + "".join(f"+line {h}.{i}\n" for i in range(lines_per_hunk))
+        for h in range(hunks)
+    )
+    return header + body
+
+
+def _count(text):
+    return len(text.splitlines())
+
+
+class TestSplitDiff:
+    """Test cases for splitting oversized diffs at file and hunk boundaries."""
+
+    def test_small_diff_is_one_chunk(self):
+        """Test that a diff within budget is returned whole."""
+        diff = _file_diff("a.py", 1) + _file_diff("b.py", 1)
+
+        assert split_diff(diff, 100, _count) == [diff]
+
+    def test_splits_between_files(self):
+        """Test that chunks break between files and pack small files together."""
+        diff = _file_diff("a.py", 1) + _file_diff("b.py", 1) + _file_diff("c.py", 1)
+
+        chunks = split_diff(diff, 15, _count)
+
+        assert chunks == [_file_diff("a.py", 1) + _file_diff("b.py", 1), _file_diff("c.py", 1)]
+
+    def test_splits_large_file_between_hunks(self):
+        """Test that every part of a split file repeats its header."""
+        diff = _file_diff("big.py", 4)
+
+        chunks = split_diff(diff, 12, _count)
+
+        assert len(chunks) > 1
+        assert all(chunk.startswith("diff --git a/big.py b/big.py\n") for chunk in chunks)
+        assert all(_count(chunk) <= 12 for chunk in chunks)
+        hunk_lines = [line for chunk in chunks for line in chunk.splitlines() if line.startswith(("@@", "+line"))]
+        assert hunk_lines == [line for line in diff.splitlines() if line.startswith(("@@", "+line"))]
+
+    def test_splits_large_hunk_between_lines(self):
+        """Test that a single hunk over budget is cut between lines without losing any."""
+        diff = _file_diff("big.py", 1, lines_per_hunk=30)
+
+        chunks = split_diff(diff, 10, _count)
+
+        assert all(_count(chunk) <= 10 for chunk in chunks)
+        added = [line for chunk in chunks for line in chunk.splitlines() if line.startswith("+line")]
+        assert added == [f"+line 0.{i}" for i in range(30)]
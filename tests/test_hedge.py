@@ -0,0 +1,179 @@
+"""Tests for git_memory.hedge module."""
+
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from git_memory.config import Config
+from git_memory.hedge import Hedger, HedgeStats
+from git_memory.ratelimit import RateLimiter
+
+
+def _warm_up(hedger, latency=0.01, samples=5):
+    """Give the hedger a history of fast requests to take its percentile from."""
+    for _ in range(samples):
+        hedger._finished(latency, hedge_won=False)
+
+
+def _straggler_then_fast(release):
+    """Request whose first call hangs until ``release`` is set and later calls answer at once."""
+    calls = []
+    lock = threading.Lock()
+
+    def request():
+        with lock:
+            calls.append(time.monotonic())
+            first = len(calls) == 1
+        if first:
+            release.wait(2)
+            return "original"
+        return "hedge"
+    return request, calls
+
+
+@pytest.fixture
+def hedging():
+    """Enable hedging once a few latencies are known, at any hedge rate."""
+    with patch.object(Config, 'ai_hedge', True), patch.object(Config, 'ai_hedge_min_samples', 5), \
+            patch.object(Config, 'ai_hedge_max_rate', 1.0):
+        yield
+
+
+class TestHedger:
+    """Test cases for deadlines and hedged requests."""
+
+    def test_returns_result(self):
+        """Test that a prompt request is answered once."""
+        hedger = Hedger()
+
+        assert hedger.run(lambda: "response") == "response"
+        assert hedger.stats.requests == 1
+        assert hedger.stats.hedged == 0
+
+    def test_deadline(self):
+        """Test that a request over Config.ai_timeout raises TimeoutError."""
+        hedger = Hedger()
+        release = threading.Event()
+
+        with patch.object(Config, 'ai_timeout', 0.1):
+            with pytest.raises(TimeoutError):
+                hedger.run(lambda: release.wait(2))
+        release.set()
+
+    def test_errors_propagate(self):
+        """Test that a failed request raises its own error."""
+        def request():
+            raise ValueError("bad request")
+
+        with pytest.raises(ValueError):
+            Hedger().run(request)
+
+    def test_straggler_is_hedged(self, hedging):
+        """Test that a request slower than recent ones is duplicated and the first answer wins."""
+        hedger = Hedger()
+        _warm_up(hedger)
+        release = threading.Event()
+        request, calls = _straggler_then_fast(release)
+
+        assert hedger.run(request) == "hedge"
+        release.set()
+
+        assert len(calls) == 2
+        assert (hedger.stats.hedged, hedger.stats.hedge_wins) == (1, 1)
+        for _ in range(100):
+            if hedger.stats.saved:
+                break
+            time.sleep(0.01)
+        assert hedger.stats.saved > 0
+
+    def test_no_hedging_without_budget(self, hedging):
+        """Test that stragglers are not duplicated when the rate limits have no room."""
+        hedger = Hedger()
+        _warm_up(hedger)
+        release = threading.Event()
+        request, calls = _straggler_then_fast(release)
+        threading.Timer(0.2, release.set).start()
+
+        assert hedger.run(request, can_hedge=lambda: False) == "original"
+        assert len(calls) == 1
+        assert hedger.stats.hedged == 0
+
+    def test_no_hedging_before_samples_or_over_rate(self, hedging):
+        """Test that hedging waits for latency samples and stays under the hedge rate."""
+        hedger = Hedger()
+        assert hedger._hedge_delay() is None
+
+        _warm_up(hedger)
+        assert hedger._hedge_delay() == pytest.approx(0.01)
+
+        hedger.stats.hedged = 5
+        assert hedger._hedge_delay() is None
+
+    def test_disabled_by_default(self):
+        """Test that hedging is off unless Config.ai_hedge is set."""
+        hedger = Hedger()
+        _warm_up(hedger, samples=50)
+
+        assert hedger._hedge_delay() is None
+
+    def test_async_straggler_is_hedged(self, hedging):
+        """Test that the async path hedges stragglers and measures the latency saved."""
+        hedger = Hedger()
+        _warm_up(hedger)
+        calls = []
+
+        async def request():
+            calls.append(time.monotonic())
+            if len(calls) == 1:
+                await asyncio.sleep(0.3)
+                return "original"
+            return "hedge"
+
+        async def run():
+            result = await hedger.run_async(request)
+            await asyncio.sleep(0.4)
+            return result
+
+        assert asyncio.run(run()) == "hedge"
+        assert (hedger.stats.hedged, hedger.stats.hedge_wins) == (1, 1)
+        assert hedger.stats.saved > 0
+
+    def test_async_deadline(self):
+        """Test that the async path cancels requests over Config.ai_timeout."""
+        hedger = Hedger()
+
+        with patch.object(Config, 'ai_timeout', 0.1):
+            with pytest.raises(TimeoutError):
+                asyncio.run(hedger.run_async(lambda: asyncio.sleep(2)))
+
+    def test_stats_since(self):
+        """Test that per-run counts are taken against a snapshot."""
+        stats = HedgeStats(requests=10, hedged=2, hedge_wins=1, saved=3.0)
+        before = stats.snapshot()
+        stats.requests, stats.hedged, stats.hedge_wins, stats.saved = 30, 5, 3, 7.5
+
+        run = stats.since(before)
+
+        assert (run.requests, run.hedged, run.hedge_wins, run.saved) == (20, 3, 2, 4.5)
+        assert run.hedge_rate == pytest.approx(0.15)
+
+
+class TestDeadlineRetries:
+    """Test cases for deadlines combined with rate-limited retries."""
+
+    def test_timed_out_request_is_retried(self):
+        """Test that a request past its deadline is retried like a throttle."""
+        limiter = RateLimiter("local")
+        release = threading.Event()
+        request, calls = _straggler_then_fast(release)
+
+        with patch.object(Config, 'ai_timeout', 0.1), patch.object(Config, 'ai_retry_base_delay', 0.01), \
+                patch('git_memory.ratelimit.console'):
+            assert limiter.call(request) == "hedge"
+        release.set()
+
+        assert len(calls) == 2
+        assert limiter.throttled == 1
@@ -1,5 +1,7 @@
 """Tests for git_memory.history module."""
 
+import threading
+import asyncio
 import pytest
 from pathlib import Path
 from unittest.mock import Mock, patch, MagicMock
@@ -8,14 +10,43 @@ import git
 
 from git_memory.history import (
     CommitInfo,
+    CommitStats,
+    prefilter_commits,
+    summarize_in_order,
+    batch_small_commits,
+    save_commit_batch,
     get_commit_diff,
     create_history_structure,
     save_commit_files,
+    write_commit_files,
     save_aggregated_files,
+    AggregationScheduler,
+    update_project_memory,
+    iter_commit_records,
+    load_existing_memories,
+    migrate_history_layout,
+    export_history_tree,
     generate_history,
     display_summary
 )
 from git_memory.config import Config
+from git_memory.ai import CommitMemory, ProjectMemory
+from git_memory.project_state import ProjectState
+from git_memory.journal import Journal
+from git_memory.writer import BackgroundWriter
+from git_memory.storage import open_commit_patch
+from git_memory.index import HistoryIndex, PROCESSED
+from git_memory.gitlog import iter_numstat
+
+
+def _summarize(**kwargs):
+    """Successful AI summary, so resumed runs have nothing to retry."""
+    return CommitMemory(summary=kwargs["commit_message"])
+
+
+def _summarize_batch(commits, **kwargs):
+    """Successful batched AI summaries."""
+    return [CommitMemory(summary=f"Batched: {message}") for _, message, _ in commits]
 
 
 class TestCommitInfo:
@@ -42,6 +73,24 @@ class TestCommitInfo:
         assert commit_info.date == datetime(2023, 1, 1, 12, 0, 0)
         assert commit_info.diff_lines == 42
         assert commit_info.diff_text == "sample diff text"
+    
+    def test_release_diff(self):
+        """Test that release_diff drops the patch text but keeps stats."""
+        mock_commit = Mock()
+        mock_commit.hexsha = "abc123def456789"
+        mock_commit.summary = "Test commit message"
+        mock_commit.author.name = "Test Author"
+        mock_commit.committed_datetime = datetime(2023, 1, 1, 12, 0, 0)
+        
+        commit_info = CommitInfo(mock_commit, 42, "sample diff text")
+        stats = CommitStats(commit_info)
+        commit_info.release_diff()
+        
+        assert commit_info.diff_text == ""
+        assert stats.hash == "abc123def456789"
+        assert stats.short_hash == "abc123d"
+        assert stats.diff_lines == 42
+        assert not hasattr(stats, "__dict__")
 
 
 class TestGetCommitDiff:
@@ -130,6 +179,192 @@ class TestGetCommitDiff:
         mock_console.print.assert_called_once()
 
 
+    def test_get_commit_diff_streams_to_file(self, mock_git_repo, temp_dir):
+        """Test streaming the patch straight into diff.patch."""
+        repo_path, repo = mock_git_repo
+        head = repo.head.commit
+        diff_file = temp_dir / "stream" / head.hexsha / "diff.patch"
+        
+        with patch.object(Config, 'diff_view_bytes', 10):
+            diff_text, diff_lines = get_commit_diff(repo, head, diff_file)
+        
+        full_patch = diff_file.read_text()
+        assert "+Second file content" in full_patch
+        assert diff_lines == len(full_patch.splitlines())
+        assert "truncated" in diff_text
+        assert "+Second file content" not in diff_text
+
+
+class TestPrefilterCommits:
+    """Test cases for prefilter_commits function."""
+    
+    def test_prefilter_without_threshold(self, mock_git_repo):
+        """Test that every unprocessed commit is selected without a threshold."""
+        repo_path, repo = mock_git_repo
+        commits = [c.hexsha for c in repo.iter_commits('HEAD', reverse=True)]
+        
+        result = prefilter_commits(repo, {commits[0]}, None)
+        
+        assert result.total == 3
+        assert result.selected == commits[1:]
+        assert result.skipped == []
+    
+    def test_prefilter_with_threshold(self, mock_git_repo):
+        """Test that commits below the threshold are skipped with their line counts."""
+        repo_path, repo = mock_git_repo
+        commits = [c.hexsha for c in repo.iter_commits('HEAD', reverse=True)]
+        
+        result = prefilter_commits(repo, set(), 3)
+        
+        assert result.selected == [commits[2]]
+        assert result.skipped == [(commits[0], 1), (commits[1], 2)]
+        assert result.changed_lines == {commits[2]: 3}
+    
+    def test_prefilter_uses_skip_ledger(self, mock_git_repo, temp_dir):
+        """Test that ledger entries avoid git work and re-admit on a lower threshold."""
+        from git_memory.ledger import SkipLedger
+        repo_path, repo = mock_git_repo
+        commits = [c.hexsha for c in repo.iter_commits('HEAD', reverse=True)]
+        ledger = SkipLedger(temp_dir)
+        
+        first = prefilter_commits(repo, set(), 3, ledger=ledger)
+        assert ledger.entries == {commits[0]: (1, 3), commits[1]: (2, 3)}
+        
+        with patch('git_memory.history.iter_numstat', wraps=iter_numstat) as numstat:
+            rerun = prefilter_commits(repo, {commits[2]}, 3, ledger=SkipLedger(temp_dir))
+            assert numstat.call_args.kwargs["revs"] == []
+        assert rerun.selected == []
+        assert rerun.ledger_skipped == 2
+        
+        lowered = prefilter_commits(repo, {commits[2]}, 2, ledger=SkipLedger(temp_dir))
+        assert lowered.selected == [commits[1]]
+        assert lowered.ledger_skipped == 1
+        assert list(SkipLedger(temp_dir).entries) == [commits[0]]
+    
+    def test_prefilter_excludes_binary_and_huge_files(self, mock_git_repo):
+        """Test that binary and huge files are reported separately."""
+        repo_path, repo = mock_git_repo
+        (repo_path / "logo.png").write_bytes(b"\x89PNG\x00\x01\x02")
+        (repo_path / "bundle.js").write_text("\n".join(f"var a{i};" for i in range(20)))
+        (repo_path / "small.py").write_text("print('hi')\n")
+        repo.index.add(["logo.png", "bundle.js", "small.py"])
+        head = repo.index.commit("Add assets")
+        
+        with patch.object(Config, 'huge_file_lines', 10):
+            result = prefilter_commits(repo, set(), None)
+        
+        excluded = {f.path: f for f in result.excluded[head.hexsha]}
+        assert set(excluded) == {"logo.png", "bundle.js"}
+        assert excluded["logo.png"].binary
+        assert excluded["bundle.js"].added == 20
+
+
+class TestSummarizeInOrder:
+    """Test cases for summarize_in_order function."""
+    
+    def _infos(self, count):
+        infos = []
+        for i in range(count):
+            commit = Mock()
+            commit.hexsha = f"{i:040d}"
+            commit.summary = f"Commit {i}"
+            commit.author.name = "Test Author"
+            commit.committed_datetime = datetime(2023, 1, 1)
+            infos.append(CommitInfo(commit, 10, "+line"))
+        return infos
+    
+    def test_results_in_commit_order(self):
+        """Test that results come back in commit order even when later summaries finish first."""
+        infos = self._infos(5)
+        running = 0
+        peak = 0
+        
+        async def fake_summarize(commit_info, provider, model):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            # Earlier commits take longer, so completion order is reversed
+            await asyncio.sleep(0.01 * (5 - int(commit_info.hash)))
+            running -= 1
+            return CommitMemory(summary=commit_info.message, technical_details="")
+        
+        async def collect():
+            return [(info.hash, memory.summary)
+                    async for info, memory in summarize_in_order(iter(infos), 3, "openai", "gpt-4o")]
+        
+        with patch('git_memory.history.summarize_commit_info_async', side_effect=fake_summarize):
+            results = asyncio.run(collect())
+        
+        assert [h for h, _ in results] == [info.hash for info in infos]
+        assert [summary for _, summary in results] == [f"Commit {i}" for i in range(5)]
+        assert peak == 3
+    
+    def test_empty_input(self):
+        """Test that no commits produce no results."""
+        async def collect():
+            return [item async for item in summarize_in_order(iter([]), 4, "openai", "gpt-4o")]
+        
+        assert asyncio.run(collect()) == []
+
+
+class TestBatchSmallCommits:
+    """Test cases for grouping small commits into shared requests."""
+    
+    @staticmethod
+    def _commit(hexsha, diff_text):
+        mock_commit = Mock()
+        mock_commit.hexsha = hexsha
+        mock_commit.summary = f"Commit {hexsha}"
+        mock_commit.author.name = "Test User"
+        mock_commit.committed_datetime = datetime(2023, 1, 1, 12, 0, 0)
+        return CommitInfo(mock_commit, 1, diff_text)
+    
+    def test_groups_consecutive_small_commits(self):
+        """Test that large commits travel alone and split runs of small ones."""
+        small = "+x\n" * 10
+        large = "+x\n" * 10_000
+        infos = [self._commit(h, large if h == "3" else small) for h in "12345"]
+        
+        batches = list(batch_small_commits(iter(infos), 4))
+        
+        assert [[c.hash for c in batch] for batch in batches] == [["1", "2"], ["3"], ["4", "5"]]
+    
+    def test_batch_size_and_budget(self):
+        """Test that batches stop at the commit count and the token budget."""
+        infos = [self._commit(str(i), "+x\n" * 100) for i in range(5)]
+        
+        assert [len(b) for b in batch_small_commits(iter(infos), 2)] == [2, 2, 1]
+        with patch.object(Config, 'ai_batch_input_tokens', 150):
+            assert [len(b) for b in batch_small_commits(iter(infos), 5)] == [1] * 5
+        assert [len(b) for b in batch_small_commits(iter(infos), 1)] == [1] * 5
+    
+    def test_journaled_commits_travel_alone(self, temp_dir):
+        """Test that commits with a journaled summary are not sent again in a batch."""
+        journal = Journal(temp_dir)
+        journal.record_summarized("2", CommitMemory(summary="Journaled"))
+        infos = [self._commit(h, "+x\n") for h in "123"]
+        
+        batches = list(batch_small_commits(iter(infos), 4, journal=journal))
+        
+        assert [[c.hash for c in batch] for batch in batches] == [["1"], ["2"], ["3"]]
+    
+    def test_save_commit_batch(self, temp_dir):
+        """Test that a batch is summarized in one request and written per commit."""
+        history_dir = temp_dir / ".history"
+        history_dir.mkdir()
+        infos = [self._commit(h * 40, "+x\n") for h in "ab"]
+        journal = Journal(history_dir)
+        
+        with patch('git_memory.history.summarize_diffs', side_effect=_summarize_batch) as mock_batch:
+            memories = save_commit_batch(history_dir, infos, "openai", "gpt-4o", journal)
+        
+        mock_batch.assert_called_once()
+        assert [m.summary for m in memories] == ["Batched: Commit " + "a" * 40, "Batched: Commit " + "b" * 40]
+        for info in infos:
+            assert "Batched" in (history_dir / info.hash / "memory.md").read_text()
+            assert journal.memory(info.hash) is not None
+
+
 class TestCreateHistoryStructure:
     """Test cases for create_history_structure function."""
     
@@ -201,11 +436,54 @@ class TestSaveCommitFiles:
         structure_content = structure_file.read_text()
         assert "graph TD" in structure_content
         assert sample_commit_data["short_hash"] in structure_content
+    
+    def test_summarizer_gets_compacted_diff(self, temp_dir):
+        """Test that the AI sees the compacted diff while diff.patch keeps the full patch."""
+        history_dir = temp_dir / ".history"
+        history_dir.mkdir()
+        mock_commit = Mock()
+        mock_commit.hexsha = "c" * 40
+        mock_commit.summary = "Bump dependencies"
+        mock_commit.author.name = "Test User"
+        mock_commit.committed_datetime = datetime(2023, 1, 1, 12, 0, 0)
+        diff_text = ("diff --git a/yarn.lock b/yarn.lock\n--- a/yarn.lock\n+++ b/yarn.lock\n"
+                     "@@ -1 +1 @@\n-left-pad@1.0.0\n+left-pad@1.1.0\n"
+                     "diff --git a/app.py b/app.py\n--- a/app.py\n+++ b/app.py\n"
+                     "@@ -1,4 +1,4 @@\n a\n b\n-c\n+d\n")
+        commit_info = CommitInfo(mock_commit, 10, diff_text)
+        
+        with patch('git_memory.history.summarize_diff', side_effect=_summarize) as mock_summarize:
+            save_commit_files(history_dir, commit_info, "openai", "gpt-4o")
+        
+        sent = mock_summarize.call_args.kwargs["diff_text"]
+        assert "left-pad" not in sent and "[+1 -1 lines" in sent
+        assert " a\n" not in sent and "-c\n+d\n" in sent
+        assert (history_dir / commit_info.hash / "diff.patch").read_text() == diff_text
 
 
 class TestSaveAggregatedFiles:
     """Test cases for save_aggregated_files function."""
     
+    def test_save_commit_files_with_writer(self, temp_dir, sample_commit_data):
+        """Test that files are written by the background writer once it is flushed."""
+        history_dir = temp_dir / ".history"
+        history_dir.mkdir()
+        mock_commit = Mock()
+        mock_commit.hexsha = sample_commit_data["hash"]
+        mock_commit.summary = sample_commit_data["message"]
+        mock_commit.author.name = sample_commit_data["author"]
+        mock_commit.committed_datetime = datetime(2023, 1, 1, 12, 0, 0)
+        commit_info = CommitInfo(mock_commit, sample_commit_data["diff_lines"], sample_commit_data["diff_text"])
+        release = threading.Event()
+        
+        with BackgroundWriter(fsync=False) as writer:
+            writer.submit(release.wait)
+            save_commit_files(history_dir, commit_info, "openai", "gpt-4o", writer=writer)
+            assert not (history_dir / sample_commit_data["hash"]).exists()
+            release.set()
+        
+        assert (history_dir / sample_commit_data["hash"] / "memory.md").exists()
+    
     def test_save_aggregated_files(self, temp_dir):
         """Test saving aggregated history files."""
         history_dir = temp_dir / ".history"
@@ -260,9 +538,337 @@ class TestSaveAggregatedFiles:
         assert "graph TD" in structure_content
 
 
+class TestAggregationScheduler:
+    """Test cases for AggregationScheduler class."""
+    
+    def _commit_info(self, i):
+        commit = Mock()
+        commit.hexsha = f"{i:040d}"
+        commit.summary = f"Commit {i}"
+        commit.author.name = "Test Author"
+        commit.committed_datetime = datetime(2023, 1, 1)
+        return CommitInfo(commit, 10, f"+line {i}")
+    
+    @patch('git_memory.history.update_project_memory')
+    def test_aggregates_once_at_end_by_default(self, mock_update_project, temp_dir):
+        """Test that without a cadence aggregation only runs on flush."""
+        scheduler = AggregationScheduler(temp_dir, "openai", "gpt-4o", every_commits=0, every_seconds=0)
+        for i in range(5):
+            scheduler.add(self._commit_info(i), CommitMemory(summary=f"Commit {i}"))
+        
+        mock_update_project.assert_not_called()
+        scheduler.flush()
+        scheduler.flush()
+        
+        mock_update_project.assert_called_once()
+        assert len(mock_update_project.call_args.args[1]) == 5
+        history = (temp_dir / "history.md").read_text()
+        assert history.count("## Commit ") == 5
+        assert "+line 4" in history
+    
+    @patch('git_memory.history.update_project_memory')
+    def test_every_n_commits(self, mock_update_project, temp_dir):
+        """Test aggregating every N commits plus the final flush."""
+        sizes = []
+        mock_update_project.side_effect = lambda history_dir, commits, *args, **kwargs: sizes.append(len(commits))
+        scheduler = AggregationScheduler(temp_dir, "openai", "gpt-4o", every_commits=2, every_seconds=0)
+        for i in range(5):
+            scheduler.add(self._commit_info(i), CommitMemory(summary=f"Commit {i}"))
+        scheduler.flush()
+        
+        assert sizes == [2, 2, 1]
+    
+    @patch('git_memory.history.update_project_memory')
+    def test_every_t_seconds(self, mock_update_project, temp_dir):
+        """Test aggregating once the time interval has elapsed."""
+        sizes = []
+        mock_update_project.side_effect = lambda history_dir, commits, *args, **kwargs: sizes.append(len(commits))
+        with patch('git_memory.history.time.monotonic', side_effect=[0.0, 1.0, 11.0, 11.0, 12.0]):
+            scheduler = AggregationScheduler(temp_dir, "openai", "gpt-4o", every_commits=0, every_seconds=10)
+            scheduler.add(self._commit_info(0), CommitMemory(summary="Commit 0"))
+            scheduler.add(self._commit_info(1), CommitMemory(summary="Commit 1"))
+            scheduler.add(self._commit_info(2), CommitMemory(summary="Commit 2"))
+        
+        assert sizes == [2]
+
+
+class TestUpdateProjectMemory:
+    """Test cases for update_project_memory function."""
+    
+    def _stats(self, i, diff_lines=10):
+        commit = Mock()
+        commit.hexsha = f"{i:040d}"
+        commit.summary = f"Commit {i}"
+        commit.author.name = "Test Author"
+        commit.committed_datetime = datetime(2023, 1, 1)
+        return CommitStats(CommitInfo(commit, diff_lines, ""))
+    
+    @patch('git_memory.history.fold_project_memory')
+    def test_folds_only_new_commits(self, mock_fold, temp_dir):
+        """Test that later runs fold new commits into the stored memory."""
+        first = ProjectMemory(current_state="First", major_features=["Auth"])
+        second = ProjectMemory(current_state="Second", major_features=["Auth", "Billing"])
+        mock_fold.side_effect = [first, second]
+        
+        update_project_memory(temp_dir, [self._stats(0), self._stats(1)],
+                              [CommitMemory(summary="A"), CommitMemory(summary="B")], "openai", "gpt-4o")
+        update_project_memory(temp_dir, [self._stats(2, 5)], [CommitMemory(summary="C")], "openai", "gpt-4o")
+        
+        first_call, second_call = mock_fold.call_args_list
+        assert first_call.kwargs["previous"] is None
+        assert second_call.kwargs["previous"] == first
+        assert [m.summary for m in second_call.kwargs["commit_memories"]] == ["C"]
+        assert second_call.kwargs["total_commits"] == 3
+        
+        memory_content = (temp_dir / "memory.md").read_text()
+        assert "Second" in memory_content
+        assert "Total commits processed:** 3" in memory_content
+        assert "Total lines changed:** 25" in memory_content
+        assert memory_content.count("- **000000") == 3
+        assert ProjectState(temp_dir).memory == second
+    
+    @patch('git_memory.history.fold_project_memory', side_effect=ValueError("No API key"))
+    def test_failure_keeps_stored_memory(self, mock_fold, temp_dir):
+        """Test that a failed update does not overwrite the stored memory."""
+        state = ProjectState(temp_dir)
+        state.memory = ProjectMemory(current_state="Stored")
+        state.save()
+        
+        update_project_memory(temp_dir, [self._stats(0)], [CommitMemory(summary="A")], "openai", "gpt-4o")
+        
+        assert ProjectState(temp_dir).memory.current_state == "Stored"
+        assert ProjectState(temp_dir).total_commits == 1
+        assert "Stored" in (temp_dir / "memory.md").read_text()
+
+
+class TestCommitRecords:
+    """Test cases for memory.json sidecars."""
+    
+    def _commit_info(self, i):
+        commit = Mock()
+        commit.hexsha = f"{i:040d}"
+        commit.summary = f"Commit {i}"
+        commit.author.name = "Test Author"
+        commit.committed_datetime = datetime(2023, 1, i + 1, 12, 0)
+        return CommitInfo(commit, 10 + i, f"+line {i}")
+    
+    def test_sidecar_roundtrip(self, temp_dir):
+        """Test that write_commit_files stores a loadable CommitMemory sidecar."""
+        memories = [CommitMemory(summary=f"Summary {i}", technical_details="details") for i in range(3)]
+        for i, memory in enumerate(memories):
+            write_commit_files(temp_dir, self._commit_info(i), memory, "openai", "gpt-4o")
+        
+        hashes = [f"{i:040d}" for i in (2, 0, 1)]
+        records = list(iter_commit_records(temp_dir, hashes))
+        
+        assert [r.hash for r in records] == hashes
+        assert records[0].memory == memories[2]
+        assert records[0].diff_lines == 12
+        assert records[0].date == datetime(2023, 1, 3, 12, 0)
+        assert load_existing_memories(temp_dir, hashes) == [memories[2], memories[0], memories[1]]
+    
+    def test_missing_and_corrupt_sidecars_are_skipped(self, temp_dir):
+        """Test that commits without a usable sidecar are skipped."""
+        write_commit_files(temp_dir, self._commit_info(0), CommitMemory(summary="Kept"), "openai", "gpt-4o")
+        (temp_dir / ("1" * 40)).mkdir()
+        (temp_dir / ("2" * 40)).mkdir()
+        (temp_dir / ("2" * 40) / "memory.json").write_text("{}")
+        
+        memories = load_existing_memories(temp_dir, [f"{0:040d}", "1" * 40, "2" * 40, "3" * 40])
+        
+        assert [m.summary for m in memories] == ["Kept"]
+
+
+class TestMigrateHistoryLayout:
+    """Test cases for migrate_history_layout function."""
+    
+    @patch('git_memory.history.summarize_diff', side_effect=_summarize)
+    @patch('git_memory.history.display_summary')
+    def test_migrate_keeps_index_and_resume_working(self, mock_display, mock_summarize, mock_git_repo):
+        """Test that a migrated history is resumed and read back from its new layout."""
+        repo_path, repo = mock_git_repo
+        generate_history(repo_path=repo_path, model_provider="openai", model="gpt-4o")
+        hashes = [c.hexsha for c in reversed(list(repo.iter_commits()))]
+        
+        assert migrate_history_layout(repo_path, "sharded") == 3
+        
+        history_dir = repo_path / ".history"
+        index = HistoryIndex(history_dir)
+        assert index.get(hashes[0])["path"] == f"{hashes[0][:2]}/{hashes[0][2:]}"
+        assert [r.hash for r in iter_commit_records(history_dir, hashes)] == hashes
+        
+        # A rerun finds nothing new to process
+        with patch('git_memory.history.save_commit_files') as mock_save_commit:
+            generate_history(repo_path=repo_path, model_provider="openai", model="gpt-4o")
+        mock_save_commit.assert_not_called()
+    
+    def test_migrate_without_history(self, temp_dir):
+        """Test that migrating a repository without .history fails clearly."""
+        with pytest.raises(ValueError, match="No .history directory"):
+            migrate_history_layout(temp_dir, "sharded")
+
+
+class TestPackBackend:
+    """Test cases for generating history with the pack storage backend."""
+    
+    @patch('git_memory.history.summarize_diff', side_effect=_summarize)
+    @patch('git_memory.history.display_summary')
+    def test_pack_generate_resume_and_export(self, mock_display, mock_summarize, mock_git_repo):
+        """Test that a packed history resumes, aggregates and exports like the tree layout."""
+        repo_path, repo = mock_git_repo
+        hashes = [c.hexsha for c in reversed(list(repo.iter_commits()))]
+        with patch.object(Config, "storage_backend", "pack"), patch.object(Config, "stream_patches", True):
+            generate_history(repo_path=repo_path, model_provider="openai", model="gpt-4o")
+            
+            history_dir = repo_path / ".history"
+            assert not any((history_dir / commit_hash).exists() for commit_hash in hashes)
+            assert [r.hash for r in iter_commit_records(history_dir, hashes)] == hashes
+            assert HistoryIndex(history_dir).get(hashes[0])["path"] == "packs/pack-0001.pack"
+            
+            with patch('git_memory.history.save_commit_files') as mock_save_commit:
+                generate_history(repo_path=repo_path, model_provider="openai", model="gpt-4o")
+            mock_save_commit.assert_not_called()
+        
+        assert export_history_tree(repo_path) == 3
+        assert (history_dir / hashes[0] / "diff.patch").exists()
+        assert HistoryIndex(history_dir).get(hashes[0])["path"] == hashes[0]
+
+
+class TestPatchCompression:
+    """Test cases for generating history with compressed patches."""
+    
+    @pytest.mark.parametrize("backend", ["tree", "pack"])
+    @pytest.mark.parametrize("stream_patches", [False, True])
+    @patch('git_memory.history.display_summary')
+    def test_gzip_patches(self, mock_display, mock_git_repo, backend, stream_patches):
+        """Test that patches are stored gzip-compressed and read back whole."""
+        repo_path, repo = mock_git_repo
+        hashes = [c.hexsha for c in reversed(list(repo.iter_commits()))]
+        with patch.object(Config, "patch_compression", "gzip"), patch.object(Config, "storage_backend", backend), \
+                patch.object(Config, "stream_patches", stream_patches):
+            generate_history(repo_path=repo_path, model_provider="openai", model="gpt-4o")
+        
+        history_dir = repo_path / ".history"
+        assert not list(history_dir.glob("*/diff.patch"))
+        with open_commit_patch(history_dir, hashes[-1]) as stream:
+            assert "+" in stream.read()
+
+
+class TestResume:
+    """Test cases for resuming interrupted or failed runs."""
+    
+    @pytest.mark.parametrize("concurrency", [1, 2])
+    @patch('git_memory.history.summarize_diff_async')
+    @patch('git_memory.history.summarize_diff', side_effect=_summarize)
+    @patch('git_memory.history.display_summary')
+    def test_journaled_summary_is_reused(self, mock_display, mock_summarize, mock_summarize_async,
+                                         mock_git_repo, concurrency):
+        """Test that a commit summarized before a crash is written without a new AI call."""
+        repo_path, repo = mock_git_repo
+        mock_summarize_async.side_effect = _summarize
+        first = list(repo.iter_commits())[-1]
+        history_dir = create_history_structure(repo_path)
+        Journal(history_dir).record_summarized(first.hexsha, CommitMemory(summary="Journaled"))
+        
+        generate_history(repo_path=repo_path, model_provider="openai", model="gpt-4o", concurrency=concurrency)
+        
+        summarized = [c.kwargs["commit_hash"] for c in (mock_summarize.call_args_list + mock_summarize_async.call_args_list)]
+        assert first.hexsha not in summarized
+        assert len(summarized) == 2
+        assert next(iter_commit_records(history_dir, [first.hexsha])).memory.summary == "Journaled"
+        assert Journal(history_dir).stages == {}
+    
+    @patch('git_memory.history.display_summary')
+    def test_failed_commits_are_retried(self, mock_display, mock_git_repo):
+        """Test that fallback memories are replaced on the next run without double counting."""
+        repo_path, repo = mock_git_repo
+        generate_history(repo_path=repo_path, model_provider="openai", model="gpt-4o")
+        history_dir = repo_path / ".history"
+        assert ProjectState(history_dir).total_commits == 3
+        
+        with patch('git_memory.history.summarize_diff', side_effect=_summarize) as mock_summarize:
+            generate_history(repo_path=repo_path, model_provider="openai", model="gpt-4o")
+        
+        assert mock_summarize.call_count == 3
+        state = ProjectState(history_dir)
+        assert state.total_commits == 3
+        assert len(state.timeline) == 3
+        assert (history_dir / "history.md").read_text().count("## Commit ") == 3
+        assert HistoryIndex(history_dir).status_counts() == {PROCESSED: 3}
+        
+        with patch('git_memory.history.save_commit_files') as mock_save_commit:
+            generate_history(repo_path=repo_path, model_provider="openai", model="gpt-4o")
+        mock_save_commit.assert_not_called()
+    
+    @patch('git_memory.history.summarize_diff', side_effect=_summarize)
+    @patch('git_memory.history.display_summary')
+    def test_unaggregated_commits_are_folded_on_rerun(self, mock_display, mock_summarize, mock_git_repo):
+        """Test that commits written before a crash in aggregation are folded in by the next run."""
+        repo_path, repo = mock_git_repo
+        with patch('git_memory.history.update_project_memory', side_effect=RuntimeError("killed")):
+            with pytest.raises(ValueError, match="killed"):
+                generate_history(repo_path=repo_path, model_provider="openai", model="gpt-4o")
+        history_dir = repo_path / ".history"
+        assert len(Journal(history_dir).unaggregated()) == 3
+        
+        generate_history(repo_path=repo_path, model_provider="openai", model="gpt-4o")
+        
+        assert mock_summarize.call_count == 3
+        assert ProjectState(history_dir).total_commits == 3
+        assert Journal(history_dir).unaggregated() == []
+
+
 class TestGenerateHistory:
     """Test cases for generate_history function."""
     
+    @pytest.mark.parametrize("concurrency", [1, 2])
+    @patch('git_memory.history.display_pipeline_stats')
+    @patch('git_memory.history.summarize_diff_async')
+    @patch('git_memory.history.summarize_diff', side_effect=_summarize)
+    @patch('git_memory.history.display_summary')
+    def test_generate_history_reports_stages(self, mock_display, mock_summarize, mock_summarize_async,
+                                             mock_stats, mock_git_repo, concurrency):
+        """Test that every commit passes through each pipeline stage."""
+        repo_path, repo = mock_git_repo
+        mock_summarize_async.side_effect = _summarize
+        
+        generate_history(repo_path=repo_path, model_provider="openai", model="gpt-4o", concurrency=concurrency)
+        
+        stages, elapsed = mock_stats.call_args.args
+        assert [(s.name, s.workers, s.items) for s in stages] == [
+            ("extract", 1, 3), ("compact", 1, 3), ("summarize", concurrency, 3), ("persist", 1, 3)]
+        assert all(s.busy > 0 for s in stages)
+        assert elapsed > 0
+    
+    @pytest.mark.parametrize("concurrency", [1, 2])
+    @patch('git_memory.history.summarize_diffs_async')
+    @patch('git_memory.history.summarize_diffs', side_effect=_summarize_batch)
+    @patch('git_memory.history.summarize_diff_async')
+    @patch('git_memory.history.summarize_diff', side_effect=_summarize)
+    @patch('git_memory.history.display_summary')
+    def test_generate_history_batches_small_commits(self, mock_display, mock_summarize, mock_summarize_async,
+                                                    mock_batch, mock_batch_async, mock_git_repo, concurrency):
+        """Test that small commits share requests but still get their own directories."""
+        repo_path, repo = mock_git_repo
+        mock_summarize_async.side_effect = _summarize
+        
+        async def summarize_batch_async(commits, **kwargs):
+            return _summarize_batch(commits)
+        mock_batch_async.side_effect = summarize_batch_async
+        
+        generate_history(repo_path=repo_path, model_provider="openai", model="gpt-4o",
+                         concurrency=concurrency, batch_size=2)
+        
+        batch_mock = mock_batch if concurrency == 1 else mock_batch_async
+        single_mock = mock_summarize if concurrency == 1 else mock_summarize_async
+        assert batch_mock.call_count == 1
+        assert len(batch_mock.call_args.args[0]) == 2
+        assert single_mock.call_count == 1
+        history_dir = repo_path / ".history"
+        for commit in repo.iter_commits():
+            memory = (history_dir / commit.hexsha / "memory.md").read_text()
+            assert commit.summary in memory
+    
     @patch('git_memory.history.save_aggregated_files')
     @patch('git_memory.history.save_commit_files')
     @patch('git_memory.history.display_summary')
@@ -340,6 +946,60 @@ class TestGenerateHistory:
             mock_display.assert_called_once()
 
 
+    @patch('git_memory.history.update_project_memory')
+    @patch('git_memory.history.summarize_diff_async')
+    @patch('git_memory.history.display_summary')
+    def test_generate_history_concurrent(self, mock_display, mock_summarize, mock_update_project, mock_git_repo):
+        """Test that concurrent summarization still writes every commit in order."""
+        repo_path, repo = mock_git_repo
+        mock_summarize.side_effect = lambda **kwargs: CommitMemory(
+            summary=kwargs["commit_message"], technical_details="")
+        
+        generate_history(
+            repo_path=repo_path,
+            model_provider="openai",
+            model="gpt-4o",
+            concurrency=3
+        )
+        
+        hashes = [c.hexsha for c in reversed(list(repo.iter_commits()))]
+        assert mock_summarize.call_count == 3
+        index = HistoryIndex(repo_path / ".history")
+        assert index.processed_hashes() == set(hashes)
+        assert index.status_counts() == {PROCESSED: 3}
+        
+        # Aggregation runs once, at the end, folding every commit in order
+        mock_update_project.assert_called_once()
+        assert [c.hash for c in mock_update_project.call_args.args[1]] == hashes
+        assert [m.summary for m in mock_update_project.call_args.args[2]] == [
+            c.summary for c in reversed(list(repo.iter_commits()))]
+        for hexsha in hashes:
+            assert (repo_path / ".history" / hexsha / "memory.md").exists()
+            assert (repo_path / ".history" / hexsha / "diff.patch").exists()
+
+
+    @patch('git_memory.history.summarize_diff', side_effect=_summarize)
+    @patch('git_memory.history.display_summary')
+    def test_generate_history_seeds_project_memory(self, mock_display, mock_summarize, mock_git_repo):
+        """Test that commits from runs before project_memory.json existed are folded in."""
+        repo_path, repo = mock_git_repo
+        generate_history(repo_path=repo_path, model_provider="openai", model="gpt-4o")
+        (repo_path / ".history" / "project_memory.json").unlink()
+        
+        new_file = repo_path / "new.txt"
+        new_file.write_text("New content")
+        repo.index.add([str(new_file)])
+        repo.index.commit("Add new file")
+        
+        with patch('git_memory.history.update_project_memory') as mock_update_project:
+            generate_history(repo_path=repo_path, model_provider="openai", model="gpt-4o")
+        
+        commits = [c.hexsha for c in reversed(list(repo.iter_commits()))]
+        folded = mock_update_project.call_args.args[1]
+        assert [c.hash for c in folded] == commits
+        assert len(mock_display.call_args.args[0]) == 1
+
+
 class TestDisplaySummary:
     """Test cases for display_summary function."""
     
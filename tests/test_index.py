@@ -0,0 +1,82 @@
+"""Tests for git_memory.index module."""
+
+from datetime import datetime
+from unittest.mock import Mock
+
+from git_memory.index import HistoryIndex, PROCESSED, FAILED, SKIPPED
+
+
+def make_commit_info(i, parent=None, author="Test Author"):
+    """Build a minimal CommitInfo-like object."""
+    info = Mock()
+    info.hash = f"{i:040d}"
+    info.parent = parent
+    info.date = datetime(2023, 1, i + 1)
+    info.author = author
+    info.message = f"Commit {i}"
+    info.diff_lines = 10 * (i + 1)
+    return info
+
+
+class TestHistoryIndex:
+    """Test cases for HistoryIndex class."""
+
+    def test_record_and_lookup(self, temp_dir):
+        """Test recording commits and answering resume lookups."""
+        index = HistoryIndex(temp_dir)
+        index.record_commit(make_commit_info(0), PROCESSED, model="openai/gpt-4o",
+                            prompt_tokens=100, completion_tokens=20)
+        index.record_commit(make_commit_info(1, parent=f"{0:040d}"), FAILED, model="openai/gpt-4o")
+        index.record_skipped([(f"{2:040d}", 3)])
+
+        assert index.processed_hashes() == {f"{0:040d}", f"{1:040d}"}
+        assert index.processed_hashes([f"{1:040d}", f"{2:040d}"]) == {f"{1:040d}"}
+        assert index.status_counts() == {PROCESSED: 1, FAILED: 1, SKIPPED: 1}
+        assert index.token_totals() == (100, 20)
+
+        entry = index.get(f"{1:040d}")
+        assert entry["parent"] == f"{0:040d}"
+        assert entry["diff_lines"] == 20
+        assert entry["path"] == f"{1:040d}"
+        assert index.get("f" * 40) is None
+
+    def test_persists_and_reprocessing_updates(self, temp_dir):
+        """Test that entries survive reopening and later decisions win."""
+        index = HistoryIndex(temp_dir)
+        index.record_skipped([(f"{0:040d}", 3)])
+        index.close()
+
+        reopened = HistoryIndex(temp_dir)
+        reopened.record_commit(make_commit_info(0), PROCESSED)
+
+        assert reopened.status_counts() == {PROCESSED: 1}
+        assert reopened.get(f"{0:040d}")["message"] == "Commit 0"
+
+    def test_query_commits(self, temp_dir):
+        """Test filtering catalog entries by status and author."""
+        index = HistoryIndex(temp_dir)
+        index.record_commit(make_commit_info(1, author="Bob"), PROCESSED)
+        index.record_commit(make_commit_info(0, author="Alice"), PROCESSED)
+        index.record_commit(make_commit_info(2, author="Alice"), FAILED)
+
+        assert [c["message"] for c in index.commits()] == ["Commit 0", "Commit 1", "Commit 2"]
+        assert [c["message"] for c in index.commits(author="Alice")] == ["Commit 0", "Commit 2"]
+        assert [c["message"] for c in index.commits(status=FAILED)] == ["Commit 2"]
+
+    def test_backfill_existing_directories(self, temp_dir):
+        """Test that a new index imports complete commit directories from earlier runs."""
+        for name in ("a", "b", "c"):
+            (temp_dir / (name * 40)).mkdir()
+        for name in ("a", "b"):
+            (temp_dir / (name * 40) / "memory.md").write_text("# Commit Memory")
+        (temp_dir / ("b" * 40) / "memory.json").write_text(
+            '{"hash": "' + "b" * 40 + '", "message": "Add b", "author": "Bob", '
+            '"date": "2023-01-01T00:00:00", "diff_lines": 7, "memory": {"summary": "b"}}'
+        )
+        (temp_dir / "not-a-commit").mkdir()
+
+        index = HistoryIndex(temp_dir)
+
+        assert index.processed_hashes() == {"a" * 40, "b" * 40}
+        assert index.get("b" * 40)["diff_lines"] == 7
+        assert index.get("a" * 40)["message"] is None
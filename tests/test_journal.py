@@ -0,0 +1,67 @@
+"""Tests for git_memory.journal module."""
+
+from git_memory.ai import CommitMemory
+from git_memory.history import fallback_commit_memory
+from git_memory.journal import Journal, EXTRACTED, WRITTEN, AGGREGATED
+
+HASH_A = "a" * 40
+HASH_B = "b" * 40
+
+
+class TestJournal:
+    """Test cases for Journal class."""
+
+    def test_replay(self, temp_dir):
+        """Test that stages and summaries survive reopening the journal."""
+        journal = Journal(temp_dir)
+        journal.record(HASH_A, EXTRACTED)
+        journal.record_summarized(HASH_A, CommitMemory(summary="Add auth"))
+        journal.record(HASH_B, EXTRACTED)
+
+        reopened = Journal(temp_dir)
+
+        assert reopened.stages == {HASH_A: "summarized", HASH_B: EXTRACTED}
+        assert reopened.memory(HASH_A).summary == "Add auth"
+        assert reopened.memory(HASH_B) is None
+
+    def test_written_drops_summary(self, temp_dir):
+        """Test that a written commit no longer offers its journaled summary."""
+        journal = Journal(temp_dir)
+        journal.record_summarized(HASH_A, CommitMemory(summary="Add auth"))
+        journal.record(HASH_A, WRITTEN)
+
+        assert journal.memory(HASH_A) is None
+        assert Journal(temp_dir).unaggregated() == [HASH_A]
+
+    def test_fallback_is_not_journaled(self, temp_dir):
+        """Test that fallback memories are summarized again instead of reused."""
+        commit_info = type("Info", (), {"message": "Fix", "diff_lines": 3})()
+        journal = Journal(temp_dir)
+        journal.record_summarized(HASH_A, fallback_commit_memory(commit_info))
+
+        assert journal.memory(HASH_A) is None
+        assert HASH_A not in Journal(temp_dir).stages
+
+    def test_torn_line_is_ignored(self, temp_dir):
+        """Test that a line cut short by a crash is skipped."""
+        journal = Journal(temp_dir)
+        journal.record(HASH_A, WRITTEN)
+        with open(journal.path, "a", encoding="utf-8") as f:
+            f.write('{"hash": "' + HASH_B + '", "sta')
+
+        assert Journal(temp_dir).stages == {HASH_A: WRITTEN}
+
+    def test_compact(self, temp_dir):
+        """Test that compaction keeps only unfinished commits."""
+        journal = Journal(temp_dir)
+        journal.record(HASH_A, WRITTEN)
+        journal.record_summarized(HASH_B, CommitMemory(summary="Add auth"))
+        journal.record_aggregated([HASH_A])
+
+        journal.compact()
+
+        reopened = Journal(temp_dir)
+        assert reopened.stages == {HASH_B: "summarized"}
+        assert reopened.memory(HASH_B).summary == "Add auth"
+        assert len(journal.path.read_text().splitlines()) == 1
+        assert AGGREGATED not in journal.path.read_text()
@@ -0,0 +1,46 @@
+"""Tests for git_memory.ledger module."""
+
+from git_memory.ledger import SkipLedger
+
+
+class TestSkipLedger:
+    """Test cases for SkipLedger class."""
+    
+    def test_empty_ledger(self, temp_dir):
+        """Test a ledger without a file on disk."""
+        ledger = SkipLedger(temp_dir)
+        
+        assert len(ledger) == 0
+        assert ledger.changed_lines("abc") is None
+        assert not ledger.path.exists()
+    
+    def test_record_and_reload(self, temp_dir):
+        """Test that recorded decisions survive a reload."""
+        ledger = SkipLedger(temp_dir)
+        ledger.record([("a" * 40, 3), ("b" * 40, 7)], threshold=10)
+        
+        reloaded = SkipLedger(temp_dir)
+        
+        assert len(reloaded) == 2
+        assert "a" * 40 in reloaded
+        assert reloaded.changed_lines("b" * 40) == 7
+        assert reloaded.entries["a" * 40] == (3, 10)
+    
+    def test_forget_rewrites_file(self, temp_dir):
+        """Test that forgotten entries are removed from disk."""
+        ledger = SkipLedger(temp_dir)
+        ledger.record([("a" * 40, 3), ("b" * 40, 7)], threshold=10)
+        
+        ledger.forget(["a" * 40, "c" * 40])
+        
+        reloaded = SkipLedger(temp_dir)
+        assert list(reloaded.entries) == ["b" * 40]
+        assert not (temp_dir / "skipped.tmp").exists()
+    
+    def test_ignores_torn_lines(self, temp_dir):
+        """Test that a partially written final line is ignored."""
+        (temp_dir / SkipLedger.file_name).write_text(f"{'a' * 40}\t3\t10\n{'b' * 40}\t4")
+        
+        ledger = SkipLedger(temp_dir)
+        
+        assert list(ledger.entries) == ["a" * 40]
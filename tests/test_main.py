@@ -32,7 +32,9 @@ class TestCLI:
             repo_path=repo_path,
             model_provider=Config.model_provider,
             model=Config.model,
-            min_diff_lines=Config.min_diff_lines
+            min_diff_lines=Config.min_diff_lines,
+            concurrency=Config.concurrency,
+            batch_size=Config.ai_batch_commits
         )
         
         # Check that success message was printed
@@ -49,7 +51,9 @@ class TestCLI:
             str(repo_path),
             "--model-provider", "openrouter",
             "--model", "gpt-3.5-turbo",
-            "--min-diff-lines", "50"
+            "--min-diff-lines", "50",
+            "--concurrency", "4",
+            "--batch-size", "8"
         ])
         
         assert result.exit_code == 0
@@ -57,7 +61,9 @@ class TestCLI:
             repo_path=repo_path,
             model_provider="openrouter",
             model="gpt-3.5-turbo",
-            min_diff_lines=50
+            min_diff_lines=50,
+            concurrency=4,
+            batch_size=8
         )
     
     @patch('git_memory.__main__.generate_history')
@@ -113,14 +119,20 @@ class TestCLI:
             repo_path=repo_path,
             model_provider="openai",
             model="gpt-4o",
-            min_diff_lines=None
+            min_diff_lines=None,
+            concurrency=1,
+            batch_size=1,
+            migrate_layout=None,
+            export_tree=False
         )
         
         mock_generate_history.assert_called_once_with(
             repo_path=repo_path,
             model_provider="openai",
             model="gpt-4o",
-            min_diff_lines=None
+            min_diff_lines=None,
+            concurrency=1,
+            batch_size=1
         )
     
     @patch('git_memory.__main__.generate_history')
@@ -137,11 +149,43 @@ class TestCLI:
                 repo_path=repo_path,
                 model_provider="openai",
                 model="gpt-4o",
-                min_diff_lines=None
+                min_diff_lines=None,
+                concurrency=1,
+                batch_size=1,
+                migrate_layout=None,
+                export_tree=False
             )
         
         assert exc_info.value.exit_code == 1
     
+    @patch('git_memory.__main__.migrate_history_layout', return_value=3)
+    @patch('git_memory.__main__.generate_history')
+    @patch('git_memory.__main__.console')
+    def test_migrate_layout(self, mock_console, mock_generate_history, mock_migrate, temp_dir):
+        """Test that --migrate-layout migrates and skips generation."""
+        repo_path = temp_dir / "test_repo"
+        repo_path.mkdir()
+        
+        result = self.runner.invoke(app, [str(repo_path), "--migrate-layout", "sharded"])
+        
+        assert result.exit_code == 0
+        mock_migrate.assert_called_once_with(repo_path, "sharded")
+        mock_generate_history.assert_not_called()
+    
+    @patch('git_memory.__main__.export_history_tree', return_value=2)
+    @patch('git_memory.__main__.generate_history')
+    @patch('git_memory.__main__.console')
+    def test_export_tree(self, mock_console, mock_generate_history, mock_export, temp_dir):
+        """Test that --export-tree exports packed commits and skips generation."""
+        repo_path = temp_dir / "test_repo"
+        repo_path.mkdir()
+        
+        result = self.runner.invoke(app, [str(repo_path), "--export-tree"])
+        
+        assert result.exit_code == 0
+        mock_export.assert_called_once_with(repo_path)
+        mock_generate_history.assert_not_called()
+    
     def test_app_help(self):
         """Test that app help is displayed correctly."""
         result = self.runner.invoke(app, ["--help"])
@@ -0,0 +1,99 @@
+"""Tests for git_memory.pack module."""
+
+from unittest.mock import patch
+
+from git_memory.config import Config
+from git_memory.pack import PackStore, open_pack_store
+
+HASH_A = "a" * 40
+HASH_B = "b" * 40
+
+
+class TestPackStore:
+    """Test cases for PackStore class."""
+
+    def test_append_and_read(self, temp_dir):
+        """Test that appended files are read back by commit hash."""
+        store = PackStore(temp_dir)
+        store.append(HASH_A, {"diff.patch": b"+a", "memory.md": b"# A"})
+        store.append(HASH_B, {"diff.patch": b"+b\n-c", "memory.md": b""})
+
+        assert store.read(HASH_A) == {"diff.patch": b"+a", "memory.md": b"# A"}
+        assert store.read_file(HASH_B, "diff.patch") == b"+b\n-c"
+        assert store.read_file(HASH_B, "memory.md") == b""
+        assert store.read("c" * 40) is None
+        assert store.hashes() == [HASH_A, HASH_B]
+        store.close()
+
+    def test_reopen(self, temp_dir):
+        """Test that a new store finds records through pack.idx."""
+        store = PackStore(temp_dir)
+        store.append(HASH_A, {"memory.json": b"{}"})
+        store.close()
+
+        reopened = PackStore(temp_dir)
+
+        assert HASH_A in reopened
+        assert dict(reopened) == {HASH_A: {"memory.json": b"{}"}}
+        reopened.close()
+
+    def test_rollover(self, temp_dir):
+        """Test that a new pack is started once the current one is full."""
+        store = PackStore(temp_dir)
+        with patch.object(Config, "pack_max_bytes", 10):
+            store.append(HASH_A, {"diff.patch": b"+" * 20})
+            store.append(HASH_B, {"diff.patch": b"-" * 20})
+
+        assert store.entries[HASH_A][0] == "pack-0001.pack"
+        assert store.entries[HASH_B][0] == "pack-0002.pack"
+        assert store.read_file(HASH_A, "diff.patch") == b"+" * 20
+        assert store.read_file(HASH_B, "diff.patch") == b"-" * 20
+        store.close()
+
+    def test_read_after_growth(self, temp_dir):
+        """Test that records appended after a pack was mapped are still readable."""
+        store = PackStore(temp_dir)
+        store.append(HASH_A, {"diff.patch": b"+a"})
+        assert store.read_file(HASH_A, "diff.patch") == b"+a"
+
+        store.append(HASH_B, {"diff.patch": b"+b"})
+
+        assert store.read_file(HASH_B, "diff.patch") == b"+b"
+        store.close()
+
+    def test_torn_index_line_is_ignored(self, temp_dir):
+        """Test that an index line cut short by a crash is skipped."""
+        store = PackStore(temp_dir)
+        store.append(HASH_A, {"memory.json": b"{}"})
+        store.close()
+        with open(store.index_path, "a", encoding="utf-8") as f:
+            f.write(f"{HASH_B}\tpack-0001.pack\t12")
+
+        reopened = PackStore(temp_dir)
+
+        assert reopened.hashes() == [HASH_A]
+        reopened.close()
+
+    def test_later_record_wins(self, temp_dir):
+        """Test that appending a commit again replaces its earlier record."""
+        store = PackStore(temp_dir)
+        store.append(HASH_A, {"memory.md": b"old"})
+        store.append(HASH_A, {"memory.md": b"new"})
+        store.close()
+
+        assert PackStore(temp_dir).read_file(HASH_A, "memory.md") == b"new"
+
+
+class TestOpenPackStore:
+    """Test cases for open_pack_store function."""
+
+    def test_shared_and_reloaded(self, temp_dir):
+        """Test that the store is shared until pack.idx changes behind its back."""
+        store = open_pack_store(temp_dir)
+        assert open_pack_store(temp_dir) is store
+
+        PackStore(temp_dir).append(HASH_A, {"memory.md": b"# A"})
+        reloaded = open_pack_store(temp_dir)
+
+        assert reloaded is not store
+        assert HASH_A in reloaded
@@ -0,0 +1,82 @@
+"""Tests for git_memory.pipeline module."""
+
+import threading
+
+import pytest
+
+from git_memory.pipeline import StageStats, prefetch, stage_rows
+
+
+class TestPrefetch:
+    """Test cases for prefetch function."""
+
+    def test_yields_in_order(self):
+        """Test that every item arrives in order and is counted."""
+        stats = StageStats("extract")
+
+        assert list(prefetch(iter(range(10)), 2, stats)) == list(range(10))
+        assert stats.items == 10
+
+    def test_runs_ahead_up_to_depth(self):
+        """Test that the producer extracts ahead but stops at the queue bound."""
+        produced = []
+        three_ahead = threading.Event()
+
+        def items():
+            for i in range(10):
+                produced.append(i)
+                if len(produced) == 3:
+                    three_ahead.set()
+                yield i
+
+        stream = prefetch(items(), 2)
+        assert next(stream) == 0
+        assert three_ahead.wait(5)
+        # One item handed out, two buffered and one waiting for room
+        assert len(produced) <= 4
+        stream.close()
+
+    def test_producer_error_reaches_consumer(self):
+        """Test that an extraction error is raised to the consumer."""
+        def items():
+            yield 1
+            raise RuntimeError("git failed")
+
+        stream = prefetch(items(), 4)
+
+        assert next(stream) == 1
+        with pytest.raises(RuntimeError, match="git failed"):
+            next(stream)
+
+    def test_close_stops_producer(self):
+        """Test that closing the stream closes the source generator."""
+        closed = threading.Event()
+
+        def items():
+            try:
+                i = 0
+                while True:
+                    yield i
+                    i += 1
+            finally:
+                closed.set()
+
+        stream = prefetch(items(), 1)
+        next(stream)
+        stream.close()
+
+        assert closed.is_set()
+
+
+class TestStageStats:
+    """Test cases for StageStats class."""
+
+    def test_utilization(self):
+        """Test that utilization is busy time over available worker time."""
+        stats = StageStats("summarize", workers=4)
+        stats.add(busy=2.0, items=2)
+        stats.add(busy=2.0, blocked=1.0, items=2)
+
+        assert stats.utilization(2.0) == 0.5
+        assert stats.utilization(0) == 0.0
+        assert stage_rows([stats], 2.0) == [("summarize", "4", "4", "4.0s", "1.0s", "50%")]
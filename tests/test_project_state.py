@@ -0,0 +1,52 @@
+"""Tests for git_memory.project_state module."""
+
+from unittest.mock import patch
+
+from git_memory.ai import ProjectMemory
+from git_memory.config import Config
+from git_memory.project_state import ProjectState
+
+
+class TestProjectState:
+    """Test cases for ProjectState class."""
+
+    def test_empty_state(self, temp_dir):
+        """Test that a missing state file starts from nothing."""
+        state = ProjectState(temp_dir)
+
+        assert state.memory is None
+        assert state.total_commits == 0
+        assert state.timeline == []
+
+    def test_roundtrip(self, temp_dir):
+        """Test that saved state is loaded back."""
+        state = ProjectState(temp_dir)
+        state.memory = ProjectMemory(current_state="Working", major_features=["Auth"])
+        state.add_commits(2, 30, 2, ["- one", "- two"])
+        state.save()
+
+        loaded = ProjectState(temp_dir)
+
+        assert loaded.memory == state.memory
+        assert (loaded.total_commits, loaded.total_lines, loaded.memories_generated) == (2, 30, 2)
+        assert loaded.timeline == ["- one", "- two"]
+        assert not (temp_dir / "project_memory.tmp").exists()
+
+    def test_timeline_is_bounded(self, temp_dir):
+        """Test that only the most recent timeline entries are kept."""
+        state = ProjectState(temp_dir)
+        with patch.object(Config, "memory_timeline_entries", 3):
+            state.add_commits(2, 0, 2, ["- 1", "- 2"])
+            state.add_commits(2, 0, 2, ["- 3", "- 4"])
+
+        assert state.timeline == ["- 2", "- 3", "- 4"]
+        assert state.total_commits == 4
+
+    def test_corrupt_state(self, temp_dir):
+        """Test that a corrupt state file is ignored."""
+        (temp_dir / "project_memory.json").write_text("{not json")
+
+        state = ProjectState(temp_dir)
+
+        assert state.memory is None
+        assert state.total_commits == 0
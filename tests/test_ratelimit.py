@@ -0,0 +1,205 @@
+"""Tests for git_memory.ratelimit module."""
+
+import asyncio
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, Mock, patch
+
+import httpx
+import openai
+import pytest
+
+from git_memory.config import Config
+from git_memory.ratelimit import (
+    SUCCESS,
+    THROTTLED,
+    FAILED,
+    AdaptiveConcurrency,
+    RateLimiter,
+    TokenBucket,
+    is_throttle,
+    rate_limiter,
+    retry_after,
+)
+
+
+def _rate_limit_error(headers=None):
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(429, headers=headers or {}, request=request)
+    return openai.RateLimitError("Rate limit reached", response=response, body=None)
+
+
+class TestTokenBucket:
+    """Test cases for the per-minute token bucket."""
+
+    def test_reserve_within_budget(self):
+        """Test that reservations within the bucket do not wait."""
+        bucket = TokenBucket(60)
+
+        assert bucket.reserve(30) == 0.0
+        assert bucket.reserve(30) == 0.0
+
+    def test_reserve_into_debt_waits(self):
+        """Test that overdrawing waits for the debt to refill at the per-minute rate."""
+        bucket = TokenBucket(60)
+        bucket.reserve(60)
+
+        assert bucket.reserve(10) == pytest.approx(10, abs=0.1)
+        assert bucket.reserve(10) == pytest.approx(20, abs=0.1)
+
+    def test_oversized_request_capped_at_capacity(self):
+        """Test that one request larger than a minute's budget waits at most a minute."""
+        bucket = TokenBucket(60)
+
+        assert bucket.reserve(1000) == 0.0
+        assert bucket.reserve(1000) == pytest.approx(60, abs=0.1)
+
+    def test_refund(self):
+        """Test that unused tokens go back to the bucket."""
+        bucket = TokenBucket(60)
+        bucket.reserve(60)
+        bucket.refund(20)
+
+        assert bucket.reserve(20) == 0.0
+
+
+class TestAdaptiveConcurrency:
+    """Test cases for AIMD concurrency control."""
+
+    def test_additive_increase(self):
+        """Test that successes grow the limit by about one per round."""
+        control = AdaptiveConcurrency(initial=4, maximum=8)
+        for _ in range(4):
+            control.acquire()
+            control.release(SUCCESS)
+
+        assert 4.9 < control.limit < 5.0
+
+    def test_multiplicative_decrease_once_per_cooldown(self):
+        """Test that a burst of throttles halves the limit once."""
+        control = AdaptiveConcurrency(initial=8, maximum=8, cooldown=60)
+        for _ in range(3):
+            control.acquire()
+            control.release(THROTTLED)
+
+        assert control.limit == 4
+
+    def test_limit_bounds(self):
+        """Test that the limit stays between its minimum and maximum."""
+        control = AdaptiveConcurrency(initial=2, maximum=2, cooldown=0)
+        for _ in range(5):
+            control.acquire()
+            control.release(THROTTLED)
+        assert control.limit == 1
+
+        for _ in range(50):
+            control.acquire()
+            control.release(SUCCESS)
+        assert control.limit == 2
+
+    def test_slots(self):
+        """Test that no more than the limit of requests are in flight."""
+        control = AdaptiveConcurrency(initial=2, maximum=2)
+
+        assert control.try_acquire() and control.try_acquire()
+        assert not control.try_acquire()
+        control.release(FAILED)
+        assert control.try_acquire()
+
+
+class TestErrorClassification:
+    """Test cases for recognizing throttles and their Retry-After."""
+
+    def test_is_throttle(self):
+        """Test that 429s and timeouts are throttles, even wrapped, and other errors are not."""
+        request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+        wrapped = Exception(_rate_limit_error())
+
+        assert is_throttle(_rate_limit_error())
+        assert is_throttle(openai.APITimeoutError(request=request))
+        assert is_throttle(wrapped)
+        assert not is_throttle(ValueError("bad"))
+
+    def test_retry_after_seconds_and_milliseconds(self):
+        """Test reading Retry-After in seconds and retry-after-ms."""
+        assert retry_after(_rate_limit_error({"retry-after": "7"})) == 7.0
+        assert retry_after(_rate_limit_error({"retry-after-ms": "1500", "retry-after": "7"})) == 1.5
+        assert retry_after(_rate_limit_error()) is None
+        assert retry_after(ValueError("bad")) is None
+
+    def test_retry_after_http_date(self):
+        """Test reading Retry-After as an HTTP date."""
+        when = datetime.now(timezone.utc) + timedelta(seconds=30)
+
+        assert retry_after(_rate_limit_error({"retry-after": format_datetime(when, usegmt=True)})) == \
+            pytest.approx(30, abs=2)
+
+
+class TestRateLimiter:
+    """Test cases for limited, retried requests."""
+
+    def test_retries_throttled_request_after_retry_after(self):
+        """Test that a 429 is retried after the provider's Retry-After and shrinks concurrency."""
+        limiter = RateLimiter("openai")
+        request = Mock(side_effect=[_rate_limit_error({"retry-after": "3"}), "response"])
+        limit = limiter.concurrency.limit
+
+        with patch('git_memory.ratelimit.time.sleep') as mock_sleep, \
+                patch('git_memory.ratelimit.console'):
+            assert limiter.call(request) == "response"
+
+        assert request.call_count == 2
+        delays = [call.args[0] for call in mock_sleep.call_args_list]
+        assert any(3 <= delay <= 3 + Config.ai_retry_base_delay for delay in delays)
+        assert limiter.concurrency.limit < limit
+        assert limiter.throttled == 1
+        assert limiter.concurrency.in_flight == 0
+
+    def test_other_errors_raise_at_once(self):
+        """Test that errors other than throttles are not retried."""
+        limiter = RateLimiter("openai")
+        request = Mock(side_effect=ValueError("bad request"))
+
+        with pytest.raises(ValueError):
+            limiter.call(request)
+
+        assert request.call_count == 1
+        assert limiter.concurrency.in_flight == 0
+
+    def test_gives_up_after_retry_attempts(self):
+        """Test that a request throttled on every attempt raises the last error."""
+        limiter = RateLimiter("openai")
+        request = Mock(side_effect=_rate_limit_error())
+
+        with patch('git_memory.ratelimit.time.sleep'), patch('git_memory.ratelimit.console'), \
+                patch.object(Config, 'ai_retry_attempts', 2):
+            with pytest.raises(openai.RateLimitError):
+                limiter.call(request)
+
+        assert request.call_count == 3
+
+    def test_unused_tokens_refunded(self):
+        """Test that tokens reserved beyond the reported usage go back to the bucket."""
+        limiter = RateLimiter("openai", tokens_per_minute=1000)
+
+        limiter.call(lambda: "response", tokens=800, usage=lambda response: 100)
+
+        assert limiter.tokens.level == pytest.approx(900, abs=1)
+
+    def test_async_retries_throttled_request(self):
+        """Test that the async path retries throttles without blocking the event loop."""
+        limiter = RateLimiter("openai")
+        request = AsyncMock(side_effect=[_rate_limit_error(), "response"])
+
+        with patch('git_memory.ratelimit.asyncio.sleep', new=AsyncMock()) as mock_sleep, \
+                patch('git_memory.ratelimit.console'):
+            assert asyncio.run(limiter.call_async(request)) == "response"
+
+        assert request.await_count == 2
+        mock_sleep.assert_awaited()
+
+    def test_shared_per_provider(self):
+        """Test that every client of a provider draws from the same limiter."""
+        assert rate_limiter("openai") is rate_limiter("openai")
+        assert rate_limiter("openai") is not rate_limiter("local")
+        assert rate_limiter("local").requests is None
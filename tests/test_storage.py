@@ -0,0 +1,162 @@
+"""Tests for git_memory.storage module."""
+
+import gzip
+
+import pytest
+from unittest.mock import patch
+
+from git_memory.config import Config
+from git_memory.storage import (
+    FLAT,
+    SHARDED,
+    commit_dir,
+    commit_location,
+    export_tree,
+    find_commit_dir,
+    history_layout,
+    iter_commit_dirs,
+    migrate_layout,
+    open_commit_patch,
+    read_commit_file,
+    store_commit_files
+)
+
+HASH_A = "ab" + "1" * 38
+HASH_B = "cd" + "2" * 38
+
+
+@pytest.fixture
+def flat_history(temp_dir):
+    """Create a flat .history with two commit directories."""
+    history_dir = temp_dir / ".history"
+    for commit_hash in (HASH_A, HASH_B):
+        (history_dir / commit_hash).mkdir(parents=True)
+        (history_dir / commit_hash / "memory.md").write_text(commit_hash)
+    (history_dir / "memory.md").write_text("root")
+    return history_dir
+
+
+class TestLayout:
+    """Test cases for commit directory placement."""
+
+    def test_commit_dir_layouts(self, temp_dir):
+        """Test flat and sharded paths."""
+        assert commit_dir(temp_dir, HASH_A, FLAT) == temp_dir / HASH_A
+        assert commit_dir(temp_dir, HASH_A, SHARDED) == temp_dir / "ab" / ("1" * 38)
+
+    def test_config_default(self, temp_dir):
+        """Test that the configured layout applies when none is recorded."""
+        history_layout.cache_clear()
+        with patch.object(Config, "history_layout", SHARDED):
+            assert commit_dir(temp_dir, HASH_A) == temp_dir / "ab" / ("1" * 38)
+        history_layout.cache_clear()
+
+    def test_iter_and_find_mixed_layouts(self, flat_history):
+        """Test that readers see commits in both layouts."""
+        sharded = commit_dir(flat_history, HASH_B, SHARDED)
+        (flat_history / HASH_B).rename(flat_history / "tmp")
+        sharded.parent.mkdir()
+        (flat_history / "tmp").rename(sharded)
+
+        assert dict(iter_commit_dirs(flat_history)) == {HASH_A: flat_history / HASH_A, HASH_B: sharded}
+        assert find_commit_dir(flat_history, HASH_B) == sharded
+        assert find_commit_dir(flat_history, "f" * 40) is None
+
+
+class TestMigrateLayout:
+    """Test cases for migrate_layout function."""
+
+    def test_migrate_to_sharded_and_back(self, flat_history):
+        """Test moving commit directories between layouts."""
+        moved = migrate_layout(flat_history, SHARDED)
+
+        assert set(moved) == {HASH_A, HASH_B}
+        assert (flat_history / "ab" / ("1" * 38) / "memory.md").read_text() == HASH_A
+        assert not (flat_history / HASH_A).exists()
+        assert (flat_history / "memory.md").read_text() == "root"
+        # New commits follow the migrated layout regardless of the configured default
+        assert commit_dir(flat_history, "ef" + "3" * 38) == flat_history / "ef" / ("3" * 38)
+
+        migrate_layout(flat_history, FLAT)
+
+        assert (flat_history / HASH_A / "memory.md").read_text() == HASH_A
+        assert not (flat_history / "ab").exists()
+        assert commit_dir(flat_history, HASH_A) == flat_history / HASH_A
+
+    def test_migrate_is_idempotent(self, flat_history):
+        """Test that rerunning a migration moves nothing."""
+        migrate_layout(flat_history, SHARDED)
+
+        assert migrate_layout(flat_history, SHARDED) == {}
+
+    def test_unknown_layout(self, flat_history):
+        """Test that unknown layouts are rejected."""
+        with pytest.raises(ValueError, match="Unknown history layout"):
+            migrate_layout(flat_history, "nested")
+
+
+class TestStoreCommitFiles:
+    """Test cases for the storage backends."""
+    
+    def test_tree_backend(self, temp_dir):
+        """Test that the tree backend writes a directory per commit."""
+        with patch.object(Config, "storage_backend", "tree"):
+            store_commit_files(temp_dir, HASH_A, {"memory.md": "# A"})
+        
+        assert (temp_dir / HASH_A / "memory.md").read_text() == "# A"
+        assert read_commit_file(temp_dir, HASH_A, "memory.md") == b"# A"
+        assert commit_location(temp_dir, HASH_A) == HASH_A
+    
+    def test_pack_backend(self, temp_dir):
+        """Test that the pack backend writes no commit directories."""
+        with patch.object(Config, "storage_backend", "pack"):
+            store_commit_files(temp_dir, HASH_A, {"memory.md": "# A", "diff.patch": "+a"})
+        
+        assert list(iter_commit_dirs(temp_dir)) == []
+        assert read_commit_file(temp_dir, HASH_A, "diff.patch") == b"+a"
+        assert read_commit_file(temp_dir, HASH_A, "missing.md") is None
+        assert commit_location(temp_dir, HASH_A) == "packs/pack-0001.pack"
+    
+    def test_pack_backend_moves_streamed_patch(self, temp_dir):
+        """Test that a patch streamed to the commit directory is moved into the pack."""
+        with patch.object(Config, "history_layout", SHARDED):
+            patch_path = commit_dir(temp_dir, HASH_A) / "diff.patch"
+            patch_path.parent.mkdir(parents=True)
+            patch_path.write_text("+streamed")
+            
+            with patch.object(Config, "storage_backend", "pack"):
+                store_commit_files(temp_dir, HASH_A, {"memory.md": "# A"}, patch_path)
+        
+        assert not (temp_dir / HASH_A[:2]).exists()
+        assert read_commit_file(temp_dir, HASH_A, "diff.patch") == b"+streamed"
+    
+    def test_unknown_backend(self, temp_dir):
+        """Test that an unknown backend is rejected."""
+        with patch.object(Config, "storage_backend", "zip"), pytest.raises(ValueError, match="Unknown storage backend"):
+            store_commit_files(temp_dir, HASH_A, {"memory.md": "# A"})
+    
+    def test_export_tree(self, temp_dir):
+        """Test that packed commits are exported to the directory layout."""
+        with patch.object(Config, "storage_backend", "pack"):
+            store_commit_files(temp_dir, HASH_A, {"memory.md": "# A", "diff.patch": "+a"})
+            store_commit_files(temp_dir, HASH_B, {"memory.md": "# B"})
+        
+        exported = export_tree(temp_dir)
+        
+        assert exported == {HASH_A: temp_dir / HASH_A, HASH_B: temp_dir / HASH_B}
+        assert (temp_dir / HASH_A / "diff.patch").read_text() == "+a"
+        assert (temp_dir / HASH_B / "memory.md").read_text() == "# B"
+        assert commit_location(temp_dir, HASH_A) == HASH_A
+
+    @pytest.mark.parametrize("backend", ["tree", "pack"])
+    def test_open_commit_patch(self, temp_dir, backend):
+        """Test that plain and compressed patches are streamed back from either backend."""
+        with patch.object(Config, "storage_backend", backend):
+            store_commit_files(temp_dir, HASH_A, {"diff.patch": "+a\n-b\n"})
+            store_commit_files(temp_dir, HASH_B, {"diff.patch.gz": gzip.compress(b"+c\n")})
+        
+        with open_commit_patch(temp_dir, HASH_A) as stream:
+            assert stream.readlines() == ["+a\n", "-b\n"]
+        with open_commit_patch(temp_dir, HASH_B) as stream:
+            assert stream.read() == "+c\n"
+        assert open_commit_patch(temp_dir, "e" * 40) is None
@@ -0,0 +1,81 @@
+"""Tests for git_memory.watermark module."""
+
+import pytest
+import git
+
+from git_memory.watermark import Watermark, head_branch
+
+
+class TestWatermark:
+    """Test cases for Watermark class."""
+    
+    def test_update_and_reload(self, temp_dir):
+        """Test that entries persist per branch."""
+        watermark = Watermark(temp_dir)
+        watermark.update("refs/heads/main", "a" * 40, 10, True)
+        
+        reloaded = Watermark(temp_dir)
+        
+        assert reloaded.get("refs/heads/main") == {"tip": "a" * 40, "min_diff_lines": 10, "first_parent": True}
+        assert reloaded.get("refs/heads/other") is None
+    
+    def test_corrupt_file_is_ignored(self, temp_dir):
+        """Test that an unreadable watermark means a full walk."""
+        (temp_dir / Watermark.file_name).write_text("{not json")
+        
+        assert Watermark(temp_dir).branches == {}
+    
+    def test_walk_range_without_watermark(self, temp_dir, mock_git_repo):
+        """Test that the first run walks the full history."""
+        repo_path, repo = mock_git_repo
+        
+        assert Watermark(temp_dir).walk_range(repo, head_branch(repo), None, True) == "HEAD"
+    
+    def test_walk_range_incremental(self, temp_dir, mock_git_repo):
+        """Test that a valid watermark limits the walk to new commits."""
+        repo_path, repo = mock_git_repo
+        branch = head_branch(repo)
+        tip = repo.head.commit.hexsha
+        watermark = Watermark(temp_dir)
+        watermark.update(branch, tip, 5, True)
+        
+        assert watermark.walk_range(repo, branch, 5, True) == f"{tip}..HEAD"
+        assert watermark.walk_range(repo, branch, 10, True) == f"{tip}..HEAD"
+    
+    def test_walk_range_full_when_settings_admit_more(self, temp_dir, mock_git_repo):
+        """Test that a lowered threshold or a different walk forces a full walk."""
+        repo_path, repo = mock_git_repo
+        branch = head_branch(repo)
+        watermark = Watermark(temp_dir)
+        watermark.update(branch, repo.head.commit.hexsha, 5, True)
+        
+        assert watermark.walk_range(repo, branch, 2, True) == "HEAD"
+        assert watermark.walk_range(repo, branch, None, True) == "HEAD"
+        assert watermark.walk_range(repo, branch, 5, False) == "HEAD"
+    
+    def test_walk_range_full_after_rewrite(self, temp_dir, mock_git_repo):
+        """Test that a watermark that is no longer an ancestor is discarded."""
+        repo_path, repo = mock_git_repo
+        branch = head_branch(repo)
+        watermark = Watermark(temp_dir)
+        watermark.update(branch, repo.head.commit.hexsha, None, True)
+        
+        repo.git.reset("--hard", "HEAD~1")
+        (repo_path / "rewritten.txt").write_text("new history")
+        repo.index.add(["rewritten.txt"])
+        repo.index.commit("Rewritten commit")
+        
+        assert watermark.walk_range(repo, branch, None, True) == "HEAD"
+
+
+class TestHeadBranch:
+    """Test cases for head_branch function."""
+    
+    def test_branch_and_detached(self, mock_git_repo):
+        """Test naming attached and detached HEADs."""
+        repo_path, repo = mock_git_repo
+        
+        assert head_branch(repo).startswith("refs/heads/")
+        
+        repo.git.checkout(repo.head.commit.hexsha)
+        assert head_branch(repo) == "HEAD"
@@ -0,0 +1,87 @@
+"""Tests for git_memory.writer module."""
+
+import threading
+
+import pytest
+from unittest.mock import patch
+
+from git_memory.storage import write_atomic
+from git_memory.writer import BackgroundWriter, note_write, run_write
+
+
+class TestBackgroundWriter:
+    """Test cases for BackgroundWriter class."""
+
+    def test_tasks_run_in_order_off_thread(self):
+        """Test that tasks run in submission order on the writer thread."""
+        calls = []
+        with BackgroundWriter(fsync=False) as writer:
+            for i in range(20):
+                writer.submit(lambda i=i: calls.append((i, threading.current_thread().name)))
+
+        assert [i for i, _ in calls] == list(range(20))
+        assert {name for _, name in calls} == {"git-memory-writer"}
+
+    def test_backpressure(self):
+        """Test that submit blocks once the queue is full."""
+        release = threading.Event()
+        writer = BackgroundWriter(max_pending=1, fsync=False)
+        writer.submit(release.wait)
+        writer.submit(lambda: None)  # Queued while the first task blocks the thread
+
+        submitted = threading.Event()
+        blocked = threading.Thread(target=lambda: (writer.submit(lambda: None), submitted.set()))
+        blocked.start()
+
+        assert not submitted.wait(0.2)
+        release.set()
+        assert submitted.wait(5)
+        blocked.join()
+        writer.close()
+
+    def test_error_is_raised_on_submitting_thread(self):
+        """Test that a failed write stops later tasks and surfaces on flush."""
+        calls = []
+        writer = BackgroundWriter(fsync=False)
+        writer.submit(lambda: 1 / 0)
+        writer.submit(lambda: calls.append("after"))
+
+        with pytest.raises(ZeroDivisionError):
+            writer.flush()
+        with pytest.raises(ZeroDivisionError):
+            writer.close()
+        assert calls == []
+
+    def test_batch_fsync(self, temp_dir):
+        """Test that files written by a batch are fsynced."""
+        with patch("git_memory.writer.os.fsync") as mock_fsync:
+            with BackgroundWriter(fsync=True) as writer:
+                writer.submit(write_atomic, temp_dir / "a.md", "a")
+                writer.submit(write_atomic, temp_dir / "b.md", "b")
+
+        assert (temp_dir / "a.md").read_text() == "a"
+        # Each file plus its directory, at most once per batch
+        assert 3 <= mock_fsync.call_count <= 4
+
+    def test_note_write_outside_writer(self, temp_dir):
+        """Test that writes outside the writer thread are not tracked."""
+        note_write(temp_dir / "a.md")  # No batch to record into
+
+
+class TestRunWrite:
+    """Test cases for run_write function."""
+
+    def test_without_writer(self):
+        """Test that writes run immediately without a writer."""
+        calls = []
+        run_write(None, calls.append, "now")
+
+        assert calls == ["now"]
+
+    def test_with_writer(self):
+        """Test that writes are queued on a writer."""
+        calls = []
+        with BackgroundWriter(fsync=False) as writer:
+            run_write(writer, calls.append, "later")
+            writer.flush()
+            assert calls == ["later"]